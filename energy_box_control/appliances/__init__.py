@@ -5,6 +5,7 @@ from .valve import *
 from .mix import *
 from .heat_pipes import *
 from .pcm import *
+from .performance_curve import *
 from .yazaki import *
 from .chiller import *
 from .heat_exchanger import *
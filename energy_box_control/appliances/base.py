@@ -2,9 +2,12 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from enum import Enum
 from functools import cache
-from typing import Any
+from typing import Any, overload
 import uuid
 
+import numpy as np
+from numpy.typing import NDArray
+
 from energy_box_control.time import ProcessTime
 from energy_box_control.units import Celsius, LiterPerSecond
 
@@ -61,6 +64,15 @@ class Simulatable[
     ) -> tuple[TState, TOutputs]: ...
 
 
+class BatchSimulatable:
+    """Marks appliances of which simulate also simulates an ensemble of scenarios at once
+
+    The numeric fields of the appliance, state, control and signals may then hold arrays with one entry per scenario.
+    Their simulate doesn't branch on those values, it selects with `where`, `clip` and `divide_where`, which keep to
+    plain floats for a single scenario. Other appliances are simulated scenario by scenario.
+    """
+
+
 class Appliance[
     TState: ApplianceState | None,
     TControl: ApplianceControl | None,
@@ -90,23 +102,32 @@ class ThermalAppliance[
     pass
 
 
-def _get_appliance_bases(
-    appliance: BaseAppliance[Any, Any, Any, Any, Any]
-) -> tuple[Any, ...]:
-    bases = get_original_bases(type(appliance))
+def _get_appliance_bases(appliance_type: type) -> tuple[Any, ...]:
+    bases = get_original_bases(appliance_type)
     while type(bases[0]) is type:
         bases = get_original_bases(bases[0])
-    return bases
+    # leaves out markers like BatchSimulatable
+    return tuple(base for base in bases if hasattr(base, "__args__"))
 
 
-@cache
+# cached per appliance type; hashing an appliance instance hashes all of its fields
 def port_for_appliance(appliance: BaseAppliance[Any, Any, Any, Any, Any]) -> type[Port]:
-    bases = _get_appliance_bases(appliance)
+    return _port_for_type(type(appliance))
+
+
+@cache
+def _port_for_type(appliance_type: type) -> type[Port]:
+    bases = _get_appliance_bases(appliance_type)
     return next(arg for base in bases for arg in base.__args__ if issubclass(arg, Port))
 
 
 def has_appliance_state(appliance: BaseAppliance[Any, Any, Any, Any, Any]) -> bool:
-    bases = _get_appliance_bases(appliance)
+    return _has_state_for_type(type(appliance))
+
+
+@cache
+def _has_state_for_type(appliance_type: type) -> bool:
+    bases = _get_appliance_bases(appliance_type)
     return any(
         arg
         for base in bases
@@ -116,7 +137,12 @@ def has_appliance_state(appliance: BaseAppliance[Any, Any, Any, Any, Any]) -> bo
 
 
 def control_class(appliance: BaseAppliance[Any, Any, Any, Any, Any]) -> Any:
-    bases = _get_appliance_bases(appliance)
+    return _control_class_for_type(type(appliance))
+
+
+@cache
+def _control_class_for_type(appliance_type: type) -> Any:
+    bases = _get_appliance_bases(appliance_type)
     return next(
         (
             arg
@@ -126,3 +152,58 @@ def control_class(appliance: BaseAppliance[Any, Any, Any, Any, Any]) -> Any:
         ),
         None,
     )
+
+
+type Scenarios = NDArray[Any]  # a value with an entry per scenario of an ensemble
+
+
+@overload
+def where[T: float](condition: bool, x: T, y: T) -> T: ...
+@overload
+def where(
+    condition: NDArray[np.bool_], x: float | Scenarios, y: float | Scenarios
+) -> Scenarios: ...
+def where(
+    condition: bool | NDArray[np.bool_], x: float | Scenarios, y: float | Scenarios
+) -> Any:
+    # x where condition holds, else y, elementwise when the condition is of an ensemble
+    if isinstance(condition, np.ndarray):
+        return np.where(condition, x, y)
+    return x if condition else y
+
+
+@overload
+def clip[T: float](value: T, lower: float, upper: float) -> T: ...
+@overload
+def clip(
+    value: Scenarios, lower: float | Scenarios, upper: float | Scenarios
+) -> Scenarios: ...
+def clip(value: float | Scenarios, lower: Any, upper: Any) -> Any:
+    if any(isinstance(argument, np.ndarray) for argument in (value, lower, upper)):
+        return np.clip(value, lower, upper)
+    return max(min(value, upper), lower)
+
+
+@overload
+def divide_where(
+    condition: bool, numerator: float, denominator: float, otherwise: float
+) -> float: ...
+@overload
+def divide_where(
+    condition: NDArray[np.bool_],
+    numerator: float | Scenarios,
+    denominator: float | Scenarios,
+    otherwise: float | Scenarios,
+) -> Scenarios: ...
+def divide_where(
+    condition: bool | NDArray[np.bool_],
+    numerator: float | Scenarios,
+    denominator: float | Scenarios,
+    otherwise: float | Scenarios,
+) -> Any:
+    # numerator / denominator where condition holds, without dividing by the masked out denominators
+    if isinstance(condition, np.ndarray):
+        return np.where(
+            condition, numerator / np.where(condition, denominator, 1), otherwise
+        )
+    return numerator / denominator if condition else otherwise
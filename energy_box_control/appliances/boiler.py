@@ -4,6 +4,7 @@ from typing import Optional
 
 from energy_box_control.appliances.base import (
     ThermalAppliance,
+    BatchSimulatable,
     ApplianceControl,
     ApplianceState,
     ThermalState,
@@ -32,7 +33,9 @@ class BoilerControl(ApplianceControl):
 
 
 @dataclass(frozen=True, eq=True)
-class Boiler(ThermalAppliance[BoilerState, BoilerControl, BoilerPort]):
+class Boiler(
+    ThermalAppliance[BoilerState, BoilerControl, BoilerPort], BatchSimulatable
+):
     volume: Liter
     heater_power: Watt
     heat_loss: Watt
@@ -2,10 +2,13 @@ from dataclasses import dataclass
 
 from energy_box_control.appliances.base import (
     ThermalAppliance,
+    BatchSimulatable,
     ApplianceControl,
     ApplianceState,
     ThermalState,
     Port,
+    divide_where,
+    where,
 )
 from energy_box_control.time import ProcessTime
 from energy_box_control.units import JoulePerLiterKelvin, Watt
@@ -32,7 +35,9 @@ class ChillerControl(ApplianceControl):
 
 
 @dataclass(frozen=True, eq=True)
-class Chiller(ThermalAppliance[ChillerState, ChillerControl, ChillerPort]):
+class Chiller(
+    ThermalAppliance[ChillerState, ChillerControl, ChillerPort], BatchSimulatable
+):
     cooling_capacity: Watt
     specific_heat_capacity_chilled: JoulePerLiterKelvin
     specific_heat_capacity_cooling: JoulePerLiterKelvin
@@ -44,40 +49,32 @@ class Chiller(ThermalAppliance[ChillerState, ChillerControl, ChillerPort]):
         control: ChillerControl,
         simulation_time: ProcessTime,
     ) -> tuple[ChillerState, dict[ChillerPort, ThermalState]]:
-        cooling_power = self.cooling_capacity if control.on else 0
+        chilled_in = inputs[ChillerPort.CHILLED_IN]
+        cooling_in = inputs[ChillerPort.COOLING_IN]
+        cooling_power = where(control.on, self.cooling_capacity, 0)
+        flowing = (chilled_in.flow > 0) & (cooling_in.flow > 0)
 
-        chilled_out_temp = (
-            inputs[ChillerPort.CHILLED_IN].temperature
-            - cooling_power
-            / (
-                self.specific_heat_capacity_chilled
-                * inputs[ChillerPort.CHILLED_IN].flow
-            )
-            if inputs[ChillerPort.CHILLED_IN].flow > 0
-            and inputs[ChillerPort.COOLING_IN].flow > 0
-            else inputs[ChillerPort.CHILLED_IN].temperature
+        chilled_out_temp = chilled_in.temperature - divide_where(
+            flowing,
+            cooling_power,
+            self.specific_heat_capacity_chilled * chilled_in.flow,
+            0,
         )
-
-        cooling_out_temp = (
-            inputs[ChillerPort.COOLING_IN].temperature
-            + cooling_power
-            / (
-                self.specific_heat_capacity_cooling
-                * inputs[ChillerPort.COOLING_IN].flow
-            )
-            if inputs[ChillerPort.CHILLED_IN].flow > 0
-            and inputs[ChillerPort.COOLING_IN].flow > 0
-            else inputs[ChillerPort.COOLING_IN].temperature
+        cooling_out_temp = cooling_in.temperature + divide_where(
+            flowing,
+            cooling_power,
+            self.specific_heat_capacity_cooling * cooling_in.flow,
+            0,
         )
 
         return (
             ChillerState(),
             {
                 ChillerPort.CHILLED_OUT: ThermalState(
-                    inputs[ChillerPort.CHILLED_IN].flow, chilled_out_temp
+                    chilled_in.flow, chilled_out_temp
                 ),
                 ChillerPort.COOLING_OUT: ThermalState(
-                    inputs[ChillerPort.COOLING_IN].flow, cooling_out_temp
+                    cooling_in.flow, cooling_out_temp
                 ),
             },
         )
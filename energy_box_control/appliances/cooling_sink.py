@@ -1,8 +1,10 @@
 from dataclasses import dataclass
 from energy_box_control.appliances.base import (
     ThermalAppliance,
+    BatchSimulatable,
     ThermalState,
     Port,
+    divide_where,
 )
 from energy_box_control.schedules import Schedule
 from energy_box_control.time import ProcessTime
@@ -15,7 +17,7 @@ class CoolingSinkPort(Port):
 
 
 @dataclass(frozen=True, eq=True)
-class CoolingSink(ThermalAppliance[None, None, CoolingSinkPort]):
+class CoolingSink(ThermalAppliance[None, None, CoolingSinkPort], BatchSimulatable):
     specific_heat_capacity: JoulePerLiterKelvin
     cooling_demand_schedule: Schedule[Watt]
 
@@ -26,19 +28,15 @@ class CoolingSink(ThermalAppliance[None, None, CoolingSinkPort]):
         control: None,
         simulation_time: ProcessTime,
     ) -> tuple[None, dict[CoolingSinkPort, ThermalState]]:
+        input = inputs[CoolingSinkPort.INPUT]
 
-        output_temperature = (
-            inputs[CoolingSinkPort.INPUT].temperature
-            + (
-                self.cooling_demand_schedule.at(simulation_time)
-                / (inputs[CoolingSinkPort.INPUT].flow * self.specific_heat_capacity)
-            )
-            if inputs[CoolingSinkPort.INPUT].flow > 0
-            else inputs[CoolingSinkPort.INPUT].temperature
+        output_temperature = input.temperature + divide_where(
+            input.flow > 0,
+            self.cooling_demand_schedule.at(simulation_time),
+            input.flow * self.specific_heat_capacity,
+            0,
         )
 
         return None, {
-            CoolingSinkPort.OUTPUT: ThermalState(
-                inputs[CoolingSinkPort.INPUT].flow, output_temperature
-            )
+            CoolingSinkPort.OUTPUT: ThermalState(input.flow, output_temperature)
         }
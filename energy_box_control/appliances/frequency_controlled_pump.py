@@ -3,10 +3,12 @@ from typing import Optional
 
 from energy_box_control.appliances.base import (
     ThermalAppliance,
+    BatchSimulatable,
     ApplianceControl,
     ApplianceState,
     ThermalState,
     Port,
+    where,
 )
 from energy_box_control.time import ProcessTime
 
@@ -26,7 +28,8 @@ class FrequencyPumpControl(ApplianceControl):
 
 @dataclass(frozen=True, eq=True)
 class FrequencyPump(
-    ThermalAppliance[ApplianceState, FrequencyPumpControl, FrequencyPumpPort]
+    ThermalAppliance[ApplianceState, FrequencyPumpControl, FrequencyPumpPort],
+    BatchSimulatable,
 ):
     max_flow: LiterPerSecond
     rated_power_consumption: Watt
@@ -42,8 +45,8 @@ class FrequencyPump(
         return ApplianceState(), {
             FrequencyPumpPort.OUT: ThermalState(
                 (
-                    self.max_flow * control.frequency_ratio
-                    if (control and control.on)
+                    where(control.on, self.max_flow * control.frequency_ratio, 0)
+                    if control
                     else 0
                 ),
                 input.temperature,
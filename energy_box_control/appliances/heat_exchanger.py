@@ -1,9 +1,13 @@
 from dataclasses import dataclass
+
 from energy_box_control.appliances.base import (
     ThermalAppliance,
+    BatchSimulatable,
     ApplianceState,
     ThermalState,
     Port,
+    divide_where,
+    where,
 )
 from energy_box_control.time import ProcessTime
 from energy_box_control.units import JoulePerLiterKelvin
@@ -17,7 +21,9 @@ class HeatExchangerPort(Port):
 
 
 @dataclass(frozen=True, eq=True)
-class HeatExchanger(ThermalAppliance[ApplianceState, None, HeatExchangerPort]):
+class HeatExchanger(
+    ThermalAppliance[ApplianceState, None, HeatExchangerPort], BatchSimulatable
+):
     specific_heat_capacity_A: JoulePerLiterKelvin
     specific_heat_capacity_B: JoulePerLiterKelvin
 
@@ -29,45 +35,26 @@ class HeatExchanger(ThermalAppliance[ApplianceState, None, HeatExchangerPort]):
         control: None,
         simulation_time: ProcessTime,
     ) -> tuple[ApplianceState, dict[HeatExchangerPort, ThermalState]]:
-
-        heat_A = (
-            inputs[HeatExchangerPort.A_IN].flow
-            * inputs[HeatExchangerPort.A_IN].temperature
-            * self.specific_heat_capacity_A
-        )
-        heat_B = (
-            inputs[HeatExchangerPort.B_IN].flow
-            * inputs[HeatExchangerPort.B_IN].temperature
-            * self.specific_heat_capacity_B
-        )
-
-        if (
-            inputs[HeatExchangerPort.A_IN].flow == 0
-            or inputs[HeatExchangerPort.B_IN].flow == 0
-        ):
-            return ApplianceState(), {
-                HeatExchangerPort.A_OUT: ThermalState(
-                    inputs[HeatExchangerPort.A_IN].flow,
-                    inputs[HeatExchangerPort.A_IN].temperature,
-                ),
-                HeatExchangerPort.B_OUT: ThermalState(
-                    inputs[HeatExchangerPort.B_IN].flow,
-                    inputs[HeatExchangerPort.B_IN].temperature,
-                ),
-            }
-
-        equilibrium_temperature = (heat_A + heat_B) / (
-            inputs[HeatExchangerPort.A_IN].flow * self.specific_heat_capacity_A
-            + inputs[HeatExchangerPort.B_IN].flow * self.specific_heat_capacity_B
+        a_in = inputs[HeatExchangerPort.A_IN]
+        b_in = inputs[HeatExchangerPort.B_IN]
+        exchanging = (a_in.flow != 0) & (b_in.flow != 0)
+
+        equilibrium_temperature = divide_where(
+            exchanging,
+            a_in.flow * a_in.temperature * self.specific_heat_capacity_A
+            + b_in.flow * b_in.temperature * self.specific_heat_capacity_B,
+            a_in.flow * self.specific_heat_capacity_A
+            + b_in.flow * self.specific_heat_capacity_B,
+            0,
         )
 
         return ApplianceState(), {
             HeatExchangerPort.A_OUT: ThermalState(
-                inputs[HeatExchangerPort.A_IN].flow,
-                equilibrium_temperature,
+                a_in.flow,
+                where(exchanging, equilibrium_temperature, a_in.temperature),
             ),
             HeatExchangerPort.B_OUT: ThermalState(
-                inputs[HeatExchangerPort.B_IN].flow,
-                equilibrium_temperature,
+                b_in.flow,
+                where(exchanging, equilibrium_temperature, b_in.temperature),
             ),
         }
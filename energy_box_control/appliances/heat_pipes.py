@@ -1,9 +1,11 @@
 from dataclasses import dataclass
 from energy_box_control.appliances.base import (
     ThermalAppliance,
+    BatchSimulatable,
     ApplianceState,
     ThermalState,
     Port,
+    divide_where,
 )
 from energy_box_control.schedules import Schedule
 from energy_box_control.time import ProcessTime
@@ -26,7 +28,9 @@ class HeatPipesPort(Port):
 
 
 @dataclass(frozen=True, eq=True)
-class HeatPipes(ThermalAppliance[HeatPipesState, None, HeatPipesPort]):
+class HeatPipes(
+    ThermalAppliance[HeatPipesState, None, HeatPipesPort], BatchSimulatable
+):
     optical_efficiency: float
     first_order_loss_coefficient: float
     second_order_loss_coefficient: float
@@ -42,7 +46,6 @@ class HeatPipes(ThermalAppliance[HeatPipesState, None, HeatPipesPort]):
         control: None,
         simulation_time: ProcessTime,
     ) -> tuple[HeatPipesState, dict[HeatPipesPort, ThermalState]]:
-
         input = inputs[HeatPipesPort.IN]
 
         dT = previous_state.mean_temperature - self.ambient_temperature_schedule.at(
@@ -56,10 +59,8 @@ class HeatPipes(ThermalAppliance[HeatPipesState, None, HeatPipesPort]):
             - self.second_order_loss_coefficient * dT**2
         )
 
-        temp_out = (
-            input.temperature + power / (input.flow * self.specific_heat_medium)
-            if input.flow > 0
-            else input.temperature
+        temp_out = input.temperature + divide_where(
+            input.flow > 0, power, input.flow * self.specific_heat_medium, 0
         )
 
         new_state = HeatPipesState((temp_out + input.temperature) / 2)
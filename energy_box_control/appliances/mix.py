@@ -1,9 +1,11 @@
 from dataclasses import dataclass
 from energy_box_control.appliances.base import (
     ThermalAppliance,
+    BatchSimulatable,
     ApplianceState,
     ThermalState,
     Port,
+    divide_where,
 )
 from energy_box_control.time import ProcessTime
 
@@ -15,7 +17,7 @@ class MixPort(Port):
 
 
 @dataclass(eq=True, frozen=True)
-class Mix(ThermalAppliance[ApplianceState, None, MixPort]):
+class Mix(ThermalAppliance[ApplianceState, None, MixPort], BatchSimulatable):
 
     def simulate(
         self,
@@ -26,11 +28,13 @@ class Mix(ThermalAppliance[ApplianceState, None, MixPort]):
     ) -> tuple[ApplianceState, dict[MixPort, ThermalState]]:
         a = inputs[MixPort.A]
         b = inputs[MixPort.B]
+        flow = a.flow + b.flow
 
-        mix_temp = (
-            (a.temperature * a.flow + b.temperature * b.flow) / (a.flow + b.flow)
-            if (a.flow + b.flow) > 0
-            else (a.temperature + b.temperature) / 2
+        mix_temp = divide_where(
+            flow > 0,
+            a.temperature * a.flow + b.temperature * b.flow,
+            flow,
+            (a.temperature + b.temperature) / 2,
         )
 
-        return ApplianceState(), {MixPort.AB: ThermalState(a.flow + b.flow, mix_temp)}
+        return ApplianceState(), {MixPort.AB: ThermalState(flow, mix_temp)}
@@ -2,10 +2,14 @@ from dataclasses import dataclass
 
 from energy_box_control.appliances.base import (
     ThermalAppliance,
+    BatchSimulatable,
     ApplianceState,
     Celsius,
     ThermalState,
     Port,
+    divide_where,
+    where,
+    clip,
 )
 from energy_box_control.time import ProcessTime
 from energy_box_control.units import (
@@ -16,10 +20,6 @@ from energy_box_control.units import (
 )
 
 
-def clamp(val: float, min_val: float, max_val: float) -> float:
-    return max(min(val, max_val), min_val)
-
-
 @dataclass(eq=True, frozen=True)
 class PcmState(ApplianceState):
     state_of_charge: float
@@ -34,7 +34,7 @@ class PcmPort(Port):
 
 
 @dataclass(eq=True, frozen=True)
-class Pcm(ThermalAppliance[PcmState, None, PcmPort]):
+class Pcm(ThermalAppliance[PcmState, None, PcmPort], BatchSimulatable):
     latent_heat: Joule
     phase_change_temperature: Celsius
     sensible_capacity: JoulePerKelvin
@@ -52,13 +52,26 @@ class Pcm(ThermalAppliance[PcmState, None, PcmPort]):
             self.sensible_capacity + charge_capacity + discharge_capacity
         )
         heat_till_phase_change = self.phase_change_temperature * sensible_capacity
-        if total_heat < heat_till_phase_change:  # can't go into phase
-            return total_heat / sensible_capacity, 0
-        elif total_heat < heat_till_phase_change + self.latent_heat:  # staying in phase
-            heat_for_phase = total_heat - heat_till_phase_change
-            return self.phase_change_temperature, heat_for_phase / self.latent_heat
-        else:  # going past phase
-            return (total_heat - self.latent_heat) / sensible_capacity, 1
+        below_phase = total_heat < heat_till_phase_change  # can't go into phase
+        # staying in phase, only selected where the heat isn't below the phase change, past it otherwise
+        in_phase = total_heat < heat_till_phase_change + self.latent_heat
+        temperature = where(
+            below_phase,
+            total_heat / sensible_capacity,
+            where(
+                in_phase,
+                self.phase_change_temperature,
+                (total_heat - self.latent_heat) / sensible_capacity,
+            ),
+        )
+        state_of_charge = where(
+            below_phase,
+            0,
+            where(
+                in_phase, (total_heat - heat_till_phase_change) / self.latent_heat, 1
+            ),
+        )
+        return temperature, state_of_charge
 
     def simulate(
         self,
@@ -71,52 +84,55 @@ class Pcm(ThermalAppliance[PcmState, None, PcmPort]):
             self.sensible_capacity * previous_state.temperature
             + self.latent_heat * previous_state.state_of_charge
         )
+        max_transfer = self.transfer_power * simulation_time.step_seconds
+
         if PcmPort.CHARGE_IN in inputs:
+            charge_in = inputs[PcmPort.CHARGE_IN]
             charge_capacity = (
-                inputs[PcmPort.CHARGE_IN].flow
+                charge_in.flow
                 * simulation_time.step_seconds
                 * self.specific_heat_capacity_charge
             )
-            charge_heat = inputs[PcmPort.CHARGE_IN].temperature * charge_capacity
+            charge_heat = charge_in.temperature * charge_capacity
         else:
+            charge_in = None
             charge_capacity = 0
             charge_heat = 0
         if PcmPort.DISCHARGE_IN in inputs:
+            discharge_in = inputs[PcmPort.DISCHARGE_IN]
             discharge_capacity = (
-                inputs[PcmPort.DISCHARGE_IN].flow
+                discharge_in.flow
                 * simulation_time.step_seconds
                 * self.specific_heat_capacity_charge
             )
-            discharge_heat = (
-                discharge_capacity * inputs[PcmPort.DISCHARGE_IN].temperature
-            )
+            discharge_heat = discharge_capacity * discharge_in.temperature
         else:
+            discharge_in = None
             discharge_capacity = 0
             discharge_heat = 0
 
-        total_heat = pcm_heat + charge_heat + discharge_heat
         ideal_temp, _ = self._heat_to_temp_soc(
-            total_heat, charge_capacity, discharge_capacity
+            pcm_heat + charge_heat + discharge_heat, charge_capacity, discharge_capacity
         )
 
-        if PcmPort.CHARGE_IN in inputs:
-            transferred_charge_heat = clamp(
-                (inputs[PcmPort.CHARGE_IN].temperature - ideal_temp) * charge_capacity,
-                -self.transfer_power * simulation_time.step_seconds,
-                self.transfer_power * simulation_time.step_seconds,
+        transferred_charge_heat = (
+            clip(
+                (charge_in.temperature - ideal_temp) * charge_capacity,
+                -max_transfer,
+                max_transfer,
             )
-        else:
-            transferred_charge_heat = 0
-
-        if PcmPort.DISCHARGE_IN in inputs:
-            transferred_discharge_heat = clamp(
-                (inputs[PcmPort.DISCHARGE_IN].temperature - ideal_temp)
-                * discharge_capacity,
-                -self.transfer_power * simulation_time.step_seconds,
-                self.transfer_power * simulation_time.step_seconds,
+            if charge_in is not None
+            else 0
+        )
+        transferred_discharge_heat = (
+            clip(
+                (discharge_in.temperature - ideal_temp) * discharge_capacity,
+                -max_transfer,
+                max_transfer,
             )
-        else:
-            transferred_discharge_heat = 0
+            if discharge_in is not None
+            else 0
+        )
 
         actual_temp, actual_soc = self._heat_to_temp_soc(
             pcm_heat + (transferred_charge_heat + transferred_discharge_heat), 0, 0
@@ -126,30 +142,31 @@ class Pcm(ThermalAppliance[PcmState, None, PcmPort]):
             **(
                 {
                     PcmPort.CHARGE_OUT: ThermalState(
-                        inputs[PcmPort.CHARGE_IN].flow,
-                        (
-                            (charge_heat - transferred_charge_heat) / charge_capacity
-                            if charge_capacity > 0
-                            else inputs[PcmPort.CHARGE_IN].temperature
+                        charge_in.flow,
+                        divide_where(
+                            charge_capacity > 0,
+                            charge_heat - transferred_charge_heat,
+                            charge_capacity,
+                            charge_in.temperature,
                         ),
                     )
                 }
-                if PcmPort.CHARGE_IN in inputs
+                if charge_in is not None
                 else {}
             ),
             **(
                 {
                     PcmPort.DISCHARGE_OUT: ThermalState(
-                        inputs[PcmPort.DISCHARGE_IN].flow,
-                        (
-                            (discharge_heat - transferred_discharge_heat)
-                            / discharge_capacity
-                            if discharge_capacity > 0
-                            else inputs[PcmPort.DISCHARGE_IN].temperature
+                        discharge_in.flow,
+                        divide_where(
+                            discharge_capacity > 0,
+                            discharge_heat - transferred_discharge_heat,
+                            discharge_capacity,
+                            discharge_in.temperature,
                         ),
                     )
                 }
-                if PcmPort.DISCHARGE_IN in inputs
+                if discharge_in is not None
                 else {}
             ),
         }
@@ -0,0 +1,84 @@
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Any, Sequence, overload
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+
+def _cell(grid: Sequence[float], value: float) -> tuple[int, float]:
+    # the cell at the edge of the grid is used to extrapolate values outside of it
+    index = min(max(bisect_right(grid, value) - 1, 0), len(grid) - 2)
+    return index, (value - grid[index]) / (grid[index + 1] - grid[index])
+
+
+def _cells(grid: NDArray[np.float64], values: ArrayLike):
+    values = np.asarray(values, dtype=np.float64)
+    index = np.clip(np.searchsorted(grid, values, side="right") - 1, 0, len(grid) - 2)
+    return index, (values - grid[index]) / (grid[index + 1] - grid[index])
+
+
+@dataclass(frozen=True)
+class PerformanceCurve:
+    """Manufacturer performance table over a regular grid of two inputs
+
+    Values are bilinearly interpolated within the grid and linearly extrapolated outside of it, like scipy's
+    RegularGridInterpolator without bounds error or fill value. Build curves once, at module level, and evaluate
+    points by calling the curve, which evaluates arrays of points at once like `batch`.
+    """
+
+    x: tuple[float, ...]
+    y: tuple[float, ...]
+    values: tuple[tuple[float, ...], ...]  # indexed [x][y]
+    _x: NDArray[np.float64] = field(init=False, repr=False, compare=False)
+    _y: NDArray[np.float64] = field(init=False, repr=False, compare=False)
+    _values: NDArray[np.float64] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if len(self.x) < 2 or len(self.y) < 2:
+            raise ValueError("a performance curve needs at least two points per axis")
+        if list(self.x) != sorted(set(self.x)) or list(self.y) != sorted(set(self.y)):
+            raise ValueError("performance curve axes need to be strictly ascending")
+        if len(self.values) != len(self.x) or any(
+            len(row) != len(self.y) for row in self.values
+        ):
+            raise ValueError(
+                f"performance curve values need to be of shape ({len(self.x)}, {len(self.y)})"
+            )
+        object.__setattr__(self, "_x", np.array(self.x, dtype=np.float64))
+        object.__setattr__(self, "_y", np.array(self.y, dtype=np.float64))
+        object.__setattr__(self, "_values", np.array(self.values, dtype=np.float64))
+
+    @overload
+    def __call__(self, x: float, y: float) -> float: ...
+    @overload
+    def __call__(
+        self, x: NDArray[np.float64], y: float | NDArray[np.float64]
+    ) -> NDArray[np.float64]: ...
+    def __call__(
+        self, x: float | NDArray[np.float64], y: float | NDArray[np.float64]
+    ) -> Any:
+        if isinstance(x, np.ndarray) or isinstance(y, np.ndarray):
+            return self.batch(x, y)
+        i, tx = _cell(self.x, x)
+        j, ty = _cell(self.y, y)
+        low, high = self.values[i], self.values[i + 1]
+        return (1 - tx) * ((1 - ty) * low[j] + ty * low[j + 1]) + tx * (
+            (1 - ty) * high[j] + ty * high[j + 1]
+        )
+
+    def batch(self, x: ArrayLike, y: ArrayLike) -> NDArray[np.float64]:
+        i, tx = _cells(self._x, x)
+        j, ty = _cells(self._y, y)
+        values = self._values
+        return (1 - tx) * ((1 - ty) * values[i, j] + ty * values[i, j + 1]) + tx * (
+            (1 - ty) * values[i + 1, j] + ty * values[i + 1, j + 1]
+        )
+
+    @property
+    def x_range(self) -> tuple[float, float]:
+        return self.x[0], self.x[-1]
+
+    @property
+    def y_range(self) -> tuple[float, float]:
+        return self.y[0], self.y[-1]
@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 from energy_box_control.appliances.base import (
     ThermalAppliance,
+    BatchSimulatable,
     ApplianceState,
     ThermalState,
     Port,
@@ -20,7 +21,7 @@ class SourcePort(Port):
 
 
 @dataclass(frozen=True, eq=True)
-class Source(ThermalAppliance[SourceState, None, SourcePort]):
+class Source(ThermalAppliance[SourceState, None, SourcePort], BatchSimulatable):
     flow: LiterPerSecond
     temperature_schedule: Schedule[Celsius]
 
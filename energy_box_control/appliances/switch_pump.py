@@ -4,10 +4,12 @@ from typing import Optional
 
 from energy_box_control.appliances.base import (
     ThermalAppliance,
+    BatchSimulatable,
     ApplianceControl,
     ApplianceState,
     ThermalState,
     Port,
+    where,
 )
 from energy_box_control.time import ProcessTime
 
@@ -44,7 +46,10 @@ class SwitchPumpControl(ApplianceControl):
 
 
 @dataclass(frozen=True, eq=True)
-class SwitchPump(ThermalAppliance[SwitchPumpState, SwitchPumpControl, SwitchPumpPort]):
+class SwitchPump(
+    ThermalAppliance[SwitchPumpState, SwitchPumpControl, SwitchPumpPort],
+    BatchSimulatable,
+):
     flow: LiterPerSecond
     rated_power_consumption: Watt
 
@@ -56,10 +61,7 @@ class SwitchPump(ThermalAppliance[SwitchPumpState, SwitchPumpControl, SwitchPump
         simulation_time: ProcessTime,
     ) -> tuple[SwitchPumpState, dict[SwitchPumpPort, ThermalState]]:
         input = inputs[SwitchPumpPort.IN]
-        return SwitchPumpState(
-            status=SwitchPumpStatusBit.ON_OFF.value if (control and control.on) else 0
-        ), {
-            SwitchPumpPort.OUT: ThermalState(
-                self.flow if (control and control.on) else 0, input.temperature
-            )
+        on = control.on if control else False
+        return SwitchPumpState(status=where(on, SwitchPumpStatusBit.ON_OFF.value, 0)), {
+            SwitchPumpPort.OUT: ThermalState(where(on, self.flow, 0), input.temperature)
         }
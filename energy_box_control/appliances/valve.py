@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 from energy_box_control.appliances.base import (
     ThermalAppliance,
+    BatchSimulatable,
     ApplianceControl,
     ApplianceState,
     ThermalState,
@@ -42,7 +43,7 @@ class ValvePort(Port):
 
 
 @dataclass(eq=True, frozen=True)
-class Valve(ThermalAppliance[ValveState, ValveControl, ValvePort]):
+class Valve(ThermalAppliance[ValveState, ValveControl, ValvePort], BatchSimulatable):
 
     def simulate(
         self,
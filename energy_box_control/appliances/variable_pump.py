@@ -1,10 +1,14 @@
 from dataclasses import dataclass
+
 from energy_box_control.appliances.base import (
     ThermalAppliance,
+    BatchSimulatable,
     ApplianceControl,
     ApplianceState,
     ThermalState,
     Port,
+    where,
+    clip,
 )
 from energy_box_control.time import ProcessTime
 from energy_box_control.units import LiterPerSecond
@@ -28,7 +32,8 @@ class VariablePumpControl(ApplianceControl):
 
 @dataclass(frozen=True, eq=True)
 class VariablePump(
-    ThermalAppliance[VariablePumpState, VariablePumpControl, VariablePumpPort]
+    ThermalAppliance[VariablePumpState, VariablePumpControl, VariablePumpPort],
+    BatchSimulatable,
 ):
     min_pressure: float
     max_pressure: float
@@ -44,18 +49,15 @@ class VariablePump(
     ) -> tuple[VariablePumpState, dict[VariablePumpPort, ThermalState]]:
         input = inputs[VariablePumpPort.IN]
 
-        if not control.on:
-            return VariablePumpState(), {
-                VariablePumpPort.OUT: ThermalState(0, input.temperature)
-            }
-
-        pressure = max(
-            min(control.requested_pressure, self.max_pressure), self.min_pressure
+        pressure = clip(
+            control.requested_pressure, self.min_pressure, self.max_pressure
         )
         ratio = (pressure - self.min_pressure) / (self.max_pressure - self.min_pressure)
 
         flow = self.min_flow + (self.max_flow - self.min_flow) * ratio
 
         return VariablePumpState(), {
-            VariablePumpPort.OUT: ThermalState(flow, input.temperature)
+            VariablePumpPort.OUT: ThermalState(
+                where(control.on, flow, 0), input.temperature
+            )
         }
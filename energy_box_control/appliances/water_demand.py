@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 from energy_box_control.appliances.base import (
     ThermalAppliance,
+    BatchSimulatable,
     ApplianceState,
     Port,
     ThermalState,
@@ -20,7 +21,9 @@ class WaterDemandPort(Port):
 
 
 @dataclass(frozen=True, eq=True)
-class WaterDemand(ThermalAppliance[WaterDemandState, None, WaterDemandPort]):
+class WaterDemand(
+    ThermalAppliance[WaterDemandState, None, WaterDemandPort], BatchSimulatable
+):
     water_demand_flow_schedule: Schedule[LiterPerSecond]
     freshwater_temperature_schedule: Schedule[Celsius]
 
@@ -1,10 +1,13 @@
 from dataclasses import dataclass
 from enum import Enum
+
 from energy_box_control.appliances.base import (
     ApplianceState,
+    BatchSimulatable,
     Port,
     ThermalAppliance,
     ThermalState,
+    where,
 )
 from energy_box_control.time import ProcessTime
 from energy_box_control.units import LiterPerSecond
@@ -30,7 +33,9 @@ class WaterMakerPort(Port):
 
 
 @dataclass(frozen=True, eq=True)
-class WaterMaker(ThermalAppliance[WaterMakerState, None, WaterMakerPort]):
+class WaterMaker(
+    ThermalAppliance[WaterMakerState, None, WaterMakerPort], BatchSimulatable
+):
     production_flow: LiterPerSecond
 
     def simulate(
@@ -40,14 +45,11 @@ class WaterMaker(ThermalAppliance[WaterMakerState, None, WaterMakerPort]):
         control: None,
         simulation_time: ProcessTime,
     ) -> tuple[WaterMakerState, dict[WaterMakerPort, ThermalState]]:
+        producing = previous_state.status == WaterMakerStatus.WATER_PRODUCTION
 
         return WaterMakerState(previous_state.status), {
             WaterMakerPort.DESALINATED_OUT: ThermalState(
-                (
-                    self.production_flow
-                    if previous_state.status == WaterMakerStatus.WATER_PRODUCTION
-                    else 0
-                ),
+                where(producing, self.production_flow, 0),
                 inputs[WaterMakerPort.IN].temperature,
             )
         }
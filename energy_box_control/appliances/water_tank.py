@@ -1,6 +1,9 @@
 from dataclasses import dataclass
+
+import numpy as np
 from energy_box_control.appliances.base import (
     ApplianceState,
+    BatchSimulatable,
     Port,
     ThermalAppliance,
     ThermalState,
@@ -29,7 +32,9 @@ class TankFullException(Exception):
 
 
 @dataclass(frozen=True, eq=True)
-class WaterTank(ThermalAppliance[WaterTankState, None, WaterTankPort]):
+class WaterTank(
+    ThermalAppliance[WaterTankState, None, WaterTankPort], BatchSimulatable
+):
     capacity: Liter
 
     def simulate(
@@ -39,52 +44,27 @@ class WaterTank(ThermalAppliance[WaterTankState, None, WaterTankPort]):
         control: None,
         simulation_time: ProcessTime,
     ) -> tuple[WaterTankState, dict[WaterTankPort, ThermalState]]:
-
-        delta_fill = (
+        delta_fill = sum(
             (
-                inputs[WaterTankPort.IN_0].flow * simulation_time.step_seconds
-                if WaterTankPort.IN_0 in inputs
-                else 0
-            )
-            - (
-                inputs[WaterTankPort.CONSUMPTION].flow * simulation_time.step_seconds
-                if WaterTankPort.CONSUMPTION in inputs
-                else 0
-            )
-            + (
-                inputs[WaterTankPort.IN_1].flow * simulation_time.step_seconds
-                if WaterTankPort.IN_1 in inputs
-                else 0
-            )
+                sign * inputs[port].flow * simulation_time.step_seconds
+                for port, sign in [
+                    (WaterTankPort.IN_0, 1),
+                    (WaterTankPort.CONSUMPTION, -1),
+                    (WaterTankPort.IN_1, 1),
+                ]
+                if port in inputs
+            ),
+            start=0,
         )
 
         new_fill = (previous_state.fill_ratio * self.capacity) + delta_fill
 
-        if not 0 < new_fill < self.capacity:
+        if not np.all((0 < new_fill) & (new_fill < self.capacity)):
             raise TankFullException(
                 f"The water tank has a new fill ({new_fill}) that exceeds the capacity ({self.capacity}) or is lower than 0"
             )
 
-        tank_temperature = (
-            (
-                (
-                    inputs[WaterTankPort.IN_0].temperature
-                    * inputs[WaterTankPort.IN_0].flow
-                    if WaterTankPort.IN_0 in inputs
-                    else (
-                        0
-                        + inputs[WaterTankPort.IN_1].temperature
-                        * inputs[WaterTankPort.IN_1].flow
-                        if WaterTankPort.IN_1 in inputs
-                        else 0
-                    )
-                )
-                / (inputs[WaterTankPort.IN_0].flow + inputs[WaterTankPort.IN_1].flow)
-            )
-            if not inputs
-            else DEFAULT_TEMPERATURE
-        )
-
+        # temperature mixing of the inflows is not modelled, tanks are assumed to be at a fixed temperature
         return WaterTankState(new_fill / self.capacity), {
-            WaterTankPort.OUT: ThermalState(0, tank_temperature)
+            WaterTankPort.OUT: ThermalState(0, DEFAULT_TEMPERATURE)
         }
@@ -1,10 +1,13 @@
 from dataclasses import dataclass
+
 from energy_box_control.appliances.base import (
     ApplianceControl,
+    BatchSimulatable,
     ApplianceState,
     Port,
     ThermalAppliance,
     ThermalState,
+    where,
 )
 from energy_box_control.schedules import Schedule
 from energy_box_control.time import ProcessTime
@@ -34,7 +37,8 @@ class WaterTreatmentPort(Port):
 
 @dataclass(frozen=True, eq=True)
 class WaterTreatment(
-    ThermalAppliance[WaterTreatmentState, WaterTreatmentControl, WaterTreatmentPort]
+    ThermalAppliance[WaterTreatmentState, WaterTreatmentControl, WaterTreatmentPort],
+    BatchSimulatable,
 ):
     pump_flow: LiterPerSecond
     freshwater_temperature_schedule: Schedule[Celsius]
@@ -46,16 +50,11 @@ class WaterTreatment(
         control: WaterTreatmentControl,
         simulation_time: ProcessTime,
     ) -> tuple[WaterTreatmentState, dict[WaterTreatmentPort, ThermalState]]:
-
         on = control.on if control else previous_state.on
+        flow = where(on, self.pump_flow, 0)
+        temperature = self.freshwater_temperature_schedule.at(simulation_time)
 
         return WaterTreatmentState(on), {
-            WaterTreatmentPort.IN: ThermalState(
-                self.pump_flow if on else 0,
-                self.freshwater_temperature_schedule.at(simulation_time),
-            ),
-            WaterTreatmentPort.OUT: ThermalState(
-                self.pump_flow if on else 0,
-                self.freshwater_temperature_schedule.at(simulation_time),
-            ),
+            WaterTreatmentPort.IN: ThermalState(flow, temperature),
+            WaterTreatmentPort.OUT: ThermalState(flow, temperature),
         }
@@ -0,0 +1,306 @@
+import hashlib
+import os
+import re
+import struct
+import zlib
+from dataclasses import dataclass, fields, replace
+from datetime import datetime, timedelta
+from enum import Enum
+from functools import cache
+from pathlib import Path
+from typing import Any, Callable, get_type_hints
+
+from energy_box_control.appliances.base import ThermalState
+from energy_box_control.custom_logging import get_logger
+from energy_box_control.network import Network, NetworkState
+from energy_box_control.time import ProcessTime
+
+logger = get_logger(__name__)
+
+MAGIC = b"PHCK"
+VERSION = 1
+CHECKPOINT_SUFFIX = ".checkpoint"
+
+# magic, version, layout hash, step, step size in seconds, length of the isoformat start time
+_HEADER = struct.Struct("<4sH8sqdH")
+_CRC = struct.Struct("<I")
+
+
+class CheckpointError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class _Field:
+    name: str
+    format: str
+    decode: Callable[[Any], Any]
+
+
+@cache
+def _fields_for_type(state_type: type) -> tuple[_Field, ...]:
+    hints = get_type_hints(state_type)
+
+    def _field(name: str) -> _Field:
+        hint = hints[name]
+        if hint is bool:
+            return _Field(name, "?", bool)
+        if hint is int:
+            return _Field(name, "q", int)
+        if hint is float:
+            return _Field(name, "d", float)
+        if isinstance(hint, type) and issubclass(hint, Enum):
+            return _Field(name, "q", hint)
+        raise CheckpointError(
+            f"can't checkpoint field {name} of type {hint} of {state_type.__name__}"
+        )
+
+    return tuple(_field(field.name) for field in fields(state_type) if field.init)
+
+
+def _encode(value: Any) -> Any:
+    return value.value if isinstance(value, Enum) else value
+
+
+@dataclass(frozen=True)
+class _Layout:
+    # appliance states and feedback signals by name, so checkpoints are portable between processes
+    states: tuple[tuple[str, tuple[_Field, ...]], ...]
+    signals: tuple[tuple[str, Any], ...]
+
+    @staticmethod
+    def of(network: Network[Any], state: NetworkState[Any]) -> "_Layout":
+        plan = network.execution_plan
+        named = [
+            (planned.name, planned.appliance)
+            for planned in plan.appliances
+            if planned.name is not None
+        ]
+        if len(named) != len(plan.appliances):
+            raise CheckpointError(
+                "only networks of named appliances can be checkpointed"
+            )
+        names = {appliance.id: name for name, appliance in named}
+        appliance_states = state.get_appliances_states()
+        signals = state.get_signal()
+        for (id, port), *_ in plan.feedback:
+            # signals are packed as the flow and temperature of a thermal state
+            if not isinstance(signal := signals.get((id, port)), ThermalState):
+                raise CheckpointError(
+                    f"can't checkpoint feedback signal {names[id]}.{port.value} of type {type(signal).__name__}"
+                )
+        return _Layout(
+            tuple(
+                (name, _fields_for_type(type(appliance_states[appliance.id])))
+                for name, appliance in sorted(named, key=lambda item: item[0])
+                if appliance_states.get(appliance.id) is not None
+            ),
+            tuple(
+                sorted(
+                    ((names[id], port) for (id, port), *_ in plan.feedback),
+                    key=lambda item: (item[0], item[1].value),
+                )
+            ),
+        )
+
+    @property
+    def format(self) -> struct.Struct:
+        return struct.Struct(
+            "<"
+            + "".join(field.format for _, state in self.states for field in state)
+            + "dd" * len(self.signals)
+        )
+
+    @property
+    def hash(self) -> bytes:
+        description = repr(
+            (
+                [
+                    (name, [(f.name, f.format) for f in state])
+                    for name, state in self.states
+                ],
+                [
+                    (name, port.value, ThermalState.__name__)
+                    for name, port in self.signals
+                ],
+            )
+        )
+        return hashlib.sha256(description.encode()).digest()[:8]
+
+
+def encode_checkpoint(network: Network[Any], state: NetworkState[Any]) -> bytes:
+    """Encodes the appliance states, feedback signals and time of a network state into a compact binary checkpoint"""
+    layout = _Layout.of(network, state)
+    values: list[Any] = []
+    for name, state_fields in layout.states:
+        appliance_state = state.appliance(getattr(network, name)).get()
+        values.extend(
+            _encode(getattr(appliance_state, field.name)) for field in state_fields
+        )
+    for name, port in layout.signals:
+        signal = state.connection(getattr(network, name), port)
+        values.extend((signal.flow, signal.temperature))
+
+    start = state.time.start.isoformat().encode()
+    body = (
+        _HEADER.pack(
+            MAGIC,
+            VERSION,
+            layout.hash,
+            state.time.step,
+            state.time.step_size.total_seconds(),
+            len(start),
+        )
+        + start
+        + layout.format.pack(*values)
+    )
+    return body + _CRC.pack(zlib.crc32(body))
+
+
+def decode_checkpoint[
+    Net: Network[Any]
+](network: Net, template: NetworkState[Net], data: bytes) -> NetworkState[Net]:
+    """Restores a network state from a checkpoint
+
+    The template provides the state types and any appliance state the checkpoint doesn't hold, normally the
+    network's initial state.
+    """
+    if len(data) < _HEADER.size + _CRC.size:
+        raise CheckpointError("checkpoint is truncated")
+    body, (crc,) = data[: -_CRC.size], _CRC.unpack(data[-_CRC.size :])
+    if zlib.crc32(body) != crc:
+        raise CheckpointError("checkpoint checksum mismatch")
+    magic, version, layout_hash, step, step_size, start_length = _HEADER.unpack_from(
+        body
+    )
+    if magic != MAGIC or version != VERSION:
+        raise CheckpointError(f"unsupported checkpoint format {magic!r} v{version}")
+    layout = _Layout.of(network, template)
+    if layout_hash != layout.hash:
+        raise CheckpointError("checkpoint was written for a different network layout")
+
+    offset = _HEADER.size + start_length
+    start = datetime.fromisoformat(body[_HEADER.size : offset].decode())
+    if len(body) - offset != layout.format.size:
+        raise CheckpointError("checkpoint is truncated")
+    values = iter(layout.format.unpack_from(body, offset))
+
+    state = NetworkState[Net](
+        ProcessTime(timedelta(seconds=step_size), step, start),
+        template.get_appliances_states(),
+        {},
+    )
+    for name, state_fields in layout.states:
+        appliance = getattr(network, name)
+        state = state.replace_state(
+            appliance,
+            replace(
+                template.appliance(appliance).get(),
+                **{field.name: field.decode(next(values)) for field in state_fields},
+            ),
+        )
+    for name, port in layout.signals:
+        state = state.replace_signal(
+            getattr(network, name), port, ThermalState(next(values), next(values))
+        )
+    return state
+
+
+def write_checkpoint(network: Network[Any], state: NetworkState[Any], path: Path):
+    # written next to the target and renamed, so a crash never leaves a partial checkpoint behind
+    temporary = path.with_name(f".{path.name}.tmp")
+    with open(temporary, "wb") as file:
+        file.write(encode_checkpoint(network, state))
+        file.flush()
+        os.fsync(file.fileno())
+    temporary.replace(path)
+
+
+def read_checkpoint[
+    Net: Network[Any]
+](network: Net, template: NetworkState[Net], path: Path) -> NetworkState[Net]:
+    return decode_checkpoint(network, template, path.read_bytes())
+
+
+_CHECKPOINT_NAME = re.compile(rf"(\d{{15}})-(\d{{4}}){re.escape(CHECKPOINT_SUFFIX)}")
+
+
+class CheckpointStore[Net: Network[Any]]:
+    """Periodic checkpoints of a network in a directory, keeping the newest few
+
+    Checkpoints are named by their simulated step and a sequence number for saves of the same step, so the newest
+    checkpoint is the one furthest into the simulation, whatever the wall clock did in between.
+    """
+
+    def __init__(self, directory: Path | str, network: Net, keep: int = 3):
+        self._directory = Path(directory)
+        self._network = network
+        self._keep = keep
+
+    def _named(self) -> list[tuple[tuple[int, int], Path]]:
+        if not self._directory.is_dir():
+            return []
+        named = (
+            (match, path)
+            for path in self._directory.glob(f"*{CHECKPOINT_SUFFIX}")
+            if (match := _CHECKPOINT_NAME.fullmatch(path.name))
+        )
+        return sorted(
+            (((int(match[1]), int(match[2])), path) for match, path in named),
+            reverse=True,
+        )
+
+    def checkpoints(self) -> list[Path]:
+        # newest first
+        return [path for _, path in self._named()]
+
+    def save(self, state: NetworkState[Net]) -> Path:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        step = state.time.step
+        sequence = max(
+            (
+                saved_sequence + 1
+                for (saved_step, saved_sequence), _ in self._named()
+                if saved_step == step
+            ),
+            default=0,
+        )
+        path = self._directory / f"{step:015d}-{sequence:04d}{CHECKPOINT_SUFFIX}"
+        write_checkpoint(self._network, state, path)
+        for old in self.checkpoints()[self._keep :]:
+            old.unlink(missing_ok=True)
+        return path
+
+    def restore(
+        self, template: NetworkState[Net], rebase: bool = False
+    ) -> NetworkState[Net] | None:
+        """Restores the newest valid checkpoint of a simulation starting at the start time of the template
+
+        Rebasing keeps the step and the state of the appliances, but moves the start back from the start of the
+        template by the restored steps, so the simulation picks up at the template's start, like a live simulation
+        that restarts after downtime. Without rebasing, a checkpoint of a simulation with another start is skipped.
+        """
+        for path in self.checkpoints():
+            try:
+                state = read_checkpoint(self._network, template, path)
+            except (CheckpointError, OSError, ValueError) as error:
+                logger.warning(f"skipping invalid checkpoint {path}: {error}")
+                continue
+            time = state.time
+            if rebase:
+                time = ProcessTime(
+                    time.step_size,
+                    time.step,
+                    template.time.start - time.step * time.step_size,
+                )
+                state = NetworkState[Net](
+                    time, state.get_appliances_states(), state.get_signal()
+                )
+            elif time.start != template.time.start:
+                logger.warning(
+                    f"skipping checkpoint {path} of a simulation starting at {time.start}, not {template.time.start}"
+                )
+                continue
+            logger.info(f"restored state at step {time.step} from {path}")
+            return state
+        return None
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Any, Literal
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -26,6 +27,22 @@ class PowerHubConfig(BaseSettings):
     )
     send_notifications: bool = Field(default=False)
     pagerduty_simulation_key: str = Field(default="")
+    simulation_checkpoint_directory: str = Field(default="")
+    simulation_checkpoint_interval: int = Field(default=300)
+    simulation_catch_up: bool = Field(default=False)
+    simulation_speed: float = Field(default=1, gt=0)
+    simulation_start: datetime | None = Field(default=None)
+    simulation_end: datetime | None = Field(default=None)
+    schedule_store_directory: str = Field(default="")
+    sensor_values_delta_encoding: bool = Field(default=False)
+    sensor_values_keyframe_interval: int = Field(default=60)
+    sensor_values_max_age: float = Field(default=0)
+    wire_format_topics: list[str] = Field(default=[])
+    enriched_sensor_values_properties: list[str] = Field(default=[])
+    control_instrumentation: bool = Field(default=False)
+    control_metrics_interval: int = Field(default=60)
+    control_metrics_host: str = Field(default="127.0.0.1")
+    control_metrics_port: int = Field(default=9464)
     pagerduty_mqtt_checker_key: str = Field(default="")
     pagerduty_control_app_key: str = Field(default="")
 
@@ -2,7 +2,10 @@ from abc import ABC
 from dataclasses import dataclass
 from datetime import datetime, time, timedelta
 from enum import Enum
-from typing import Callable
+import operator
+from typing import Any, Callable, Literal
+
+from energy_box_control.instrumentation import INSTRUMENTATION
 
 
 class State(Enum):
@@ -64,6 +67,9 @@ class Predicate[ControlState, Sensors](ABC):
     ) -> "Predicate[ControlState, Sensors]":
         return TimedPredicate(marker, self, duration)
 
+    def compile(self) -> "CompiledPredicate[ControlState, Sensors]":
+        return compile_predicate(self)
+
 
 @dataclass
 class BooleanOpPredicate[ControlState, Sensors](Predicate[ControlState, Sensors]):
@@ -146,15 +152,26 @@ class TimedPredicate[ControlState, Sensors](Predicate[ControlState, Sensors]):
         sensors: Sensors,
         time: datetime,
     ) -> bool:
-        holds = self.source.resolve(context, control_state, sensors, time)
-        if not holds:
-            return False
-        elif marked := context.previous(self.marker):
-            context.next(self.marker, marked)
-            return (time - marked) >= self.duration
-        else:
-            context.next(self.marker, time)
-            return False
+        return _holds_for(
+            context,
+            self.marker,
+            self.duration,
+            time,
+            self.source.resolve(context, control_state, sensors, time),
+        )
+
+
+def _holds_for(
+    context: Context, marker: Marker, duration: timedelta, time: datetime, holds: bool
+) -> bool:
+    if not holds:
+        return False
+    elif marked := context.previous(marker):
+        context.next(marker, marked)
+        return (time - marked) >= duration
+    else:
+        context.next(marker, time)
+        return False
 
 
 @dataclass
@@ -201,6 +218,9 @@ def _comp[
 @dataclass(eq=False)
 class Value[ControlState, Sensors, V: float | int | datetime | time]:
     fn: Callable[[ControlState, Sensors, datetime], V]
+    # what fn reads the value from: the function of the control state or sensors, or the constant
+    reads: Literal["state", "sensors", "const"] | None = None
+    source: Any = None
 
     def within(
         self: "Value[ControlState, Sensors, datetime]", duration: timedelta
@@ -217,12 +237,12 @@ class Value[ControlState, Sensors, V: float | int | datetime | time]:
     ) -> Predicate[ControlState, Sensors]:
         return ~NowIsBeforeTimeOfDayPredicate(self)
 
-    __lt__ = _comp(lambda a, b: a < b)
-    __le__ = _comp(lambda a, b: a <= b)
-    __gt__ = _comp(lambda a, b: a > b)
-    __ge__ = _comp(lambda a, b: a >= b)
-    __eq__: "Callable[[Value[Sensors, V], Value[Sensors, V]], Predicate[Sensors]]" = _comp(lambda a, b: a == b)  # type: ignore
-    __ne__: "Callable[[Value[Sensors, V], Value[Sensors, V]], Predicate[Sensors]]" = _comp(lambda a, b: a != b)  # type: ignore
+    __lt__ = _comp(operator.lt)
+    __le__ = _comp(operator.le)
+    __gt__ = _comp(operator.gt)
+    __ge__ = _comp(operator.ge)
+    __eq__: "Callable[[Value[Sensors, V], Value[Sensors, V]], Predicate[Sensors]]" = _comp(operator.eq)  # type: ignore
+    __ne__: "Callable[[Value[Sensors, V], Value[Sensors, V]], Predicate[Sensors]]" = _comp(operator.ne)  # type: ignore
 
 
 class Functions[ControlState, Sensors]:
@@ -232,15 +252,17 @@ class Functions[ControlState, Sensors]:
     def state[
         V: float | int | datetime | time
     ](self, fn: Callable[[ControlState], V]) -> Value[ControlState, Sensors, V]:
-        return Value(lambda control_state, _sensors, _time: fn(control_state))
+        return Value(
+            lambda control_state, _sensors, _time: fn(control_state), "state", fn
+        )
 
     def sensors[
         V: float | int
     ](self, fn: Callable[[Sensors], V]) -> Value[ControlState, Sensors, V]:
-        return Value(lambda _control_state, sensors, _time: fn(sensors))
+        return Value(lambda _control_state, sensors, _time: fn(sensors), "sensors", fn)
 
     def const[V: float | int](self, const: V) -> Value[ControlState, Sensors, V]:
-        return Value(lambda _control_state, _sensors, _time: const)
+        return Value(lambda _control_state, _sensors, _time: const, "const", const)
 
     def const_pred(self, const: bool) -> Predicate[ControlState, Sensors]:
         return self.pred(lambda _a, _b: const)
@@ -248,7 +270,113 @@ class Functions[ControlState, Sensors]:
     def pred(
         self, fn: Callable[[ControlState, Sensors], bool]
     ) -> Predicate[ControlState, Sensors]:
-        return FnPredicate(lambda control_state, sensors: fn(control_state, sensors))
+        return FnPredicate(fn)
+
+
+type CompiledPredicate[ControlState, Sensors] = Callable[
+    [Context, ControlState, Sensors, datetime], bool
+]
+
+_COMPARISONS: dict[Callable[[Any, Any], bool], str] = {
+    operator.lt: "<",
+    operator.le: "<=",
+    operator.gt: ">",
+    operator.ge: ">=",
+    operator.eq: "==",
+    operator.ne: "!=",
+}
+_BOOLEAN_OPS: dict[Callable[[bool, bool], bool], str] = {AND: "and", OR: "or"}
+
+
+class _PredicateCompiler:
+    def __init__(self):
+        self.names: dict[str, Any] = {
+            "_holds_for": _holds_for,
+            "_zero": timedelta(seconds=0),
+        }
+
+    def bind(self, value: Any) -> str:
+        name = f"_{len(self.names)}"
+        self.names[name] = value
+        return name
+
+    def value(self, value: Value[Any, Any, Any]) -> str:
+        if value.reads == "state":
+            return f"{self.bind(value.source)}(control_state)"
+        if value.reads == "sensors":
+            return f"{self.bind(value.source)}(sensors)"
+        if value.reads == "const":
+            return self.bind(value.source)
+        return f"{self.bind(value.fn)}(control_state, sensors, time)"
+
+    def predicate(self, pred: Predicate[Any, Any]) -> tuple[str, bool]:
+        """The expression of a predicate and whether it reads or writes the context"""
+        match pred:
+            case BooleanOpPredicate(left, op, right):
+                left_expression, left_context = self.predicate(left)
+                right_expression, right_context = self.predicate(right)
+                if op in _BOOLEAN_OPS and not right_context:
+                    return (
+                        f"({left_expression} {_BOOLEAN_OPS[op]} {right_expression})",
+                        left_context,
+                    )
+                # an operand that marks the context is evaluated regardless of the other
+                return (
+                    f"{self.bind(op)}({left_expression}, {right_expression})",
+                    left_context or right_context,
+                )
+            case CompareOpPredicate(left, op, right):
+                if op in _COMPARISONS:
+                    return (
+                        f"({self.value(left)} {_COMPARISONS[op]} {self.value(right)})",
+                        False,
+                    )
+                return (
+                    f"{self.bind(op)}({self.value(left)}, {self.value(right)})",
+                    False,
+                )
+            case NegatePredicate(source):
+                expression, uses_context = self.predicate(source)
+                return f"(not {expression})", uses_context
+            case FnPredicate(fn):
+                return f"{self.bind(fn)}(control_state, sensors)", False
+            case TimedPredicate(marker, source, duration):
+                expression, _ = self.predicate(source)
+                return (
+                    f"_holds_for(context, {self.bind(marker)}, {self.bind(duration)}, time, {expression})",
+                    True,
+                )
+            case WithinPredicate(since, duration):
+                return (
+                    f"(_zero < (time - {self.value(since)}) < {self.bind(duration)})",
+                    False,
+                )
+            case NowIsBeforeTimeOfDayPredicate(reference):
+                return f"(time.timetz() <= {self.value(reference)})", False
+            case _:
+                return (
+                    f"{self.bind(pred)}.resolve(context, control_state, sensors, time)",
+                    True,
+                )
+
+
+def compile_predicate[
+    ControlState, Sensors
+](pred: Predicate[ControlState, Sensors]) -> CompiledPredicate[ControlState, Sensors]:
+    """Compiles a predicate into a single function resolving it like Predicate.resolve
+
+    And and or short-circuit, except when their right operand marks the context, like holds_true, as the marker has
+    to be refreshed whenever the predicate is resolved. A short-circuited operand isn't evaluated at all, so the
+    functions of the control state and sensors in it shouldn't have side effects.
+    """
+    compiler = _PredicateCompiler()
+    expression, _ = compiler.predicate(pred)
+    source = f"def predicate(context, control_state, sensors, time):\n    return {expression}\n"
+    namespace = dict(compiler.names)
+    exec(compile(source, f"<predicate {type(pred).__name__}>", "exec"), namespace)
+    compiled = namespace["predicate"]
+    compiled.__doc__ = source
+    return compiled
 
 
 class StateMachine[States: State, ControlState, Sensors]:
@@ -265,6 +393,13 @@ class StateMachine[States: State, ControlState, Sensors]:
             a_transitions = self._state_transitions.get(a, [])
             a_transitions.append((b, pred))
             self._state_transitions[a] = a_transitions
+        self._compiled_transitions = {
+            a: [
+                (b, pred.compile(), (states.__name__, a.name, b.name))
+                for b, pred in a_transitions
+            ]
+            for a, a_transitions in self._state_transitions.items()
+        }
 
     def run(
         self,
@@ -274,8 +409,11 @@ class StateMachine[States: State, ControlState, Sensors]:
         sensors: Sensors,
         time: datetime,
     ) -> tuple[States, Context]:
-        for next_state, pred in self._state_transitions[current_state]:
-            if pred.resolve(context, control_state, sensors, time):
+        for next_state, pred, labels in self._compiled_transitions[current_state]:
+            fired = pred(context, control_state, sensors, time)
+            if INSTRUMENTATION.enabled:
+                INSTRUMENTATION.transition(labels, fired)
+            if fired:
                 return next_state, Context({})
 
         return current_state, context.flip()
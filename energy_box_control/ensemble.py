@@ -0,0 +1,244 @@
+from dataclasses import fields, is_dataclass, replace
+from numbers import Number
+from typing import Any, Sequence, cast
+
+import numpy as np
+
+from energy_box_control.appliances.base import BatchSimulatable, Port, Scenarios
+from energy_box_control.network import (
+    AnyAppliance,
+    ApplianceKey,
+    Network,
+    NetworkControl,
+    NetworkState,
+    PlannedAppliance,
+)
+from energy_box_control.schedules import Schedule, StackedSchedule
+from energy_box_control.time import ProcessTime
+
+
+def _stack(values: Sequence[Any]) -> Any:
+    first = values[0]
+    if first is None:
+        return None
+    if is_dataclass(first) and not isinstance(first, type):
+        return type(first)(
+            **{
+                field.name: np.array([getattr(value, field.name) for value in values])
+                for field in fields(first)
+                if field.init
+            }
+        )
+    return np.array(values)
+
+
+def _item(value: object, index: int) -> Any:
+    if isinstance(value, np.ndarray):
+        scenarios = cast(Scenarios, value)
+        value = scenarios[index] if scenarios.ndim else scenarios[()]
+    return cast(Any, value).item() if isinstance(value, np.generic) else value
+
+
+def _unstack(value: Any, index: int) -> Any:
+    if is_dataclass(value) and not isinstance(value, type):
+        return type(value)(
+            **{
+                field.name: _item(getattr(value, field.name), index)
+                for field in fields(value)
+                if field.init
+            }
+        )
+    return _item(value, index)
+
+
+def _stack_appliance(appliances: Sequence[AnyAppliance]) -> AnyAppliance:
+    stacked_fields: dict[str, Any] = {}
+    for field in fields(appliances[0]):
+        if not field.init:
+            continue
+        values = [getattr(appliance, field.name) for appliance in appliances]
+        if all(value == values[0] for value in values):
+            continue
+        if all(isinstance(value, Number) for value in values):
+            stacked_fields[field.name] = np.array(values)
+        elif all(hasattr(value, "at") for value in values):
+            schedules: tuple[Schedule[Any], ...] = tuple(values)
+            stacked_fields[field.name] = StackedSchedule(schedules)
+        else:
+            raise ValueError(
+                f"can't stack field {field.name} of {type(appliances[0]).__name__}"
+            )
+    return replace(appliances[0], **stacked_fields) if stacked_fields else appliances[0]
+
+
+class Ensemble[Net: Network[Any]]:
+    """Advances a number of scenarios of the same network in lockstep
+
+    Appliance states, controls and signals of the scenarios are stacked into arrays with one entry per scenario,
+    so batch simulatable appliances simulate all scenarios in one vectorized call.
+    """
+
+    def __init__(self, networks: Sequence[Net]):
+        if not networks:
+            raise ValueError("an ensemble needs at least one network")
+        self._networks = networks
+        self._template = networks[0]
+        structure = self._structure(self._template)
+        if any(self._structure(network) != structure for network in networks[1:]):
+            raise ValueError("networks in an ensemble need to have the same topology")
+
+        # scenarios are matched by appliance name, their execution orders may differ
+        self._scenario_appliances: dict[ApplianceKey, list[AnyAppliance]] = {
+            planned.appliance.id: [
+                getattr(network, cast(str, planned.name)) for network in networks
+            ]
+            for planned in self._template.execution_plan.appliances
+        }
+        self._scenario_ids: list[dict[ApplianceKey, ApplianceKey]] = [
+            {
+                id: appliances[index].id
+                for id, appliances in self._scenario_appliances.items()
+            }
+            for index in range(len(networks))
+        ]
+        self._stacked: dict[ApplianceKey, AnyAppliance] = {
+            id: _stack_appliance(appliances)
+            for id, appliances in self._scenario_appliances.items()
+            if isinstance(appliances[0], BatchSimulatable)
+        }
+
+    @staticmethod
+    def _structure(network: Network[Any]) -> tuple[Any, ...]:
+        plan = network.execution_plan
+        names = {planned.appliance.id: planned.name for planned in plan.appliances}
+        if None in names.values():
+            raise ValueError("appliances in an ensemble need to be network attributes")
+
+        def _named(key: tuple[ApplianceKey, Port]) -> tuple[str | None, Port]:
+            return names[key[0]], key[1]
+
+        return (
+            type(network),
+            frozenset(names.values()),
+            frozenset(
+                (
+                    _named((planned.appliance.id, output.port)),
+                    _named((output.target[2].id, output.target[3])),
+                )
+                for planned in plan.appliances
+                for output in planned.outputs.values()
+                if output.target is not None
+            ),
+            frozenset(
+                (_named(source), _named(plan.signal_keys[signal_slot]))
+                for source, _, _, signal_slot in plan.feedback
+            ),
+        )
+
+    def __len__(self) -> int:
+        return len(self._networks)
+
+    def stack_states(self, states: Sequence[NetworkState[Net]]) -> NetworkState[Net]:
+        if len(states) != len(self):
+            raise ValueError(f"expected {len(self)} states, got {len(states)}")
+        if any(state.time != states[0].time for state in states):
+            raise ValueError("states in an ensemble need to be at the same time")
+        template_ids = self._scenario_ids[0].keys()
+        return NetworkState(
+            states[0].time,
+            {
+                id: _stack(
+                    [
+                        state.get_appliances_states()[ids[id]]
+                        for state, ids in zip(states, self._scenario_ids)
+                    ]
+                )
+                for id in template_ids
+            },
+            {
+                (id, port): _stack(
+                    [
+                        state.get_signal()[(ids[id], port)]
+                        for state, ids in zip(states, self._scenario_ids)
+                    ]
+                )
+                for id, port in states[0].get_signal()
+                if id in template_ids
+            },
+        )
+
+    def stack_controls(
+        self, controls: Sequence[NetworkControl[Net]]
+    ) -> NetworkControl[Net]:
+        if len(controls) != len(self):
+            raise ValueError(f"expected {len(self)} controls, got {len(controls)}")
+        return NetworkControl(
+            {
+                id: _stack(
+                    [
+                        control.appliance(appliances[index]).get()
+                        for index, control in enumerate(controls)
+                    ]
+                )
+                for id, appliances in self._scenario_appliances.items()
+                if any(
+                    control.appliance(appliances[index]).get() is not None
+                    for index, control in enumerate(controls)
+                )
+            }
+        )
+
+    def unstack_state(self, state: NetworkState[Net]) -> list[NetworkState[Net]]:
+        return [
+            NetworkState(
+                state.time,
+                {
+                    ids[id]: _unstack(value, index)
+                    for id, value in state.get_appliances_states().items()
+                },
+                {
+                    (ids[id], port): _unstack(signal, index)
+                    for (id, port), signal in state.get_signal().items()
+                },
+            )
+            for index, ids in enumerate(self._scenario_ids)
+        ]
+
+    def _simulate_appliance(
+        self,
+        planned: PlannedAppliance,
+        inputs: dict[Port, Any],
+        previous_state: Any,
+        control: Any,
+        simulation_time: ProcessTime,
+    ) -> tuple[Any, dict[Any, Any]]:
+        stacked = self._stacked.get(planned.appliance.id, None)
+        if stacked is not None:
+            return stacked.simulate(inputs, previous_state, control, simulation_time)
+
+        results = [
+            appliance.simulate(
+                {port: _unstack(signal, index) for port, signal in inputs.items()},
+                _unstack(previous_state, index),
+                _unstack(control, index),
+                simulation_time,
+            )
+            for index, appliance in enumerate(
+                self._scenario_appliances[planned.appliance.id]
+            )
+        ]
+        ports = results[0][1].keys()
+        if any(outputs.keys() != ports for _, outputs in results):
+            raise Exception(
+                f"{planned.name} has different outputs between scenarios, which can't be simulated in lockstep"
+            )
+        return _stack([state for state, _ in results]), {
+            port: _stack([outputs[port] for _, outputs in results]) for port in ports
+        }
+
+    def simulate(
+        self, state: NetworkState[Net], controls: NetworkControl[Net]
+    ) -> NetworkState[Net]:
+        return self._template.execution_plan.run(
+            state, controls, self._simulate_appliance
+        )
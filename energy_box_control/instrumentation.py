@@ -0,0 +1,214 @@
+import asyncio
+import json
+from bisect import bisect_left
+from contextlib import nullcontext
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any, ContextManager
+
+from energy_box_control.time import time_ms
+
+# upper bounds in seconds, the last bucket holds everything above them
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """Counts of the values up to and including each bound, ending with all values at an infinite bound"""
+        result: list[tuple[float, int]] = []
+        total = 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+@dataclass
+class TransitionCount:
+    evaluated: int = 0
+    fired: int = 0
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = perf_counter()
+
+    def __exit__(self, *_: Any):
+        self.histogram.observe(perf_counter() - self.start)
+
+
+_NOT_TIMED = nullcontext()
+
+
+class Instrumentation:
+    """Latency histograms of the stages of a control cycle and counts of the state machine transitions
+
+    Disabled instrumentation records nothing, a disabled stage is a shared no-op context manager. Counts are
+    cumulative from the moment instrumentation is enabled, like Prometheus counters.
+    """
+
+    def __init__(
+        self, enabled: bool = False, buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        self.enabled = enabled
+        self.buckets = buckets
+        self.stages: dict[str, Histogram] = {}
+        self.transitions: dict[tuple[str, str, str], TransitionCount] = {}
+        self.events: dict[str, int] = {}
+
+    def stage(self, name: str) -> ContextManager[Any]:
+        """Times the block it is used in, using a monotonic clock"""
+        if not self.enabled:
+            return _NOT_TIMED
+        return _Timer(self._histogram(name))
+
+    def observe(self, name: str, seconds: float):
+        if self.enabled:
+            self._histogram(name).observe(seconds)
+
+    def _histogram(self, name: str) -> Histogram:
+        if (histogram := self.stages.get(name)) is None:
+            histogram = self.stages[name] = Histogram(self.buckets)
+        return histogram
+
+    def transition(self, labels: tuple[str, str, str], fired: bool):
+        """Counts an evaluation of the transition of a state machine, labelled as (machine, from, to)"""
+        if (count := self.transitions.get(labels)) is None:
+            count = self.transitions[labels] = TransitionCount()
+        count.evaluated += 1
+        count.fired += fired
+
+    def count(self, event: str, times: int = 1):
+        if self.enabled:
+            self.events[event] = self.events.get(event, 0) + times
+
+    def reset(self):
+        self.stages.clear()
+        self.transitions.clear()
+        self.events.clear()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "time": time_ms(),
+            "stages": {
+                name: {
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "buckets": list(self.buckets),
+                    "counts": histogram.counts,
+                }
+                for name, histogram in self.stages.items()
+            },
+            "transitions": [
+                {
+                    "machine": machine,
+                    "from": source,
+                    "to": target,
+                    "evaluated": count.evaluated,
+                    "fired": count.fired,
+                }
+                for (machine, source, target), count in self.transitions.items()
+            ],
+            "events": self.events,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    def to_prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP power_hub_stage_seconds Duration of a stage of the control cycle",
+            "# TYPE power_hub_stage_seconds histogram",
+        ]
+        for name, histogram in self.stages.items():
+            for bound, count in histogram.cumulative():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f'power_hub_stage_seconds_bucket{{stage="{name}",le="{le}"}} {count}'
+                )
+            lines.append(
+                f'power_hub_stage_seconds_sum{{stage="{name}"}} {histogram.sum!r}'
+            )
+            lines.append(
+                f'power_hub_stage_seconds_count{{stage="{name}"}} {histogram.count}'
+            )
+        for metric, help in (
+            ("evaluated", "Evaluations of the predicate of a state machine transition"),
+            ("fired", "Transitions taken by a state machine"),
+        ):
+            lines.append(f"# HELP power_hub_transitions_{metric}_total {help}")
+            lines.append(f"# TYPE power_hub_transitions_{metric}_total counter")
+            for (machine, source, target), count in self.transitions.items():
+                lines.append(
+                    f'power_hub_transitions_{metric}_total{{machine="{machine}",from="{source}",to="{target}"}} {getattr(count, metric)}'
+                )
+        lines.append(
+            "# HELP power_hub_events_total Occurrences of an event in the control app"
+        )
+        lines.append("# TYPE power_hub_events_total counter")
+        for event, count in self.events.items():
+            lines.append(f'power_hub_events_total{{event="{event}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+INSTRUMENTATION = Instrumentation()
+
+
+async def serve_metrics(
+    instrumentation: Instrumentation, host: str, port: int
+) -> asyncio.Server:
+    """Serves the metrics in the Prometheus text format on GET /metrics"""
+
+    async def respond(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+            method, path, *_ = request.split(b"\r\n", 1)[0].split(b" ")
+            if method == b"GET" and path == b"/metrics":
+                status = "200 OK"
+                body = instrumentation.to_prometheus().encode()
+            else:
+                status, body = "404 Not Found", b""
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(respond, host, port)
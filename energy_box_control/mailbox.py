@@ -0,0 +1,33 @@
+import asyncio
+
+
+class Mailbox[T]:
+    """Holds the latest value put under each key until they are taken together
+
+    A value put under a key that wasn't taken yet replaces the earlier one, so a slow consumer always acts on the
+    newest values instead of working through a backlog.
+    """
+
+    def __init__(self):
+        self._values: dict[str, T] = {}
+        self._event = asyncio.Event()
+        self.replaced = 0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def put(self, key: str, value: T):
+        if key in self._values:
+            self.replaced += 1
+        self._values[key] = value
+        self._event.set()
+
+    def take_nowait(self) -> dict[str, T]:
+        self._event.clear()
+        values, self._values = self._values, {}
+        return values
+
+    async def take(self) -> dict[str, T]:
+        """Waits for at least one value and takes all values put since the last take"""
+        await self._event.wait()
+        return self.take_nowait()
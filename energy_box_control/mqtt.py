@@ -115,7 +115,7 @@ def publish_value_to_mqtt(
 def publish_to_mqtt(
     client: mqtt_client.Client,
     topic: str,
-    json_str: str,
+    json_str: str | bytes,
     notifier: Notifier,
 ) -> MQTTMessageInfo:
     result = client.publish(topic, json_str, qos=1)
@@ -3,14 +3,15 @@
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, replace
-from enum import Enum
 from typing import (
     Any,
     Callable,
     Generic,
     Iterable,
+    Mapping,
     Self,
     TypeVar,
+    Protocol,
     TypeVarTuple,
     cast,
     overload,
@@ -30,6 +31,7 @@ from energy_box_control.appliances.base import (
 )
 from energy_box_control.time import ProcessTime
 from energy_box_control.linearize import linearize
+from energy_box_control.persistent_map import PersistentMap
 
 # This file uses some fancy Self type hints to ensure the Appliance and ApplianceState are kept in sync
 AnyAppliance = Appliance[Any, Any, Any, Any, Any]
@@ -46,6 +48,8 @@ ToPort = TypeVar("ToPort", bound=Port)
 From = TypeVar("From", bound=AnyAppliance, covariant=True)
 To = TypeVar("To", bound=AnyAppliance, covariant=True)
 ToControl = TypeVar("ToControl", bound=GenericControl)
+# State and control maps are keyed by appliance id; hashing the frozen appliance dataclasses hashes all their fields, schedules included
+ApplianceKey = uuid.UUID
 
 
 class StateGetter[App: AnyAppliance]:
@@ -66,50 +70,90 @@ class StateGetter[App: AnyAppliance]:
         )  # cast should be safe; State and App are bound together
 
 
+@dataclass(frozen=True)
+class NetworkStateDiff:
+    # (before, after) per changed entry, None when the entry is missing
+    appliance_states: dict[ApplianceKey, tuple[Any, Any]]
+    signals: dict[tuple[ApplianceKey, Port], tuple[Any, Any]]
+
+    def __bool__(self) -> bool:
+        return bool(self.appliance_states or self.signals)
+
+
 class NetworkState(Generic[Net]):
     def __init__(
         self,
         time: ProcessTime,
-        appliance_state: dict[AnyAppliance, ApplianceState | None],
-        signals: dict[tuple[AnyAppliance, Port], Any] = {},
+        appliance_state: Mapping[ApplianceKey, ApplianceState | None],
+        signals: Mapping[tuple[ApplianceKey, Port], Any] = {},
     ):
-        self._appliance_state = appliance_state
-        self._signals = signals
+        self._appliance_state: Mapping[ApplianceKey, ApplianceState | None] = (
+            appliance_state
+        )
+        self._signals: Mapping[tuple[ApplianceKey, Port], Any] = signals
         self._time = time
 
     def get_appliances_states(
         self,
-    ) -> dict[AnyAppliance, ApplianceState | None]:
+    ) -> Mapping[ApplianceKey, ApplianceState | None]:
         return self._appliance_state
 
     def get_signal(
         self,
-    ) -> dict[tuple[AnyAppliance, Port], Any]:
+    ) -> Mapping[tuple[ApplianceKey, Port], Any]:
         return self._signals
 
+    def _persistent_maps(
+        self,
+    ) -> tuple[
+        PersistentMap[ApplianceKey, ApplianceState | None],
+        PersistentMap[tuple[ApplianceKey, Port], Any],
+    ]:
+        # converted once, so every state branched off this one shares its maps
+        appliance_state = PersistentMap.of(self._appliance_state)
+        signals = PersistentMap.of(self._signals)
+        self._appliance_state, self._signals = appliance_state, signals
+        return appliance_state, signals
+
     def appliance[App: AnyAppliance](self, appliance: App) -> StateGetter[App]:
-        return StateGetter(appliance, self._appliance_state[appliance])
+        # the getter binds the state type to the appliance type, which the constructor can't express
+        return cast(
+            StateGetter[App],
+            StateGetter(appliance, self._appliance_state[appliance.id]),
+        )
 
     def replace_signal[
         App: AnyAppliance
     ](self, appliance: App, port: Port, value: Any) -> "NetworkState[Net]":
+        appliance_state, signals = self._persistent_maps()
         return NetworkState(
-            self._time,
-            self._appliance_state,
-            {**self._signals, (appliance, port): value},
+            self._time, appliance_state, signals.set((appliance.id, port), value)
         )
 
     def replace_state[
         App: AnyAppliance
     ](self, appliance: App, value: ApplianceState) -> "NetworkState[Net]":
+        appliance_state, signals = self._persistent_maps()
         return NetworkState(
-            self._time,
-            {**self._appliance_state, appliance: value},
-            self._signals,
+            self._time, appliance_state.set(appliance.id, value), signals
+        )
+
+    def diff(self, other: "NetworkState[Any]") -> NetworkStateDiff:
+        appliance_state, signals = self._persistent_maps()
+        other_appliance_state, other_signals = other._persistent_maps()
+        return NetworkStateDiff(
+            {
+                key: (appliance_state.get(key), other_appliance_state.get(key))
+                for key in appliance_state.changed_keys(other_appliance_state)
+            },
+            {
+                key: (signals.get(key), other_signals.get(key))
+                for key in signals.changed_keys(other_signals)
+            },
         )
 
     def has_connection(self, appliance: AnyAppliance, port: Port) -> bool:
-        return (appliance, port) in self._signals
+        return (appliance.id, port) in self._signals
 
     @overload
     def connection(self, appliance: AnyAppliance, port: Port) -> Any: ...
@@ -121,9 +165,9 @@ class NetworkState(Generic[Net]):
         T
     ](self, appliance: AnyAppliance, port: Port, default: T | None = None) -> Any | T:
         if default:
-            return self._signals.get((appliance, port), default)
+            return self._signals.get((appliance.id, port), default)
 
-        return self._signals[(appliance, port)]
+        return self._signals[(appliance.id, port)]
 
     @property
     def time(self) -> ProcessTime:
@@ -169,25 +213,27 @@ class NetworkStateBuilder(Generic[Net, *Prev]):
         )
         order = self._network.connections().execution_order()
 
-        without_states = {app: None for app in order if not has_appliance_state(app)}
-        appliance_states: dict[SpecificAppliance, GenericState] = {
-            **dict(entry for entry in state if len(entry) == 2),
+        without_states = {app.id: None for app in order if not has_appliance_state(app)}
+        appliance_states: dict[ApplianceKey, GenericState] = {
+            **{entry[0].id: entry[1] for entry in state if len(entry) == 2},
             **without_states,
         }
 
-        missing_appliances = set(order) - set(appliance_states.keys())
+        missing_appliances = {app.id for app in order} - appliance_states.keys()
         if missing_appliances:
             raise Exception(
-                f"missing states for {[self._network.find_appliance_name_by_id(missing.id) for missing in missing_appliances]}"
+                f"missing states for {[self._network.find_appliance_name_by_id(missing) for missing in missing_appliances]}"
             )
 
         connections = [entry for entry in state if len(entry) == 3]
-        feedbacks = dict(((app, port), state) for app, port, state in connections)
-        missing_feedbacks = set(self._network.feedback().port_mapping().keys()) - set(
-            feedbacks.keys()
-        )
+        feedbacks = {(app.id, port): state for app, port, state in connections}
+        missing_feedbacks = {
+            (app.id, port) for app, port in self._network.feedback().port_mapping()
+        } - feedbacks.keys()
         if missing_feedbacks:
-            raise Exception(f"missing feedback states for {missing_feedbacks}")
+            raise Exception(
+                f"missing feedback states for {[(self._network.find_appliance_name_by_id(id), port) for id, port in missing_feedbacks]}"
+            )
 
         return NetworkState[Net](time, appliance_states, feedbacks)
 
@@ -408,16 +454,18 @@ class ControlGetter[App: AnyAppliance]:
 
 class NetworkControl[Net: "Network[Any]"]:
 
-    def __init__(self, controls: dict[AnyAppliance, GenericControl]):
+    def __init__(self, controls: dict[ApplianceKey, GenericControl]):
         self._controls = controls
 
     def appliance[App: AnyAppliance](self, app: App) -> ControlGetter[App]:
-        return ControlGetter(app, self._controls.get(app, None))
+        return cast(
+            ControlGetter[App], ControlGetter(app, self._controls.get(app.id, None))
+        )
 
     def name_to_control_values_mapping(self, network: Net) -> dict[str, GenericControl]:
         return {
-            network.find_appliance_name_by_id(item.id): value
-            for item, value in self._controls.items()
+            network.find_appliance_name_by_id(id): value
+            for id, value in self._controls.items()
         }
 
     def __eq__(self, value: object) -> bool:
@@ -428,7 +476,7 @@ class NetworkControl[Net: "Network[Any]"]:
     def replace_control(
         self, app: AnyAppliance, attr_to_replace: str, value: float | bool | int
     ) -> "NetworkControl[Net]":
-        return NetworkControl({**self._controls, app: replace(self._controls[app], **{attr_to_replace: value})})  # type: ignore
+        return NetworkControl({**self._controls, app.id: replace(self._controls[app.id], **{attr_to_replace: value})})  # type: ignore
 
 
 class ControlBuilder[Net: "Network[Any]", *Prev]:
@@ -450,8 +498,14 @@ class ControlBuilder[Net: "Network[Any]", *Prev]:
         return ControlBuilder(*self._prev, *other._prev)
 
     def build(self) -> NetworkControl[Net]:
-        control = dict(cast(Iterable[tuple[AnyAppliance, GenericControl]], self._prev))
-        return NetworkControl(control)
+        return NetworkControl(
+            {
+                app.id: control
+                for app, control in cast(
+                    Iterable[tuple[AnyAppliance, GenericControl]], self._prev
+                )
+            }
+        )
 
 
 class ControlApplianceBuilder[Net: "Network[Any]", App: AnyAppliance, *Prev]:
@@ -586,19 +640,225 @@ class NetworkFeedbacks[Net: "Network[Any]"]:
         return self._feedbacks
 
 
-class EnummedDict[T: Enum]:
-    def __init__(self, source: dict[T, Any], enum: type[T]) -> None:
-        self._source = source
-        self._enum = enum
+_MISSING: Any = object()
+
+
+@dataclass(frozen=True)
+class PlannedOutput:
+    port: Port
+    signal_slot: int
+    target: "tuple[int, int, AnyAppliance, Port] | None"
+
+
+@dataclass(frozen=True)
+class PlannedAppliance:
+    appliance: SpecificAppliance
+    name: str | None
+    inputs: tuple[tuple[Port, int], ...]
+    outputs: dict[Port | str, PlannedOutput]
+
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """Flat, slot indexed form of a network's execution order and port mappings
+
+    Every (appliance, port) pair that can carry a signal gets a signal slot and every connected input port gets an input slot,
+    so a simulation step only needs to index lists instead of rebuilding dictionaries.
+    """
+
+    signal_keys: tuple[tuple[ApplianceKey, Port], ...]
+    input_count: int
+    # (source key, source signal slot, target input slot, target signal slot)
+    feedback: tuple[tuple[tuple[ApplianceKey, Port], int, int, int], ...]
+    appliances: tuple[PlannedAppliance, ...]
+
+    @staticmethod
+    def compile(
+        execution_order: list[SpecificAppliance],
+        port_mapping: dict[tuple[SpecificAppliance, Port], tuple[AnyAppliance, Port]],
+        feedback_port_mapping: dict[
+            tuple[SpecificAppliance, Port], tuple[AnyAppliance, Port]
+        ],
+        names: dict[ApplianceKey, str],
+    ) -> "ExecutionPlan":
+        signal_slots: dict[tuple[ApplianceKey, Port], int] = {}
+        input_slots: dict[tuple[ApplianceKey, Port], int] = {}
+
+        def _signal_slot(app: AnyAppliance, port: Port) -> int:
+            return signal_slots.setdefault((app.id, port), len(signal_slots))
+
+        def _input_slot(app: AnyAppliance, port: Port) -> int:
+            _signal_slot(app, port)
+            return input_slots.setdefault((app.id, port), len(input_slots))
+
+        feedback = tuple(
+            (
+                (from_app.id, from_port),
+                _signal_slot(from_app, from_port),
+                _input_slot(*target),
+                _signal_slot(*target),
+            )
+            for (from_app, from_port), target in feedback_port_mapping.items()
+        )
+        for target in port_mapping.values():
+            _input_slot(*target)
+
+        appliances: list[PlannedAppliance] = []
+        for appliance in execution_order:
+            port_class = port_for_appliance(appliance)
+            outputs: dict[Port | str, PlannedOutput] = {}
+            for port in port_class:
+                target = port_mapping.get((appliance, port), None)
+                output = PlannedOutput(
+                    port,
+                    _signal_slot(appliance, port),
+                    (
+                        (
+                            input_slots[(target[0].id, target[1])],
+                            signal_slots[(target[0].id, target[1])],
+                            *target,
+                        )
+                        if target is not None
+                        else None
+                    ),
+                )
+                outputs[port] = output
+                outputs[port.value] = output
+            appliances.append(
+                PlannedAppliance(
+                    appliance,
+                    names.get(appliance.id, None),
+                    tuple(
+                        (port, slot)
+                        for (id, port), slot in input_slots.items()
+                        if id == appliance.id
+                    ),
+                    outputs,
+                )
+            )
+
+        return ExecutionPlan(
+            tuple(signal_slots.keys()), len(input_slots), feedback, tuple(appliances)
+        )
+
+    def step(
+        self,
+        states: list[Any],
+        signals: list[Any],
+        controls: list[Any],
+        time: ProcessTime,
+        simulate_appliance: Callable[
+            [PlannedAppliance, dict[Port, Any], Any, Any, ProcessTime],
+            tuple[Any, dict[Any, Any]],
+        ],
+        check_signal: Callable[[Any, str | None, Port], None] | None = None,
+    ):
+        # states and controls are indexed like appliances, signals like signal_keys; states and signals are updated in place
+        inputs: list[Any] = [_MISSING] * self.input_count
+        feedback = [signals[source_slot] for _, source_slot, _, _ in self.feedback]
+        signals[:] = [_MISSING] * len(self.signal_keys)
+
+        # copy feedback into connection states
+        for (_, _, input_slot, signal_slot), signal in zip(self.feedback, feedback):
+            inputs[input_slot] = signal
+            signals[signal_slot] = signal
+
+        for index, planned in enumerate(self.appliances):
+            states[index], outputs = simulate_appliance(
+                planned,
+                {
+                    port: inputs[slot]
+                    for port, slot in planned.inputs
+                    if inputs[slot] is not _MISSING
+                },
+                states[index],
+                controls[index],
+                time,
+            )
+            for port, signal in outputs.items():
+                output = planned.outputs[port]
+                signals[output.signal_slot] = signal
+                if check_signal is not None:
+                    check_signal(signal, planned.name, output.port)
+                if output.target is not None:
+                    input_slot, signal_slot, to_app, to_port = output.target
+                    if inputs[input_slot] is not _MISSING:
+                        raise Exception(
+                            f"{to_app} at port {to_port} already has an input"
+                        )
+                    inputs[input_slot] = signal
+                    signals[signal_slot] = signal
+
+    def buffers(self, state: "NetworkState[Any]") -> tuple[list[Any], list[Any]]:
+        # only the feedback signals of the previous step are read
+        previous_signals = state.get_signal()
+        signals: list[Any] = [_MISSING] * len(self.signal_keys)
+        for key, source_slot, _, _ in self.feedback:
+            signals[source_slot] = previous_signals[key]
+        return [
+            state.appliance(planned.appliance).get() for planned in self.appliances
+        ], signals
+
+    def controls(self, controls: "NetworkControl[Any]") -> list[Any]:
+        return [
+            controls.appliance(planned.appliance).get() for planned in self.appliances
+        ]
+
+    def to_state(
+        self, time: ProcessTime, states: list[Any], signals: list[Any]
+    ) -> "NetworkState[Any]":
+        return NetworkState(
+            time,
+            {
+                planned.appliance.id: state
+                for planned, state in zip(self.appliances, states)
+            },
+            {
+                self.signal_keys[slot]: signal
+                for slot, signal in enumerate(signals)
+                if signal is not _MISSING
+            },
+        )
+
+    def run(
+        self,
+        state: "NetworkState[Any]",
+        controls: "NetworkControl[Any]",
+        simulate_appliance: Callable[
+            [PlannedAppliance, dict[Port, Any], Any, Any, ProcessTime],
+            tuple[Any, dict[Any, Any]],
+        ],
+        check_signal: Callable[[Any, str | None, Port], None] | None = None,
+    ) -> "NetworkState[Any]":
+        states, signals = self.buffers(state)
+        self.step(
+            states,
+            signals,
+            self.controls(controls),
+            state.time,
+            simulate_appliance,
+            check_signal,
+        )
+        return self.to_state(_next_time(state.time), states, signals)
+
+
+def _next_time(time: ProcessTime) -> ProcessTime:
+    # cheaper than dataclasses.replace, which goes through the fields of the dataclass
+    return ProcessTime(time.step_size, time.step + 1, time.start)
 
-    def __getitem__(self, key: T | str) -> Any:
-        if key in self._source:
-            return self._source[key]
-        else:
-            return self._source[self._enum(key)]  # type: ignore
 
-    def __contains__(self, key: T | str) -> bool:
-        return key in self._source or self._enum(key) in self._source
+def _simulate_appliance(
+    planned: PlannedAppliance,
+    inputs: dict[Port, Any],
+    previous_state: Any,
+    control: Any,
+    simulation_time: ProcessTime,
+) -> tuple[Any, dict[Any, Any]]:
+    return planned.appliance.simulate(inputs, previous_state, control, simulation_time)
+
+
+class StateRecorder(Protocol):
+    def record(self, state: NetworkState[Any]) -> None: ...
 
 
 class Network[Sensors](ABC):
@@ -612,29 +872,26 @@ class Network[Sensors](ABC):
         self._feedback_port_mapping: dict[
             tuple[SpecificAppliance, Port], tuple[AnyAppliance, Port]
         ] = feedback.port_mapping()
+        self._plan = ExecutionPlan.compile(
+            self._execution_order,
+            self._port_mapping,
+            self._feedback_port_mapping,
+            {
+                value.id: name
+                for name, value in vars(self).items()
+                if isinstance(value, Appliance)
+            },
+        )
+
+    @property
+    def execution_plan(self) -> ExecutionPlan:
+        return self._plan
 
     def connect[
         From: AnyAppliance
     ](self, from_app: From) -> ApplianceConnector[Self, From]:
         return ApplianceConnector(from_app)
 
-    def _map_feedback(
-        self, state: NetworkState[Self]
-    ) -> dict[SpecificAppliance, dict[Port, Any]]:
-        inputs: dict[SpecificAppliance, dict[Port, Any]] = {}
-        for (from_app, from_port), (
-            to_app,
-            to_port,
-        ) in self._feedback_port_mapping.items():
-            input: dict[Port, Any] | None = inputs.get(to_app, None)
-            if input is None:
-                input = {}
-                inputs[to_app] = input
-
-            input[to_port] = state.connection(from_app, from_port)
-
-        return inputs
-
     def find_appliance_name_by_id(self, id: uuid.UUID) -> str:
         for name, appliance in self.__dict__.items():
             if appliance.id == id:
@@ -657,61 +914,79 @@ class Network[Sensors](ABC):
                 f"{signal} is not within {min_temperature} and {max_temperature}, at appliance {appliance_name} and port {port.value}"
             )
 
+    def _signal_checker(
+        self, min_max_temperature: tuple[int, int] | None
+    ) -> Callable[[Any, str | None, Port], None] | None:
+        if min_max_temperature is None:
+            return None
+
+        def check_signal(signal: Any, appliance_name: str | None, port: Port):
+            if isinstance(signal, ThermalState):
+                self.check_temperatures(
+                    min_max_temperature, signal, appliance_name, port
+                )
+
+        return check_signal
+
     def simulate(
         self,
         state: NetworkState[Self],
         controls: NetworkControl[Self],
         min_max_temperature: tuple[int, int] | None = None,
+        recorder: StateRecorder | None = None,
     ) -> NetworkState[Self]:
-        port_inputs: dict[SpecificAppliance, dict[Port, Any]] = self._map_feedback(
-            state
+        next_state = self._plan.run(
+            state,
+            controls,
+            _simulate_appliance,
+            self._signal_checker(min_max_temperature),
         )
-        appliance_states: dict[SpecificAppliance, GenericState] = {}
-        signals: dict[tuple[SpecificAppliance, Port], Any] = {}
+        if recorder is not None:
+            recorder.record(next_state)
+        return next_state
 
-        # copy feedback into connection states
-        for appliance, mapping in port_inputs.items():
-            for port, signal in mapping.items():
-                signals[(appliance, port)] = signal
-
-        for appliance in self._execution_order:
-            appliance_state = state.appliance(appliance).get()
-            port_class = port_for_appliance(appliance)
-            new_appliance_state, outputs = appliance.simulate(
-                EnummedDict(port_inputs.get(appliance, {}), port_class),
-                appliance_state,
-                controls.appliance(appliance).get(),
-                state.time,
+    def run(
+        self,
+        state: NetworkState[Self],
+        controls: NetworkControl[Self],
+        steps: int,
+        control_fn: Callable[[Sensors], NetworkControl[Self]] | None = None,
+        recorder: StateRecorder | None = None,
+        record_every: int = 1,
+        min_max_temperature: tuple[int, int] | None = None,
+    ) -> NetworkState[Self]:
+        """Simulates a number of steps, keeping the working state in flat buffers
+
+        A NetworkState is only built for the result, for the recorder every record_every steps and, when a control_fn is given,
+        to derive the sensors the control_fn turns into the controls for the next step.
+        """
+        plan = self._plan
+        check_signal = self._signal_checker(min_max_temperature)
+        states, signals = plan.buffers(state)
+        control_values = plan.controls(controls)
+        time = state.time
+
+        for step in range(1, steps + 1):
+            plan.step(
+                states,
+                signals,
+                control_values,
+                time,
+                _simulate_appliance,
+                check_signal,
             )
-            appliance_states[appliance] = new_appliance_state
-            for port, signal in outputs.items():
-                if not isinstance(port, port_class):
-                    port = port_class(port)
-                signals[(appliance, port)] = signal
-                if min_max_temperature is not None and isinstance(signal, ThermalState):
-                    self.check_temperatures(
-                        min_max_temperature,
-                        signal,
-                        self.find_appliance_name_by_id(appliance.id),
-                        port,
+            time = _next_time(time)
+            record = recorder is not None and step % record_every == 0
+            if record or control_fn is not None:
+                current_state = plan.to_state(time, states, signals)
+                if recorder is not None and record:
+                    recorder.record(current_state)
+                if control_fn is not None:
+                    control_values = plan.controls(
+                        control_fn(self.sensors_from_state(current_state))
                     )
-                to = self._port_mapping.get((appliance, port), None)
-                if to is not None:
-                    to_app, to_port = to
-                    to_mapping = port_inputs.get(to_app, {})
-                    if to_port in to_mapping:
-                        raise Exception(
-                            f"{to_app} at port {to_port} already has an input"
-                        )
-                    to_mapping[to_port] = signal
-                    port_inputs[to_app] = to_mapping
-                    signals[(to_app, to_port)] = signal
 
-        return NetworkState(
-            replace(state.time, step=state.time.step + 1),
-            appliance_states,
-            signals,
-        )
+        return plan.to_state(time, states, signals)
 
     def define_state[
         App: AnyAppliance
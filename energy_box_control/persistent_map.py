@@ -0,0 +1,111 @@
+from typing import Any, Iterator, Mapping
+
+MAX_DEPTH = 32
+
+
+class PersistentMap[K, V](Mapping[K, V]):
+    """Immutable mapping of which updated versions share structure with the original
+
+    Updates are layered on top of the map they derive from, so branching costs O(changed entries).
+    Chains deeper than MAX_DEPTH are flattened into a new base.
+    """
+
+    __slots__ = ("_parent", "_changes", "_depth", "_flat")
+
+    def __init__(self, base: Mapping[K, V] | None = None):
+        self._parent: PersistentMap[K, V] | None = None
+        self._changes: dict[K, V] = dict(base) if base is not None else {}
+        self._depth = 0
+        self._flat: dict[K, V] | None = self._changes
+
+    @staticmethod
+    def of[Key, Value](mapping: Mapping[Key, Value]) -> "PersistentMap[Key, Value]":
+        return mapping if isinstance(mapping, PersistentMap) else PersistentMap(mapping)
+
+    def _layer(self, changes: dict[K, V]) -> "PersistentMap[K, V]":
+        layer = type(self).__new__(type(self))
+        layer._parent = self
+        layer._changes = changes
+        layer._depth = self._depth + 1
+        layer._flat = None
+        return layer
+
+    def set(self, key: K, value: V) -> "PersistentMap[K, V]":
+        return self.update({key: value})
+
+    def update(self, changes: Mapping[K, V]) -> "PersistentMap[K, V]":
+        if self._depth >= MAX_DEPTH:
+            return PersistentMap({**self._flatten(), **changes})
+        return self._layer(dict(changes))
+
+    def _flatten(self) -> dict[K, V]:
+        if self._flat is None:
+            assert self._parent is not None
+            self._flat = {**self._parent._flatten(), **self._changes}
+        return self._flat
+
+    def __getitem__(self, key: K) -> V:
+        node = self
+        while node._parent is not None:
+            if key in node._changes:
+                return node._changes[key]
+            node = node._parent
+        return node._changes[key]
+
+    def __contains__(self, key: object) -> bool:
+        node = self
+        while node._parent is not None:
+            if key in node._changes:
+                return True
+            node = node._parent
+        return key in node._changes
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(self._flatten())
+
+    def __len__(self) -> int:
+        return len(self._flatten())
+
+    def __repr__(self) -> str:
+        return f"PersistentMap({self._flatten()!r})"
+
+    # set is shadowed by PersistentMap.set in the class body, hence the quoted annotations
+    def _changed_since(self) -> "dict[int, tuple[PersistentMap[K, V], set[K]]]":
+        # every ancestor by id, with the keys changed between that ancestor and this map
+        ancestors: dict[int, tuple[PersistentMap[K, V], set[K]]] = {}
+        changed: set[K] = set()
+        node: PersistentMap[K, V] | None = self
+        while node is not None:
+            ancestors[id(node)] = (node, set(changed))
+            if node._parent is not None:
+                changed.update(node._changes)
+            node = node._parent
+        return ancestors
+
+    def changed_keys(self, other: Mapping[K, Any]) -> "set[K]":
+        """Keys of which the value differs between this map and other
+
+        When both maps derive from a common map only the keys changed since then are compared.
+        """
+        candidates: set[Any] | None = None
+        if isinstance(other, PersistentMap):
+            ancestors = self._changed_since()
+            changed: set[Any] = set()
+            node: PersistentMap[Any, Any] | None = other
+            while node is not None:
+                if id(node) in ancestors:
+                    candidates = changed | ancestors[id(node)][1]
+                    break
+                if node._parent is not None:
+                    changed.update(node._changes)
+                node = node._parent
+
+        if candidates is None:
+            candidates = set(self) | set(other)
+
+        return {
+            key
+            for key in candidates
+            if (key in self) != (key in other)
+            or (key in self and self[key] is not other[key] and self[key] != other[key])
+        }
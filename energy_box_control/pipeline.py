@@ -0,0 +1,39 @@
+import asyncio
+from logging import Logger
+from typing import Awaitable, Callable
+
+from energy_box_control.instrumentation import INSTRUMENTATION
+
+
+class PipelineStage[T]:
+    """A bounded queue of items handled by a task of its own, off the path of whoever offers them
+
+    Offering never waits: when the queue is full the oldest item is dropped, so a slow stage falls behind on
+    intermediate items instead of holding up the stage before it. A failing item is logged and the stage moves on.
+    """
+
+    def __init__(self, name: str, logger: Logger, maxsize: int = 1):
+        self.name = name
+        self._logger = logger
+        self._queue: asyncio.Queue[T] = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def offer(self, item: T):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+            INSTRUMENTATION.count(f"{self.name}_dropped")
+        self._queue.put_nowait(item)
+
+    async def run(self, handler: Callable[[T], Awaitable[None]]):
+        while True:
+            item = await self._queue.get()
+            try:
+                with INSTRUMENTATION.stage(self.name):
+                    await handler(item)
+            except Exception:
+                INSTRUMENTATION.count(f"{self.name}_failed")
+                self._logger.exception(f"{self.name} failed")
@@ -6,6 +6,7 @@ from typing import Any, cast
 from energy_box_control.appliances.base import control_class
 from energy_box_control.appliances.frequency_controlled_pump import FrequencyPumpControl
 from energy_box_control.appliances.water_treatment import WaterTreatmentControl
+from energy_box_control.instrumentation import INSTRUMENTATION
 
 from energy_box_control.power_hub.control.chill.control import chill_control
 from energy_box_control.power_hub.control.chill.state import (
@@ -210,21 +211,33 @@ def control_power_hub(
     if survival_mode:
         return survival_control(power_hub, sensors, control_state)
 
-    hot_control_state, hot = hot_control(power_hub, control_state, sensors, time)
-    chill_control_state, chill = chill_control(power_hub, control_state, sensors, time)
-    waste_control_state, waste = waste_control(power_hub, control_state, sensors, time)
-    fresh_water_control_state, fresh_water = fresh_water_control(
-        power_hub, control_state, sensors, time
-    )
-    technical_water_control_state, technical_water = technical_water_control(
-        power_hub, control_state, sensors, time
-    )
-    water_treatment_control_state, water_treatment = water_treatment_control(
-        power_hub, control_state, sensors, time
-    )
-    cooling_supply_control_state, cooling_supply = cooling_supply_control(
-        power_hub, control_state, sensors, time
-    )
+    stage = INSTRUMENTATION.stage
+    with stage("hot_control"):
+        hot_control_state, hot = hot_control(power_hub, control_state, sensors, time)
+    with stage("chill_control"):
+        chill_control_state, chill = chill_control(
+            power_hub, control_state, sensors, time
+        )
+    with stage("waste_control"):
+        waste_control_state, waste = waste_control(
+            power_hub, control_state, sensors, time
+        )
+    with stage("fresh_water_control"):
+        fresh_water_control_state, fresh_water = fresh_water_control(
+            power_hub, control_state, sensors, time
+        )
+    with stage("technical_water_control"):
+        technical_water_control_state, technical_water = technical_water_control(
+            power_hub, control_state, sensors, time
+        )
+    with stage("water_treatment_control"):
+        water_treatment_control_state, water_treatment = water_treatment_control(
+            power_hub, control_state, sensors, time
+        )
+    with stage("cooling_supply_control"):
+        cooling_supply_control_state, cooling_supply = cooling_supply_control(
+            power_hub, control_state, sensors, time
+        )
 
     control = (
         power_hub.control(power_hub.cooling_demand_pump)
@@ -306,7 +319,7 @@ def no_control(power_hub: PowerHub) -> NetworkControl[PowerHub]:
 
 
 def control_from_json(
-    power_hub: PowerHub, control_json: str
+    power_hub: PowerHub, control_json: str | bytes
 ) -> NetworkControl[PowerHub]:
     controls = json.loads(control_json)
 
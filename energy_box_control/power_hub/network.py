@@ -1,6 +1,5 @@
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-import json
 
 from typing import Self
 
@@ -83,7 +82,8 @@ from energy_box_control.power_hub.sensors import (
 import energy_box_control.power_hub.components as phc
 from datetime import datetime, timedelta
 
-from energy_box_control.time import ProcessTime, ms_to_datetime
+from energy_box_control.sensors import SensorCodec
+from energy_box_control.time import ProcessTime
 
 
 @dataclass
@@ -777,33 +777,5 @@ class PowerHub(Network[PowerHubSensors]):
             self,
         )
 
-    def sensors_from_json(self, sensor_json: str | bytes):
-        sensors = json.loads(sensor_json)
-        init_order = PowerHubSensors.sensor_initialization_order()
-
-        context = PowerHubSensors.context()
-
-        for sensor in init_order:
-            sensor_values = sensors.get(sensor.name, {})
-
-            appliance = getattr(self, sensor.name, None)
-            try:
-                if appliance:
-                    context.with_appliance(
-                        sensor_values,
-                        sensor.type,
-                        getattr(context.subject, sensor.name),
-                        appliance,
-                    )
-                else:
-                    context.without_appliance(
-                        sensor.type,
-                        getattr(context.subject, sensor.name),
-                        **sensor_values,
-                    )
-            except KeyError as e:
-                raise KeyError(
-                    f"Got error on key {str(e)} for {sensor.name} with {sensor_json}"
-                )
-
-        return context.result(ms_to_datetime(sensors["time"]))
+    def sensors_from_json(self, sensor_json: str | bytes) -> PowerHubSensors:
+        return SensorCodec.of(PowerHubSensors).decode(self, sensor_json)
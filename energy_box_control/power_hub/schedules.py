@@ -1,9 +1,23 @@
-from dataclasses import dataclass
-from datetime import timedelta, datetime, timezone
-from typing import cast
-from energy_box_control.schedules import ConstSchedule, PeriodicSchedule, Schedule
+from dataclasses import dataclass, fields
+from typing import Any
+from datetime import timedelta, datetime
+from energy_box_control.schedules import (
+    ConstSchedule,
+    Interpolation,
+    Schedule,
+    TimestampedSchedule,
+    sampled_schedules,
+)
 from energy_box_control.units import Celsius, LiterPerSecond, Watt, WattPerMeterSquared
 import energy_box_control.power_hub.components as phc
+from energy_box_control.config import CONFIG
+from energy_box_control.schedule_store import store_for_csv
+
+SCHEDULE_UNITS = {
+    "Global Horizontal Radiation": "W/m2",
+    "Dry Bulb Temperature": "C",
+    "Cooling Demand": "W",
+}
 
 
 @dataclass
@@ -16,6 +30,22 @@ class PowerHubSchedules:
     fresh_water_demand: Schedule[LiterPerSecond]
     grey_water_supply: Schedule[LiterPerSecond]
 
+    def sampled(
+        self,
+        start: datetime,
+        step_size: timedelta = timedelta(seconds=1),
+        interpolation: Interpolation | None = None,
+    ) -> "PowerHubSchedules":
+        # schedules are sampled once per step for simulations starting at start with steps of step_size
+        return PowerHubSchedules(
+            **sampled_schedules(
+                {field.name: getattr(self, field.name) for field in fields(self)},
+                start,
+                step_size,
+                interpolation,
+            )
+        )
+
     @staticmethod
     def const_schedules() -> "PowerHubSchedules":
         return PowerHubSchedules(
@@ -32,39 +62,33 @@ class PowerHubSchedules:
     def schedules_from_data(
         path: str = "energy_box_control/power_hub/powerhub_simulation_schedules_Jun_Oct_TMY.csv",
     ) -> "PowerHubSchedules":
-        from pandas import DataFrame, read_csv  # type: ignore
-
-        data: DataFrame = read_csv(
-            path,
-            index_col=0,
-            parse_dates=True,
-        )
-
-        start = cast(datetime, data.index[0].to_pydatetime()).replace(tzinfo=timezone.utc)  # type: ignore
-
-        end = cast(datetime, data.index[-1].to_pydatetime()).replace(tzinfo=timezone.utc)  # type: ignore
-
-        global_irradiance_values = cast(
-            list[WattPerMeterSquared], data["Global Horizontal Radiation"].to_list()  # type: ignore
+        # the csv is converted to a memory mapped schedule store once, which is reused while the csv is unchanged
+        store = store_for_csv(
+            path, SCHEDULE_UNITS, CONFIG.schedule_store_directory or None
         )
-        ambient_temperature_values = cast(
-            list[Celsius], data["Dry Bulb Temperature"].to_list()  # type: ignore
+        return PowerHubSchedules(
+            store.schedule("Global Horizontal Radiation"),
+            store.schedule("Dry Bulb Temperature"),
+            store.schedule("Cooling Demand"),
+            ConstSchedule(phc.SEAWATER_TEMPERATURE),  # type: ignore
+            ConstSchedule(phc.FRESHWATER_TEMPERATURE),  # type: ignore
+            ConstSchedule(phc.WATER_DEMAND),  # type: ignore
+            ConstSchedule(phc.PERCENT_WATER_CAPTURED * phc.WATER_DEMAND),  # type: ignore
         )
-        cooling_demand_values = cast(list[Watt], data["Cooling Demand"].to_list())  # type: ignore
 
-        schedule_period = (end - start) + timedelta(hours=1)
+    @staticmethod
+    def schedules_from_recorded(
+        global_irradiance: Any,
+        ambient_temperature: Any,
+        cooling_demand: Any,
+        interpolation: Interpolation = "linear",
+    ) -> "PowerHubSchedules":
+        # pandas series with a DatetimeIndex, like the _value column of an InfluxDB query result indexed by _time;
+        # the recorded values are looked up by timestamp, gaps and jitter included, without resampling them
         return PowerHubSchedules(
-            PeriodicSchedule(
-                start,
-                schedule_period,
-                tuple(global_irradiance_values),
-            ),
-            PeriodicSchedule(
-                start,
-                schedule_period,
-                tuple(ambient_temperature_values),
-            ),
-            PeriodicSchedule(start, schedule_period, tuple(cooling_demand_values)),
+            TimestampedSchedule.from_series(global_irradiance, interpolation),
+            TimestampedSchedule.from_series(ambient_temperature, interpolation),
+            TimestampedSchedule.from_series(cooling_demand, interpolation),
             ConstSchedule(phc.SEAWATER_TEMPERATURE),  # type: ignore
             ConstSchedule(phc.FRESHWATER_TEMPERATURE),  # type: ignore
             ConstSchedule(phc.WATER_DEMAND),  # type: ignore
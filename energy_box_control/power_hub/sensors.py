@@ -79,9 +79,11 @@ from energy_box_control.appliances.pcm import Pcm, PcmPort
 from energy_box_control.appliances.valve import Valve, ValvePort, ValveStatus
 from energy_box_control.appliances.yazaki import Yazaki, YazakiPort
 from energy_box_control.sensors import (
+    ConstResolver,
     FromState,
     WithoutAppliance,
     SensorType,
+    derived,
     sensor,
     sensor_fields,
     sensors,
@@ -90,7 +92,7 @@ from energy_box_control.sensors import (
 
 
 def const_resolver(value: Any) -> "Callable[[PowerHub, NetworkState[PowerHub]], Any]":
-    return lambda _a, _b: value
+    return ConstResolver(value)
 
 
 def power_hub_sensor[
@@ -312,7 +314,7 @@ class PcmSensors(FromState):
     def discharge_flow(self) -> LiterPerSecond:
         return self.pcm_discharge_flow_sensor.flow
 
-    @property
+    @derived(depends_on=("discharge_flow", "discharge_delta_temperature", "spec"))
     def discharge_power(
         self,
     ) -> Watt:
@@ -354,7 +356,7 @@ class PcmSensors(FromState):
             else 0
         )
 
-    @property
+    @derived(depends_on=("charge_flow", "charge_delta_temperature", "spec"))
     def charge_power(
         self,
     ) -> Watt:
@@ -420,7 +422,14 @@ class YazakiSensors(FromState):
     def hot_delta_temperature(self) -> Celsius:
         return self.rh33_yazaki_hot.delta_temperature
 
-    @property
+    @derived(
+        depends_on=(
+            "hot_flow",
+            "hot_delta_temperature",
+            "spec",
+            "chiller_switch_valve.position",
+        )
+    )
     def used_power(self) -> Watt:
         return (
             self.hot_flow
@@ -530,7 +539,7 @@ class YazakiSensors(FromState):
             else float("nan")
         )
 
-    @property
+    @derived(depends_on=("chilled_flow", "chilled_delta_temperature", "spec"))
     def chill_power(self) -> Watt:
         return (
             self.chilled_flow
@@ -625,7 +634,7 @@ class HotReservoirSensors(FromState):
             else float("nan")
         )
 
-    @property
+    @derived(depends_on=("exchange_flow", "exchange_delta_temperature", "spec"))
     def exchange_power(self) -> Watt:
         return (
             self.exchange_flow
@@ -894,7 +903,7 @@ class ChillerSensors(FromState):
             else float("nan")
         )
 
-    @property
+    @derived(depends_on=("chilled_flow", "chilled_delta_temperature", "spec"))
     def chill_power(self) -> Watt:
         return (
             self.chilled_flow
@@ -983,6 +992,17 @@ def pv_panel_power_sensor(
     )
 
 
+PV_POWERS = tuple(
+    f"solar_{solar}_PV_power_for_tracker_{tracker}"
+    for solar in range(1, 5)
+    for tracker in range(4)
+)
+# without e6, the supply box
+COMPOUND_POWERS = tuple(
+    f"e{meter}_power_L{line}" for meter in (1, 2, 3, 4, 5, 7, 8) for line in (1, 2, 3)
+)
+
+
 @sensors(from_appliance=False)
 class ElectricalSensors(WithoutAppliance):
 
@@ -1658,7 +1678,7 @@ class ElectricalSensors(WithoutAppliance):
     shore_power_active: bool = sensor(resolver=const_resolver(False))
     shore_power_needed: bool = sensor(resolver=const_resolver(False))
 
-    @property
+    @derived(depends_on=PV_POWERS)
     def pv_power(self):
         return sum(
             [
@@ -1701,7 +1721,7 @@ class ElectricalSensors(WithoutAppliance):
             ]
         )
 
-    @property
+    @derived(depends_on=COMPOUND_POWERS)
     def compound_power_consumption(self):
         return sum(
             [
@@ -1764,7 +1784,9 @@ class ElectricalSensors(WithoutAppliance):
     def center_2_power(self):
         return sum([self.e8_power_L1, self.e8_power_L2, self.e8_power_L3])
 
-    @property
+    @derived(
+        depends_on=("total_AC_power", "compound_power_consumption", "supply_box_power")
+    )
     def power_hub_power(self):
         return (
             self.total_AC_power
@@ -1772,7 +1794,13 @@ class ElectricalSensors(WithoutAppliance):
             - self.supply_box_power
         )
 
-    @property
+    @derived(
+        depends_on=(
+            "thermo_cabinet_power_L1",
+            "thermo_cabinet_power_L2",
+            "thermo_cabinet_power_L3",
+        )
+    )
     def thermal_cabinet_power(self):
         return sum(
             [
@@ -1929,6 +1957,12 @@ class FancoilSensors(WithoutAppliance):
     setpoint: int = sensor(resolver=const_resolver(0))
 
 
+COMPOUND_FANCOIL_TEMPERATURES = tuple(
+    f"{fancoil}_fancoil.ambient_temperature"
+    for fancoil in ("kitchen", "office_1", "office_2", "simulator", "sanitary")
+)
+
+
 @sensors(from_appliance=False)
 class CompoundSensors(WithoutAppliance):
     simulator_fancoil: FancoilSensors
@@ -1946,7 +1980,7 @@ class CompoundSensors(WithoutAppliance):
             self.sanitary_fancoil,
         ]
 
-    @property
+    @derived(depends_on=COMPOUND_FANCOIL_TEMPERATURES)
     def overall_temperature(self) -> Celsius:
         return mean(
             fancoil.ambient_temperature
@@ -0,0 +1,339 @@
+import csv
+import hashlib
+import json
+import math
+import random
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, fields, replace
+from datetime import datetime, timedelta, timezone
+from functools import cache
+from itertools import product
+from pathlib import Path
+from typing import Any, Iterable, Literal, Sequence
+
+from energy_box_control.custom_logging import get_logger
+from energy_box_control.network import NetworkControl
+from energy_box_control.power_hub.control.control import (
+    control_power_hub,
+    initial_control_all_off,
+)
+from energy_box_control.power_hub.control.state import (
+    PowerHubControlState,
+    Setpoints,
+    initial_control_state,
+)
+from energy_box_control.power_hub.network import PowerHub, PowerHubSchedules
+from energy_box_control.power_hub.sensors import PowerHubSensors
+from energy_box_control.schedules import ConstSchedule
+
+logger = get_logger(__name__)
+
+SETPOINTS = "setpoints"
+SCHEDULES = "schedules"
+SCENARIO_COLUMN = "scenario"
+KPI_COLUMNS = (
+    "steps",
+    "chill_energy_delivered",
+    "battery_soc_min",
+    "survival_hours",
+    "yazaki_hours",
+    "error",
+)
+
+type ScheduleSource = Literal["const", "data"]
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """A point in the sweep
+
+    Parameters are named `setpoints.<field>` for a Setpoints field, `schedules.<field>` for a constant
+    PowerHubSchedules source and `<appliance>.<field>` for a field of a PowerHub component.
+    """
+
+    parameters: dict[str, float]
+
+    @property
+    def id(self) -> str:
+        # stable between runs, so a sweep can be resumed
+        return hashlib.sha1(
+            json.dumps(self.parameters, sort_keys=True).encode()
+        ).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class SweepConfig:
+    steps: int
+    start: datetime = datetime(2017, 6, 1, tzinfo=timezone.utc)
+    step_size: timedelta = timedelta(seconds=1)
+    schedules: ScheduleSource = "const"
+
+
+@dataclass
+class Kpis:
+    steps: int = 0
+    chill_energy_delivered: float = 0  # J
+    battery_soc_min: float = math.inf
+    survival_hours: float = 0
+    yazaki_hours: float = 0
+    error: str = ""
+
+    def add(self, sensors: PowerHubSensors, setpoints: Setpoints, seconds: float):
+        self.steps += 1
+        chill_power = sum(
+            power
+            for power in (sensors.yazaki.chill_power, sensors.chiller.chill_power)
+            if not math.isnan(power)
+        )
+        self.chill_energy_delivered += chill_power * seconds
+        self.battery_soc_min = min(
+            self.battery_soc_min, sensors.electrical.battery_system_soc
+        )
+        # the battery being too low to run the chiller is what would call for survival mode
+        if sensors.electrical.battery_system_soc < setpoints.low_battery:
+            self.survival_hours += seconds / 3600
+        if sensors.yazaki.operation_output:
+            self.yazaki_hours += seconds / 3600
+
+
+def grid(axes: dict[str, Sequence[float]]) -> list[Scenario]:
+    return [
+        Scenario(dict(zip(axes.keys(), values))) for values in product(*axes.values())
+    ]
+
+
+def random_sample(
+    ranges: dict[str, tuple[float, float]], count: int, seed: int = 0
+) -> list[Scenario]:
+    generator = random.Random(seed)
+    return [
+        Scenario(
+            {name: generator.uniform(low, high) for name, (low, high) in ranges.items()}
+        )
+        for _ in range(count)
+    ]
+
+
+def combine(*scenario_sets: list[Scenario]) -> list[Scenario]:
+    return [
+        Scenario(
+            {k: v for scenario in scenarios for k, v in scenario.parameters.items()}
+        )
+        for scenarios in product(*(s for s in scenario_sets if s))
+    ]
+
+
+@cache
+def _schedules(source: ScheduleSource) -> PowerHubSchedules:
+    return (
+        PowerHubSchedules.schedules_from_data()
+        if source == "data"
+        else PowerHubSchedules.const_schedules()
+    )
+
+
+def _split(name: str) -> tuple[str, str]:
+    group, _, attribute = name.partition(".")
+    if not attribute:
+        raise ValueError(f"parameter {name} should be of the form <group>.<field>")
+    return group, attribute
+
+
+def scenario_power_hub(scenario: Scenario, config: SweepConfig) -> PowerHub:
+    groups: dict[str, dict[str, Any]] = {}
+    for name, value in scenario.parameters.items():
+        group, attribute = _split(name)
+        groups.setdefault(group, {})[attribute] = value
+
+    schedule_fields = {field.name for field in fields(PowerHubSchedules)}
+    schedules = groups.pop(SCHEDULES, {})
+    if unknown := schedules.keys() - schedule_fields:
+        raise ValueError(f"unknown schedules {unknown}")
+    groups.pop(SETPOINTS, None)
+
+    power_hub = PowerHub.power_hub(
+        replace(
+            _schedules(config.schedules).sampled(config.start, config.step_size),
+            **{name: ConstSchedule(value) for name, value in schedules.items()},
+        )
+    )
+    if not groups:
+        return power_hub
+    return replace(
+        power_hub,
+        **{
+            appliance: replace(getattr(power_hub, appliance), **values)
+            for appliance, values in groups.items()
+        },
+    )
+
+
+def scenario_control_state(scenario: Scenario) -> PowerHubControlState:
+    control_state = initial_control_state()
+    setpoints = {
+        attribute: value
+        for group, attribute, value in (
+            (*_split(name), value) for name, value in scenario.parameters.items()
+        )
+        if group == SETPOINTS
+    }
+    control_state.setpoints = Setpoints.model_validate(
+        {**control_state.setpoints.model_dump(), **setpoints}
+    )
+    return control_state
+
+
+def run_scenario(scenario: Scenario, config: SweepConfig) -> dict[str, Any]:
+    """Runs the closed control loop for a scenario, returning its results table row
+
+    A scenario the simulation fails on isn't retried, its row holds the error and the KPIs up to the failing step.
+    """
+    power_hub = scenario_power_hub(scenario, config)
+    control_state = scenario_control_state(scenario)
+    kpis = Kpis()
+    seconds = config.step_size.total_seconds()
+
+    def control_fn(sensors: PowerHubSensors) -> NetworkControl[PowerHub]:
+        nonlocal control_state
+        kpis.add(sensors, control_state.setpoints, seconds)
+        control_state, controls = control_power_hub(
+            power_hub, control_state, sensors, sensors.time, survival_mode=False
+        )
+        return controls
+
+    try:
+        power_hub.run(
+            power_hub.simple_initial_state(config.start, config.step_size),
+            initial_control_all_off(power_hub),
+            config.steps,
+            control_fn,
+        )
+    except Exception as e:
+        kpis.error = f"{type(e).__name__}: {e}"
+    return {SCENARIO_COLUMN: scenario.id, **scenario.parameters, **vars(kpis)}
+
+
+def _completed_rows(results: Path, columns: list[str]) -> list[dict[str, str]]:
+    if not results.exists():
+        return []
+    with open(results, newline="") as file:
+        reader = csv.DictReader(file)
+        if reader.fieldnames != columns:
+            raise ValueError(f"{results} holds the results of a different sweep")
+        # an interrupted run can leave a partially written last row
+        return [
+            row
+            for row in reader
+            if None not in row.values() and len(row) == len(columns)
+        ]
+
+
+def run_sweep(
+    scenarios: Iterable[Scenario],
+    config: SweepConfig,
+    results: Path | str,
+    workers: int | None = None,
+) -> list[dict[str, Any]]:
+    """Runs scenarios in parallel, appending a row per finished scenario to the results csv
+
+    Scenarios already in the results are skipped, so an interrupted sweep resumes where it stopped. Returns the rows
+    of the scenarios run.
+    """
+    scenarios = list({scenario.id: scenario for scenario in scenarios}.values())
+    if not scenarios:
+        return []
+    results = Path(results)
+    columns = [SCENARIO_COLUMN, *scenarios[0].parameters, *KPI_COLUMNS]
+    completed = _completed_rows(results, columns)
+    done = {row[SCENARIO_COLUMN] for row in completed}
+    pending = [scenario for scenario in scenarios if scenario.id not in done]
+
+    temporary = results.with_name(f".{results.name}.tmp")
+    with open(temporary, "w", newline="") as file:
+        writer = csv.DictWriter(file, columns)
+        writer.writeheader()
+        writer.writerows(completed)
+    temporary.replace(results)
+
+    # converts data schedules to their store once, before the workers load them
+    _schedules(config.schedules)
+
+    rows: list[dict[str, Any]] = []
+    with (
+        open(results, "a", newline="") as file,
+        ProcessPoolExecutor(workers) as executor,
+    ):
+        writer = csv.DictWriter(file, columns)
+        futures = [
+            executor.submit(run_scenario, scenario, config) for scenario in pending
+        ]
+        for future in as_completed(futures):
+            row = future.result()
+            writer.writerow(row)
+            file.flush()
+            rows.append(row)
+    return rows
+
+
+def _axis(argument: str) -> tuple[str, list[float]]:
+    name, _, values = argument.partition("=")
+    return name, [float(value) for value in values.split(",")]
+
+
+def _range(argument: str) -> tuple[str, tuple[float, float]]:
+    name, _, bounds = argument.partition("=")
+    low, _, high = bounds.partition(":")
+    return name, (float(low), float(high))
+
+
+def main(arguments: list[str] | None = None):
+    parser = ArgumentParser(
+        description="Runs the closed loop power hub simulation over a grid or random sample of parameters"
+    )
+    parser.add_argument("results", type=Path, help="csv the KPIs are appended to")
+    parser.add_argument(
+        "--grid",
+        type=_axis,
+        action="append",
+        default=[],
+        help="grid axis as <parameter>=<value>,<value>,...",
+    )
+    parser.add_argument(
+        "--sample",
+        type=_range,
+        action="append",
+        default=[],
+        help="randomly sampled parameter as <parameter>=<low>:<high>",
+    )
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--steps", type=int, default=24 * 60 * 60)
+    parser.add_argument("--step-size", type=float, default=1, help="seconds")
+    parser.add_argument(
+        "--start",
+        type=datetime.fromisoformat,
+        default=SweepConfig.start,
+        help="iso formatted start time",
+    )
+    parser.add_argument("--schedules", choices=["const", "data"], default="const")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(arguments)
+
+    scenarios = combine(
+        grid(dict(args.grid)) if args.grid else [],
+        (
+            random_sample(dict(args.sample), args.samples, args.seed)
+            if args.sample
+            else []
+        ),
+    )
+    config = SweepConfig(
+        args.steps, args.start, timedelta(seconds=args.step_size), args.schedules
+    )
+    rows = run_sweep(scenarios, config, args.results, args.workers)
+    logger.info(f"ran {len(rows)} of {len(scenarios)} scenarios into {args.results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 import asyncio
 import dataclasses
-from datetime import datetime, time
+from datetime import datetime, time, timedelta, timezone
 import json
-from typing import Any
+from time import monotonic
+from typing import Any, cast
 
 import aiomqtt
 from pydantic import ValidationError
@@ -10,6 +11,10 @@ from pydantic import ValidationError
 from energy_box_control.amqtt import get_mqtt_client, publish_initial_value
 from energy_box_control.config import CONFIG
 from energy_box_control.custom_logging import get_logger
+from energy_box_control.instrumentation import INSTRUMENTATION, serve_metrics
+from energy_box_control.mailbox import Mailbox
+from energy_box_control.network import NetworkControl
+from energy_box_control.pipeline import PipelineStage
 from energy_box_control.monitoring.monitoring import (
     Monitor,
     Notifier,
@@ -29,7 +34,16 @@ from energy_box_control.power_hub.control.state import (
     Setpoints,
 )
 from energy_box_control.power_hub.network import PowerHub, PowerHubSchedules
-from energy_box_control.sensors import sensors_to_json
+from energy_box_control.sensors import (
+    SensorCodec,
+    SensorDeltaDecoder,
+    sensors_to_json,
+)
+from energy_box_control.wire import (
+    ControlWireFormat,
+    SensorWireFormat,
+    is_wire_format,
+)
 from energy_box_control.time import time_ms
 
 logger = get_logger(__name__)
@@ -37,10 +51,14 @@ logger = get_logger(__name__)
 MQTT_TOPIC_BASE = "power_hub"
 CONTROL_VALUES_TOPIC = f"{MQTT_TOPIC_BASE}/control_values"
 SENSOR_VALUES_TOPIC = f"{MQTT_TOPIC_BASE}/sensor_values"
+SENSOR_VALUES_DELTA_TOPIC = f"{SENSOR_VALUES_TOPIC}/delta"
+SENSOR_VALUES_KEYFRAME_REQUEST_TOPIC = f"{SENSOR_VALUES_DELTA_TOPIC}/keyframe_request"
 CONTROL_MODES_TOPIC = f"{MQTT_TOPIC_BASE}/control_modes"
 ENRICHED_SENSOR_VALUES_TOPIC = f"{MQTT_TOPIC_BASE}/enriched_sensor_values"
 SETPOINTS_TOPIC = f"{MQTT_TOPIC_BASE}/setpoints"
 SURVIVAL_MODE_TOPIC = f"{MQTT_TOPIC_BASE}/survival"
+CONTROL_METRICS_TOPIC = f"{MQTT_TOPIC_BASE}/control_metrics"
+EVENTS_KEEP_ALIVE_SECONDS = 60
 
 
 class ControlModesEncoder(json.JSONEncoder):
@@ -71,18 +89,40 @@ class PowerHubControl:
             [PagerDutyNotificationChannel(CONFIG.pagerduty_control_app_key)]
         )
         self.last_events = []
-        self.cycles_since_events = 0
+        # on the monotonic clock, as monitoring skips the sensor values it can't keep up with
+        self.events_sent_at = monotonic()
         self.monitor = Monitor(sensor_value_checks=all_checks, url_health_checks=[])
         self.control_state = initial_control_state()
         self.power_hub_sensors: PowerHubSensors | None = None
         self.power_hub = PowerHub.power_hub(PowerHubSchedules.const_schedules())
         self.survival_mode: bool = False
+        self.sensor_values_decoder = SensorDeltaDecoder(PowerHubSensors, self.power_hub)
+        self.control_format = ControlWireFormat(self.power_hub)
+        self.metrics_server: asyncio.Server | None = None
+        self.metrics_task: asyncio.Task[None] | None = None
+        self.mailbox: Mailbox[bytes | PowerHubSensors] = Mailbox()
+        self.stale_sensor_values = 0
+        # off the path from sensor values to control values, so neither can delay actuation
+        self.enrichment: PipelineStage[PowerHubSensors | None] = PipelineStage(
+            "enrichment", logger
+        )
+        self.monitoring: PipelineStage[
+            tuple[PowerHubSensors, NetworkControl[PowerHub]]
+        ] = PipelineStage("monitoring", logger)
 
     async def run(self):
 
-        async with get_mqtt_client(logger) as mqtt_client:
+        # enriched sensor values and metrics are published on a connection of their own, so a broker that is slow to
+        # take them doesn't hold up the control values
+        async with (
+            get_mqtt_client(logger) as mqtt_client,
+            get_mqtt_client(logger) as background_client,
+        ):
             logger.info("Starting power hub control loop")
 
+            if CONFIG.control_instrumentation:
+                await self.start_instrumentation(background_client)
+
             async with asyncio.TaskGroup() as tg:
                 tg.create_task(
                     publish_initial_value(
@@ -95,97 +135,250 @@ class PowerHubControl:
                     )
                 )
 
-            await mqtt_client.subscribe(SENSOR_VALUES_TOPIC, qos=1)
+            await mqtt_client.subscribe(
+                (
+                    SENSOR_VALUES_DELTA_TOPIC
+                    if CONFIG.sensor_values_delta_encoding
+                    else SENSOR_VALUES_TOPIC
+                ),
+                qos=1,
+            )
             await mqtt_client.subscribe(SETPOINTS_TOPIC, qos=1)
             await mqtt_client.subscribe(SURVIVAL_MODE_TOPIC, qos=1)
 
-            async for message in mqtt_client.messages:
-                if not isinstance(message.payload, bytes):
-                    logger.warning(
-                        f"expected bytes in payload of message: {message.payload}"
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self.receive_messages(mqtt_client))
+                tg.create_task(self.control_loop(mqtt_client))
+                tg.create_task(
+                    self.enrichment.run(
+                        lambda sensors: self.publish_enriched_sensor_values(
+                            background_client, sensors
+                        )
                     )
-                    continue
-                if message.topic.matches(SENSOR_VALUES_TOPIC):
-                    logger.info(f"Received sensor values")
-                    power_hub_sensors_new = self.power_hub.sensors_from_json(
-                        message.payload
+                )
+                tg.create_task(self.monitoring.run(self.check_sensor_values))
+
+    async def receive_messages(self, mqtt_client: aiomqtt.Client):
+        # messages only wait for the control loop in the mailbox, so it never works through a backlog
+        async for message in mqtt_client.messages:
+            if not isinstance(message.payload, bytes):
+                logger.warning(
+                    f"expected bytes in payload of message: {message.payload}"
+                )
+                continue
+            if message.topic.matches(SENSOR_VALUES_TOPIC):
+                self.mailbox.put(SENSOR_VALUES_TOPIC, message.payload)
+
+            if message.topic.matches(SENSOR_VALUES_DELTA_TOPIC):
+                # every delta has to reach the decoder, only the sensors built from them are coalesced
+                with INSTRUMENTATION.stage("json_decode"):
+                    sensor_values = json.loads(message.payload)
+                with INSTRUMENTATION.stage("sensors_from_json"):
+                    power_hub_sensors_new = self.sensor_values_decoder.receive(
+                        sensor_values
                     )
-                    enriched_power_hub_sensors = sensors_to_json(
-                        self.power_hub_sensors, include_properties=True
+                if power_hub_sensors_new:
+                    self.mailbox.put(SENSOR_VALUES_TOPIC, power_hub_sensors_new)
+                elif self.sensor_values_decoder.needs_keyframe:
+                    logger.warning(
+                        "Missed a sensor values delta, requesting a keyframe"
                     )
-
                     await mqtt_client.publish(
-                        ENRICHED_SENSOR_VALUES_TOPIC,
-                        payload=enriched_power_hub_sensors,
+                        SENSOR_VALUES_KEYFRAME_REQUEST_TOPIC,
+                        json.dumps({"time": time_ms()}),
                         qos=1,
                     )
-                    if power_hub_sensors_new != self.power_hub_sensors:
-                        self.power_hub_sensors = power_hub_sensors_new
-                        await self.control_powerhub(mqtt_client)
-
-                if message.topic.matches(SETPOINTS_TOPIC):
-                    try:
-                        new_setpoints = Setpoints.model_validate_json(message.payload)
-                        self.control_state.setpoints = new_setpoints
-                        logger.info(
-                            f"Processed changed setpoints successfully: {message.payload}"
-                        )
-                    except ValidationError:
-                        logger.error(f"Couldn't process received setpoints ({message})")
-
-                if message.topic.matches(SURVIVAL_MODE_TOPIC):
-                    survival_mode_new = json.loads(message.payload)
-                    logger.info(f"Received survivalmode: {survival_mode_new}")
-                    if (
-                        "survival" in survival_mode_new
-                        and survival_mode_new["survival"] != self.survival_mode
-                    ):
-                        self.survival_mode = survival_mode_new["survival"]
-                        logger.info(
-                            f"Processed changed survival mode {self.survival_mode}"
-                        )
 
-    async def control_powerhub(self, mqtt_client: aiomqtt.Client):
-        if not self.power_hub_sensors:
-            logger.info("No sensor data known, cant control powerhub")
+            if message.topic.matches(SETPOINTS_TOPIC):
+                self.mailbox.put(SETPOINTS_TOPIC, message.payload)
+
+            if message.topic.matches(SURVIVAL_MODE_TOPIC):
+                self.mailbox.put(SURVIVAL_MODE_TOPIC, message.payload)
+
+    async def control_loop(self, mqtt_client: aiomqtt.Client):
+        while True:
+            await self.handle_messages(mqtt_client, await self.mailbox.take())
+
+    async def handle_messages(
+        self,
+        mqtt_client: aiomqtt.Client,
+        messages: dict[str, bytes | PowerHubSensors],
+    ):
+        """Applies the setpoints and survival mode, before running a control cycle on the newest sensor values"""
+        if (setpoints := messages.get(SETPOINTS_TOPIC)) is not None:
+            self.receive_setpoints(cast(bytes, setpoints))
+        if (survival_mode := messages.get(SURVIVAL_MODE_TOPIC)) is not None:
+            self.receive_survival_mode(cast(bytes, survival_mode))
+        sensor_values = messages.get(SENSOR_VALUES_TOPIC)
+        if sensor_values is None:
             return
+        with INSTRUMENTATION.stage("control_cycle"):
+            if isinstance(sensor_values, PowerHubSensors):
+                logger.info(f"Received sensor values delta")
+                power_hub_sensors_new = sensor_values
+            else:
+                logger.info(f"Received sensor values")
+                power_hub_sensors_new = self.decode_sensor_values(sensor_values)
+            if self.is_stale(power_hub_sensors_new):
+                self.stale_sensor_values += 1
+                INSTRUMENTATION.count("stale_sensor_values")
+                logger.warning(
+                    f"Dropped sensor values of {power_hub_sensors_new.time}, older than {CONFIG.sensor_values_max_age}s"
+                )
+                return
+            await self.receive_sensor_values(mqtt_client, power_hub_sensors_new)
 
-        logger.info("Controlling powerhub")
-        control_state, control_values = control_power_hub(
-            self.power_hub,
-            self.control_state,
-            self.power_hub_sensors,
-            self.power_hub_sensors.time,
-            self.survival_mode,
+    def decode_sensor_values(self, payload: bytes) -> PowerHubSensors:
+        if is_wire_format(payload):
+            with INSTRUMENTATION.stage("sensors_from_wire_format"):
+                return SensorWireFormat.of(PowerHubSensors).decode(
+                    self.power_hub, payload
+                )
+        with INSTRUMENTATION.stage("json_decode"):
+            sensor_values = json.loads(payload)
+        with INSTRUMENTATION.stage("sensors_from_json"):
+            return SensorCodec.of(PowerHubSensors).from_dict(
+                self.power_hub, sensor_values
+            )
+
+    def is_stale(self, power_hub_sensors: PowerHubSensors) -> bool:
+        # replays and accelerated simulations stamp simulated times, which can't be aged against the wall clock
+        if (
+            not CONFIG.sensor_values_max_age
+            or CONFIG.simulation_start is not None
+            or CONFIG.simulation_speed != 1
+        ):
+            return False
+        return datetime.now(timezone.utc) - power_hub_sensors.time > timedelta(
+            seconds=CONFIG.sensor_values_max_age
         )
 
-        self.control_state = control_state
+    def receive_setpoints(self, payload: bytes):
+        try:
+            new_setpoints = Setpoints.model_validate_json(payload)
+            self.control_state.setpoints = new_setpoints
+            logger.info(f"Processed changed setpoints successfully: {payload}")
+        except ValidationError:
+            logger.error(f"Couldn't process received setpoints ({payload})")
+
+    def receive_survival_mode(self, payload: bytes):
+        survival_mode_new = json.loads(payload)
+        logger.info(f"Received survivalmode: {survival_mode_new}")
+        if (
+            "survival" in survival_mode_new
+            and survival_mode_new["survival"] != self.survival_mode
+        ):
+            self.survival_mode = survival_mode_new["survival"]
+            logger.info(f"Processed changed survival mode {self.survival_mode}")
+
+    async def start_instrumentation(self, mqtt_client: aiomqtt.Client):
+        INSTRUMENTATION.enabled = True
+        self.metrics_server = await serve_metrics(
+            INSTRUMENTATION, CONFIG.control_metrics_host, CONFIG.control_metrics_port
+        )
+        self.metrics_task = asyncio.create_task(self.publish_metrics(mqtt_client))
+        logger.info(
+            f"Serving control metrics on {CONFIG.control_metrics_host}:{CONFIG.control_metrics_port}/metrics"
+        )
+
+    async def publish_metrics(self, mqtt_client: aiomqtt.Client):
+        while True:
+            await asyncio.sleep(CONFIG.control_metrics_interval)
+            await mqtt_client.publish(
+                CONTROL_METRICS_TOPIC, INSTRUMENTATION.to_json(), qos=1
+            )
+
+    async def publish(
+        self, mqtt_client: aiomqtt.Client, topic: str, payload: str | bytes
+    ):
+        with INSTRUMENTATION.stage(f"publish {topic}"):
+            await mqtt_client.publish(topic, payload=payload, qos=1)
+
+    async def receive_sensor_values(
+        self, mqtt_client: aiomqtt.Client, power_hub_sensors_new: PowerHubSensors
+    ):
+        self.enrichment.offer(self.power_hub_sensors)
+        if not power_hub_sensors_new.same_as(self.power_hub_sensors):
+            self.power_hub_sensors = power_hub_sensors_new
+            await self.control_powerhub(mqtt_client)
+
+    def enrich(self, power_hub_sensors: PowerHubSensors | None) -> str | bytes:
+        with INSTRUMENTATION.stage("sensors_to_json"):
+            return (
+                SensorWireFormat.of(PowerHubSensors, True).encode(power_hub_sensors)
+                if power_hub_sensors
+                and ENRICHED_SENSOR_VALUES_TOPIC in CONFIG.wire_format_topics
+                else sensors_to_json(
+                    power_hub_sensors,
+                    include_properties=True,
+                    properties=set(CONFIG.enriched_sensor_values_properties) or None,
+                )
+            )
 
-        events = self.monitor.run_sensor_value_checks(
-            self.power_hub_sensors,
-            "power_hub_simulation",
-            control_values,
-            self.power_hub,
+    async def publish_enriched_sensor_values(
+        self, mqtt_client: aiomqtt.Client, power_hub_sensors: PowerHubSensors | None
+    ):
+        await self.publish(
+            mqtt_client,
+            ENRICHED_SENSOR_VALUES_TOPIC,
+            await asyncio.to_thread(self.enrich, power_hub_sensors),
         )
+
+    async def check_sensor_values(
+        self, checked: tuple[PowerHubSensors, NetworkControl[PowerHub]]
+    ):
+        await asyncio.to_thread(self.run_checks, *checked)
+
+    def run_checks(
+        self,
+        power_hub_sensors: PowerHubSensors,
+        control_values: NetworkControl[PowerHub],
+    ):
+        with INSTRUMENTATION.stage("sensor_value_checks"):
+            events = self.monitor.run_sensor_value_checks(
+                power_hub_sensors,
+                "power_hub_simulation",
+                control_values,
+                self.power_hub,
+            )
+        now = monotonic()
         if (
-            events != self.last_events or self.cycles_since_events > 60
+            events != self.last_events
+            or now - self.events_sent_at > EVENTS_KEEP_ALIVE_SECONDS
         ):  # keep alive every minute and on change
-            self.notifier.send_events(events)
-            self.cycles_since_events = 0
+            with INSTRUMENTATION.stage("send_events"):
+                self.notifier.send_events(events)
+            self.events_sent_at = now
             self.last_events = events
 
-        await mqtt_client.publish(
-            CONTROL_MODES_TOPIC,
-            control_modes_to_json(self.control_state),
-            qos=1,
-        )
+    async def control_powerhub(self, mqtt_client: aiomqtt.Client):
+        if not self.power_hub_sensors:
+            logger.info("No sensor data known, cant control powerhub")
+            return
+
+        logger.info("Controlling powerhub")
+        with INSTRUMENTATION.stage("control_power_hub"):
+            control_state, control_values = control_power_hub(
+                self.power_hub,
+                self.control_state,
+                self.power_hub_sensors,
+                self.power_hub_sensors.time,
+                self.survival_mode,
+            )
+
+        self.control_state = control_state
 
-        await mqtt_client.publish(
-            CONTROL_VALUES_TOPIC,
-            control_to_json(self.power_hub, control_values),
-            qos=1,
+        with INSTRUMENTATION.stage("control_to_json"):
+            control_values_payload = (
+                self.control_format.encode(control_values)
+                if CONTROL_VALUES_TOPIC in CONFIG.wire_format_topics
+                else control_to_json(self.power_hub, control_values)
+            )
+        await self.publish(mqtt_client, CONTROL_VALUES_TOPIC, control_values_payload)
+        await self.publish(
+            mqtt_client, CONTROL_MODES_TOPIC, control_modes_to_json(self.control_state)
         )
-        self.cycles_since_events += 1
+        self.monitoring.offer((self.power_hub_sensors, control_values))
 
 
 def main():
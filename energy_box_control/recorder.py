@@ -0,0 +1,181 @@
+import json
+from dataclasses import dataclass, fields, is_dataclass
+from datetime import datetime, timedelta
+from enum import Enum
+from math import nan
+from pathlib import Path
+from typing import Any, Callable, Self
+
+import numpy as np
+from numpy.typing import NDArray
+from pandas import DataFrame  # type: ignore
+
+from energy_box_control.appliances.base import ThermalState
+from energy_box_control.network import Network, NetworkState
+
+INDEX_FILE = "index.json"
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def _to_float(value: Any) -> float:
+    if isinstance(value, Enum):
+        value = value.value
+    if isinstance(value, (bool, int, float)):
+        return float(value)
+    return nan
+
+
+@dataclass(frozen=True)
+class TraceColumn:
+    name: str
+    appliance: str | None
+    port: str | None
+    field: str
+
+
+class TraceRecorder:
+    """Records every appliance state field and port signal of a simulation into a columnar trace
+
+    Rows are buffered in a preallocated (columns, chunk_size) array. Full chunks are written to .npy files and
+    an index file maps column names to appliances and ports, so the trace can be memory mapped with `Trace`.
+    """
+
+    def __init__(
+        self,
+        network: Network[Any],
+        directory: Path | str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        self._network = network
+        self._directory = Path(directory)
+        self._chunk_size = chunk_size
+        self._columns: list[TraceColumn] = []
+        self._extractors: list[Callable[[NetworkState[Any]], Any]] = []
+        self._buffer: NDArray[np.float64] | None = None
+        self._rows = 0
+        self._chunks: list[dict[str, Any]] = []
+        self._start_step = 0
+        self._time: dict[str, Any] = {}
+
+    def _define_columns(self, state: NetworkState[Any]):
+        self._columns = [TraceColumn("step", None, None, "step")]
+        self._extractors = [lambda state: state.time.step]
+
+        def _state_field(id: Any, field: str) -> Callable[[NetworkState[Any]], Any]:
+            return lambda state: getattr(state.get_appliances_states()[id], field)
+
+        def _signal_field(key: Any, field: str) -> Callable[[NetworkState[Any]], Any]:
+            return lambda state: getattr(state.get_signal().get(key, None), field, nan)
+
+        plan = self._network.execution_plan
+        for planned in plan.appliances:
+            appliance_state = state.get_appliances_states().get(planned.appliance.id)
+            if is_dataclass(appliance_state):
+                for field in fields(appliance_state):
+                    self._columns.append(
+                        TraceColumn(
+                            f"{planned.name}.{field.name}",
+                            planned.name,
+                            None,
+                            field.name,
+                        )
+                    )
+                    self._extractors.append(
+                        _state_field(planned.appliance.id, field.name)
+                    )
+
+        names = {planned.appliance.id: planned.name for planned in plan.appliances}
+        for key in plan.signal_keys:
+            id, port = key
+            for field in fields(ThermalState):
+                self._columns.append(
+                    TraceColumn(
+                        f"{names[id]}.{port.value}.{field.name}",
+                        names[id],
+                        port.value,
+                        field.name,
+                    )
+                )
+                self._extractors.append(_signal_field(key, field.name))
+
+        self._buffer = np.empty((len(self._columns), self._chunk_size))
+        self._start_step = state.time.step
+        self._time = {
+            "start": state.time.start.isoformat(),
+            "step_size_seconds": state.time.step_seconds,
+        }
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+    def record(self, state: NetworkState[Any]):
+        if self._buffer is None:
+            self._define_columns(state)
+        buffer = self._buffer
+        assert buffer is not None
+        buffer[:, self._rows] = [
+            _to_float(extractor(state)) for extractor in self._extractors
+        ]
+        self._rows += 1
+        if self._rows == self._chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer is None or self._rows == 0:
+            return
+        file = f"chunk_{len(self._chunks):06d}.npy"
+        np.save(self._directory / file, self._buffer[:, : self._rows])
+        self._chunks.append({"file": file, "rows": self._rows})
+        self._rows = 0
+        self._write_index()
+
+    def _write_index(self):
+        index = {
+            "columns": [vars(column) for column in self._columns],
+            "chunks": self._chunks,
+            "start_step": self._start_step,
+            **self._time,
+        }
+        temporary = self._directory / f"{INDEX_FILE}.tmp"
+        temporary.write_text(json.dumps(index))
+        temporary.replace(self._directory / INDEX_FILE)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_: Any):
+        self.close()
+
+
+class Trace:
+    """Memory mapped read access to a trace written by `TraceRecorder`"""
+
+    def __init__(self, directory: Path | str):
+        directory = Path(directory)
+        index = json.loads((directory / INDEX_FILE).read_text())
+        self.columns = [TraceColumn(**column) for column in index["columns"]]
+        self.start_step: int = index["start_step"]
+        self.start = datetime.fromisoformat(index["start"])
+        self.step_size = timedelta(seconds=index["step_size_seconds"])
+        self._column_index = {
+            column.name: position for position, column in enumerate(self.columns)
+        }
+        self.chunks: list[NDArray[np.float64]] = [
+            np.load(directory / chunk["file"], mmap_mode="r")
+            for chunk in index["chunks"]
+        ]
+
+    def __len__(self) -> int:
+        return sum(chunk.shape[1] for chunk in self.chunks)
+
+    def column(self, name: str) -> NDArray[np.float64]:
+        # a view into the memory map for single chunk traces, concatenated otherwise
+        position = self._column_index[name]
+        if len(self.chunks) == 1:
+            return self.chunks[0][position]
+        return np.concatenate([chunk[position] for chunk in self.chunks])
+
+    def to_dataframe(self, columns: list[str] | None = None) -> DataFrame:
+        names = columns if columns is not None else list(self._column_index)
+        return DataFrame({name: self.column(name) for name in names})
@@ -0,0 +1,255 @@
+import csv
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Mapping
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+from energy_box_control.custom_logging import get_logger
+from energy_box_control.schedules import PeriodicArraySchedule
+
+logger = get_logger(__name__)
+
+INDEX_FILE = "index.json"
+STORE_SUFFIX = ".schedules"
+VERSION = 1
+
+
+@dataclass(frozen=True)
+class StoredColumn:
+    name: str
+    unit: str
+    file: str
+
+
+class ScheduleStore:
+    """Equally spaced series stored as one float64 .npy file per column with a small json index
+
+    Opening a store reads the index and memory maps the columns, without reading them. The store is a link to a
+    version of it, opened as a whole, so it stays readable when a writer replaces it.
+    """
+
+    def __init__(self, directory: Path | str):
+        self.directory = Path(directory)
+        version = self.directory.resolve()
+        index = json.loads((version / INDEX_FILE).read_text())
+        if index.get("version") != VERSION:
+            raise ValueError(
+                f"unsupported schedule store version {index.get('version')}"
+            )
+        self.start = datetime.fromisoformat(index["start"])
+        self.interval = timedelta(seconds=index["interval_seconds"])
+        self.length: int = index["length"]
+        self.source: dict[str, str] | None = index.get("source")
+        self.columns = {
+            column["name"]: StoredColumn(**column) for column in index["columns"]
+        }
+        self._values: dict[str, NDArray[np.float64]] = {
+            name: np.load(version / column.file, mmap_mode="r")
+            for name, column in self.columns.items()
+        }
+
+    @property
+    def period(self) -> timedelta:
+        return self.interval * self.length
+
+    def values(self, name: str) -> NDArray[np.float64]:
+        return self._values[name]
+
+    def schedule(self, name: str) -> PeriodicArraySchedule:
+        return PeriodicArraySchedule(self.start, self.period, self.values(name))
+
+
+def _versions(directory: Path) -> list[Path]:
+    return [
+        path
+        for path in directory.parent.glob(f".{directory.name}.*")
+        if path.is_dir() and not path.name.endswith(".tmp")
+    ]
+
+
+def _swap(directory: Path, temporary: Path):
+    # under a lock, so concurrent writers swap one at a time and never prune a version another one just swapped in
+    with open(directory.with_name(f".{directory.name}.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        version = temporary.with_name(temporary.name.removesuffix(".tmp"))
+        temporary.rename(version)
+        previous = directory.resolve() if directory.is_symlink() else None
+        if directory.is_dir() and not directory.is_symlink():
+            # a store written before stores were versioned
+            shutil.rmtree(directory)
+        link = version.with_name(f"{version.name}.link")
+        link.symlink_to(version.name)
+        os.replace(link, directory)
+        # the previous version is kept a write longer, for readers that resolved the link just before the swap
+        for old in _versions(directory):
+            if old not in (version, previous):
+                shutil.rmtree(old, ignore_errors=True)
+
+
+def write_schedule_store(
+    directory: Path | str,
+    start: datetime,
+    interval: timedelta,
+    columns: Mapping[str, ArrayLike],
+    units: Mapping[str, str] = {},
+    source: dict[str, str] | None = None,
+) -> ScheduleStore:
+    """Writes a schedule store as a new version of it, which replaces the link to the previous version at once
+
+    Readers see either the previous or the new store, never a partial one. Of concurrent writers the last one to
+    finish wins.
+    """
+    directory = Path(directory)
+    arrays = {
+        name: np.asarray(values, dtype=np.float64) for name, values in columns.items()
+    }
+    lengths = {len(values) for values in arrays.values()}
+    if len(lengths) != 1:
+        raise ValueError("columns of a schedule store need to be of the same length")
+
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    temporary = directory.with_name(f".{directory.name}.{uuid.uuid4().hex}.tmp")
+    temporary.mkdir()
+    try:
+        stored: list[dict[str, str]] = []
+        for position, (name, values) in enumerate(arrays.items()):
+            file = f"column_{position:04d}.npy"
+            np.save(temporary / file, values)
+            stored.append(vars(StoredColumn(name, units.get(name, ""), file)))
+        (temporary / INDEX_FILE).write_text(
+            json.dumps(
+                {
+                    "version": VERSION,
+                    "start": start.isoformat(),
+                    "interval_seconds": interval.total_seconds(),
+                    "length": lengths.pop(),
+                    "source": source,
+                    "columns": stored,
+                }
+            )
+        )
+        _swap(directory, temporary)
+    finally:
+        shutil.rmtree(temporary, ignore_errors=True)
+    return ScheduleStore(directory)
+
+
+def _source_signature(path: Path) -> dict[str, str]:
+    # by content, so a store stays current when the csv is copied, like into an image, or checked out again
+    return {"sha256": hashlib.sha256(path.read_bytes()).hexdigest()}
+
+
+def convert_csv(
+    csv_path: Path | str,
+    directory: Path | str,
+    units: Mapping[str, str] = {},
+) -> ScheduleStore:
+    """Converts a csv with timestamps in the first column and a series per other column into a schedule store
+
+    Timestamps need to be equally spaced, naive timestamps are taken to be in UTC.
+    """
+    csv_path = Path(csv_path)
+    with open(csv_path, newline="") as file:
+        reader = csv.reader(file)
+        names = next(reader)[1:]
+        timestamps: list[datetime] = []
+        rows: list[list[float]] = []
+        for row in reader:
+            timestamps.append(datetime.fromisoformat(row[0]))
+            rows.append([float(value) if value else np.nan for value in row[1:]])
+
+    if len(timestamps) < 2:
+        raise ValueError(f"{csv_path} needs at least two rows")
+    interval = timestamps[1] - timestamps[0]
+    if any(
+        later - earlier != interval
+        for earlier, later in zip(timestamps, timestamps[1:])
+    ):
+        raise ValueError(f"timestamps in {csv_path} aren't equally spaced")
+    start = timestamps[0]
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+
+    values = np.array(rows, dtype=np.float64).reshape(len(rows), len(names))
+    return write_schedule_store(
+        directory,
+        start,
+        interval,
+        {name: values[:, position] for position, name in enumerate(names)},
+        units,
+        _source_signature(csv_path),
+    )
+
+
+def default_cache_directory() -> Path:
+    return (
+        Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+        / "energy_box_control"
+    )
+
+
+def _current_store(directory: Path, signature: dict[str, str]) -> ScheduleStore | None:
+    try:
+        store = ScheduleStore(directory)
+    except (OSError, ValueError, KeyError):
+        return None
+    return store if store.source == signature else None
+
+
+def store_for_csv(
+    csv_path: Path | str,
+    units: Mapping[str, str] = {},
+    cache_directory: Path | str | None = None,
+) -> ScheduleStore:
+    """The schedule store of a csv, converting the csv when there is no up to date store
+
+    A store next to the csv, as built into the image by running this module on the csv, is used when it is up to
+    date. Otherwise the csv is converted into the cache directory, $XDG_CACHE_HOME/energy_box_control by default, as
+    the csv may be in a read only package.
+    """
+    csv_path = Path(csv_path)
+    signature = _source_signature(csv_path)
+    if store := _current_store(csv_path.with_suffix(STORE_SUFFIX), signature):
+        return store
+    path_hash = hashlib.sha256(str(csv_path.resolve()).encode()).hexdigest()[:12]
+    cached = Path(cache_directory or default_cache_directory()) / (
+        f"{csv_path.stem}-{path_hash}{STORE_SUFFIX}"
+    )
+    if store := _current_store(cached, signature):
+        return store
+    logger.info(f"converting {csv_path} into a schedule store in {cached}")
+    return convert_csv(csv_path, cached, units)
+
+
+def main(arguments: list[str] | None = None):
+    parser = ArgumentParser(description="Converts a schedule csv into a schedule store")
+    parser.add_argument("csv", type=Path)
+    parser.add_argument("store", type=Path, nargs="?")
+    parser.add_argument(
+        "--unit",
+        action="append",
+        default=[],
+        help="unit of a column as <column>=<unit>",
+    )
+    args = parser.parse_args(arguments)
+    units = dict(unit.split("=", 1) for unit in args.unit)
+    store = convert_csv(
+        args.csv, args.store or args.csv.with_suffix(STORE_SUFFIX), units
+    )
+    logger.info(
+        f"stored {len(store.columns)} columns of {store.length} values from {store.start} every {store.interval} in {store.directory}"
+    )
+
+
+if __name__ == "__main__":
+    main()
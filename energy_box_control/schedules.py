@@ -1,15 +1,101 @@
-from dataclasses import dataclass
-from datetime import datetime, timedelta
-from math import floor
-from typing import Protocol
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from math import floor, isnan
+from typing import Any, Literal, Protocol, Sequence, Sized
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
 
 from energy_box_control.time import ProcessTime
 
+type Interpolation = Literal["hold", "linear"]
+
+SAMPLE_CHUNK_SIZE = 24 * 60 * 60
+SAMPLE_MAX_CHUNKS = 4
+
 
 class Schedule[T](Protocol):
     def at(self, time: ProcessTime) -> T: ...
 
 
+def _microseconds(delta: timedelta) -> int:
+    return delta // timedelta(microseconds=1)
+
+
+def _step_offsets(
+    start: datetime, step_size: timedelta, first: int, count: int, origin: datetime
+) -> NDArray[np.int64]:
+    # exact integer offsets in microseconds from the origin for the given steps
+    return _microseconds(start - origin) + _microseconds(step_size) * np.arange(
+        first, first + count, dtype=np.int64
+    )
+
+
+def _interpolate(
+    values: NDArray[np.float64],
+    index: NDArray[np.int64],
+    fraction: NDArray[np.float64],
+    next_index: NDArray[np.int64],
+    interpolation: Interpolation | None,
+) -> NDArray[np.float64]:
+    if interpolation != "linear":
+        return values[index]
+    return values[index] + fraction * (values[next_index] - values[index])
+
+
+def _sample_periodic(
+    schedule_start: datetime,
+    schedule_period: timedelta,
+    values: NDArray[np.float64],
+    start: datetime,
+    step_size: timedelta,
+    first: int,
+    count: int,
+    interpolation: Interpolation | None,
+) -> NDArray[np.float64]:
+    period = _microseconds(schedule_period)
+    positions = (
+        _step_offsets(start, step_size, first, count, schedule_start)
+        % period
+        * len(values)
+    )
+    index = positions // period
+    return _interpolate(
+        values,
+        index,
+        (positions - index * period) / period,
+        (index + 1) % len(values),
+        interpolation,
+    )
+
+
+def sample_schedule(
+    schedule: Schedule[Any],
+    start: datetime,
+    step_size: timedelta,
+    first: int,
+    count: int,
+    interpolation: Interpolation | None = None,
+) -> NDArray[np.float64]:
+    """Values of a numeric schedule at steps first up to first + count of a simulation
+
+    Schedules with a `sample` method are sampled in one vectorized call, others step by step, which holds their values.
+    Without an interpolation schedules use their own, which is holding values unless configured otherwise. Steps a
+    schedule has no value for are nan.
+    """
+    sample = getattr(schedule, "sample", None)
+    if sample is not None:
+        return sample(start, step_size, first, count, interpolation)
+    return np.array(
+        [
+            schedule.at(ProcessTime(step_size, step, start))
+            for step in range(first, first + count)
+        ],
+        dtype=np.float64,
+    )
+
+
 @dataclass(frozen=True)
 class ConstSchedule[T](Schedule[T]):
     value: T
@@ -17,6 +103,16 @@ class ConstSchedule[T](Schedule[T]):
     def at(self, time: ProcessTime) -> T:
         return self.value
 
+    def sample(
+        self,
+        start: datetime,
+        step_size: timedelta,
+        first: int,
+        count: int,
+        interpolation: Interpolation | None = None,
+    ) -> NDArray[np.float64]:
+        return np.full(count, self.value, dtype=np.float64)
+
 
 @dataclass(frozen=True)
 class PeriodicSchedule[T](Schedule[T]):
@@ -33,6 +129,67 @@ class PeriodicSchedule[T](Schedule[T]):
             )
         ]
 
+    def sample(
+        self,
+        start: datetime,
+        step_size: timedelta,
+        first: int,
+        count: int,
+        interpolation: Interpolation | None = None,
+    ) -> NDArray[np.float64]:
+        return _sample_periodic(
+            self.schedule_start,
+            self.period,
+            np.asarray(self.values, dtype=np.float64),
+            start,
+            step_size,
+            first,
+            count,
+            interpolation,
+        )
+
+
+@dataclass(frozen=True, eq=False)
+class PeriodicArraySchedule(Schedule[float]):
+    """PeriodicSchedule over an array of values, such as a memory mapped schedule store column
+
+    Compared by identity, as the values can be too large to compare.
+    """
+
+    schedule_start: datetime
+    period: timedelta
+    values: NDArray[np.float64]
+
+    def at(self, time: ProcessTime) -> float:
+        return float(
+            self.values[
+                floor(
+                    ((time.timestamp - self.schedule_start) % self.period)
+                    * len(self.values)
+                    / self.period
+                )
+            ]
+        )
+
+    def sample(
+        self,
+        start: datetime,
+        step_size: timedelta,
+        first: int,
+        count: int,
+        interpolation: Interpolation | None = None,
+    ) -> NDArray[np.float64]:
+        return _sample_periodic(
+            self.schedule_start,
+            self.period,
+            self.values,
+            start,
+            step_size,
+            first,
+            count,
+            interpolation,
+        )
+
 
 @dataclass(frozen=True)
 class GivenSchedule[T](Schedule[T]):
@@ -56,3 +213,270 @@ class GivenSchedule[T](Schedule[T]):
                 * len(self.values)
             )
         ]
+
+    def sample(
+        self,
+        start: datetime,
+        step_size: timedelta,
+        first: int,
+        count: int,
+        interpolation: Interpolation | None = None,
+    ) -> NDArray[np.float64]:
+        duration = _microseconds(self.schedule_end - self.schedule_start)
+        offsets = _step_offsets(start, step_size, first, count, self.schedule_start)
+        within = (0 <= offsets) & (offsets <= duration)
+        positions = np.clip(offsets, 0, duration) * len(self.values)
+        index = np.minimum(positions // duration, len(self.values) - 1)
+        values = _interpolate(
+            np.asarray(self.values, dtype=np.float64),
+            index,
+            (positions - index * duration) / duration,
+            np.minimum(index + 1, len(self.values) - 1),
+            interpolation,
+        )
+        return np.where(within, values, np.nan)
+
+
+def _check_timestamped(times: Sized, values: Sized):
+    if len(times) != len(values) or not len(times):
+        raise ValueError(
+            "a timestamped schedule needs as many values as timestamps, and at least one"
+        )
+
+
+@dataclass(frozen=True, eq=False)
+class TimestampedSchedule(Schedule[float]):
+    """Values at irregular, sorted timestamps, such as recorded sensor data with gaps and jitter
+
+    Between timestamps the previous value is held or values are interpolated linearly. Lookups binary search the
+    timestamps from a cursor at the previous lookup, so stepping through the schedule in order is O(1) amortised.
+    Times before the first or after the last timestamp are outside of the schedule.
+    """
+
+    origin: datetime
+    times: NDArray[np.int64]  # microseconds since origin
+    values: NDArray[np.float64]
+    interpolation: Interpolation = "hold"
+    _offsets: list[int] = field(init=False, repr=False)
+    _cursor: list[int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        _check_timestamped(self.times, self.values)
+        if np.any(np.diff(self.times) < 0):
+            raise ValueError("timestamps of a timestamped schedule need to be sorted")
+        object.__setattr__(self, "_offsets", self.times.tolist())
+        object.__setattr__(self, "_cursor", [0])
+
+    @staticmethod
+    def from_datetimes(
+        timestamps: Sequence[datetime],
+        values: ArrayLike,
+        interpolation: Interpolation = "hold",
+    ) -> "TimestampedSchedule":
+        values = np.asarray(values, dtype=np.float64)
+        _check_timestamped(timestamps, values)
+        order = sorted(range(len(timestamps)), key=lambda index: timestamps[index])
+        origin = timestamps[order[0]]
+        return TimestampedSchedule(
+            origin,
+            np.array(
+                [_microseconds(timestamps[index] - origin) for index in order],
+                dtype=np.int64,
+            ),
+            values[order],
+            interpolation,
+        )
+
+    @staticmethod
+    def from_epoch_ms(
+        times: ArrayLike, values: ArrayLike, interpolation: Interpolation = "hold"
+    ) -> "TimestampedSchedule":
+        times = np.asarray(times, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        _check_timestamped(times, values)
+        order = np.argsort(times, kind="stable")
+        return TimestampedSchedule(
+            datetime.fromtimestamp(0, tz=timezone.utc),
+            times[order] * 1000,
+            values[order],
+            interpolation,
+        )
+
+    @staticmethod
+    def from_series(
+        series: Any, interpolation: Interpolation = "hold"
+    ) -> "TimestampedSchedule":
+        # a pandas series with a DatetimeIndex, like the columns of InfluxDB query results; missing values are dropped
+        series = series.dropna().sort_index()
+        index = series.index
+        if index.tz is not None:
+            index = index.tz_convert("UTC").tz_localize(None)
+        return TimestampedSchedule(
+            datetime.fromtimestamp(0, tz=timezone.utc),
+            np.asarray(
+                (index - np.datetime64("1970-01-01")) // np.timedelta64(1, "us"),
+                dtype=np.int64,
+            ),
+            series.to_numpy(dtype=np.float64),
+            interpolation,
+        )
+
+    @property
+    def schedule_start(self) -> datetime:
+        return self.origin + timedelta(microseconds=int(self.times[0]))
+
+    @property
+    def schedule_end(self) -> datetime:
+        return self.origin + timedelta(microseconds=int(self.times[-1]))
+
+    def _index(self, offset: int) -> int:
+        # the last timestamp at or before offset, looked up from the cursor first
+        offsets = self._offsets
+        cursor = self._cursor
+        index = cursor[0]
+        last = len(offsets) - 1
+        if offsets[index] <= offset:
+            if index == last or offset < offsets[index + 1]:
+                return index
+            if index + 1 == last or offset < offsets[index + 2]:
+                cursor[0] = index + 1
+                return index + 1
+        index = bisect_right(offsets, offset) - 1
+        cursor[0] = max(index, 0)
+        return index
+
+    def at(self, time: ProcessTime) -> float:
+        offset = _microseconds(time.timestamp - self.origin)
+        index = self._index(offset)
+        offsets = self._offsets
+        if index < 0 or offset > offsets[-1]:
+            raise ValueError(
+                f"Time {time.timestamp.strftime('%d/%m/%Y %H:%M:%S')} is outside of timestamped schedule from {self.schedule_start} to {self.schedule_end}"
+            )
+        value = float(self.values[index])
+        if self.interpolation == "hold" or offset == offsets[index]:
+            return value
+        return value + (offset - offsets[index]) / (
+            offsets[index + 1] - offsets[index]
+        ) * (float(self.values[index + 1]) - value)
+
+    def sample(
+        self,
+        start: datetime,
+        step_size: timedelta,
+        first: int,
+        count: int,
+        interpolation: Interpolation | None = None,
+    ) -> NDArray[np.float64]:
+        interpolation = interpolation or self.interpolation
+        offsets = _step_offsets(start, step_size, first, count, self.origin)
+        last = len(self.times) - 1
+        within = (self.times[0] <= offsets) & (offsets <= self.times[-1])
+        index = np.clip(np.searchsorted(self.times, offsets, side="right") - 1, 0, last)
+        next_index = np.minimum(index + 1, last)
+        span = self.times[next_index] - self.times[index]
+        fraction = np.divide(
+            offsets - self.times[index],
+            span,
+            out=np.zeros(count, dtype=np.float64),
+            where=span > 0,
+        )
+        values = _interpolate(self.values, index, fraction, next_index, interpolation)
+        return np.where(within, values, np.nan)
+
+
+@dataclass(frozen=True)
+class StackedSchedule[T](Schedule[Any]):
+    schedules: tuple[Schedule[T], ...]
+
+    def at(self, time: ProcessTime) -> Any:
+        return np.array([schedule.at(time) for schedule in self.schedules])
+
+
+@dataclass(frozen=True)
+class SampledSchedule(Schedule[float]):
+    """A numeric schedule sampled once per step of a simulation with the given start and step size
+
+    Samples are filled lazily a chunk of steps at a time, only the chunk of the step asked for, so `at` is an array
+    lookup for the simulation the schedule is sampled for, and for simulations with a start a whole number of steps
+    away, like one rebased onto the start by a checkpoint. The most recently filled max_chunks chunks are kept. Other
+    times, and steps the schedule has no value for, are passed on to the wrapped schedule. Share one SampledSchedule
+    between appliances using the same schedule to share its samples.
+    """
+
+    schedule: Schedule[float]
+    start: datetime
+    step_size: timedelta
+    interpolation: Interpolation | None = None
+    chunk_size: int = SAMPLE_CHUNK_SIZE
+    max_chunks: int = SAMPLE_MAX_CHUNKS
+    _chunks: dict[int, NDArray[np.float64]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _offsets: dict[datetime, int | None] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    def _fill(self, chunk: int) -> NDArray[np.float64]:
+        if len(self._chunks) >= self.max_chunks:
+            # chunks are kept in the order they were filled
+            del self._chunks[next(iter(self._chunks))]
+        samples = self._chunks[chunk] = sample_schedule(
+            self.schedule,
+            self.start,
+            self.step_size,
+            chunk * self.chunk_size,
+            self.chunk_size,
+            self.interpolation,
+        )
+        return samples
+
+    def _offset(self, start: datetime) -> int | None:
+        # the steps from the sampled start to start, None when start isn't on a step
+        if start not in self._offsets:
+            steps, remainder = divmod(start - self.start, self.step_size)
+            self._offsets[start] = None if remainder else steps
+        return self._offsets[start]
+
+    def at(self, time: ProcessTime) -> float:
+        step = time.step
+        if time.start is not self.start and time.start != self.start:
+            offset = self._offset(time.start)
+            sample = None if offset is None else step + offset
+        else:
+            sample = step
+        if sample is not None and time.step_size == self.step_size and sample >= 0:
+            chunk, offset = divmod(sample, self.chunk_size)
+            samples = self._chunks.get(chunk)
+            if samples is None:
+                samples = self._fill(chunk)
+            value = float(samples[offset])
+            if not isnan(value):
+                return value
+        if self.interpolation is None:
+            return self.schedule.at(time)
+        return float(
+            sample_schedule(
+                self.schedule, time.start, time.step_size, step, 1, self.interpolation
+            )[0]
+        )
+
+
+def sampled_schedules[
+    S: Schedule[Any]
+](
+    schedules: dict[str, S],
+    start: datetime,
+    step_size: timedelta,
+    interpolation: Interpolation | None = None,
+) -> dict[str, Schedule[Any]]:
+    """Wraps schedules in SampledSchedules, wrapping every schedule object once so they share their samples"""
+    sampled: dict[int, Schedule[Any]] = {}
+    for schedule in schedules.values():
+        if id(schedule) not in sampled:
+            sampled[id(schedule)] = (
+                schedule
+                if isinstance(schedule, ConstSchedule)
+                else SampledSchedule(schedule, start, step_size, interpolation)
+            )
+    return {name: sampled[id(schedule)] for name, schedule in schedules.items()}
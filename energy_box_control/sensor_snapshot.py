@@ -0,0 +1,264 @@
+from abc import ABCMeta
+from datetime import datetime
+from functools import cache
+from operator import attrgetter
+from typing import Any, Callable, cast, get_type_hints
+
+import numpy as np
+from numpy.typing import NDArray
+
+from energy_box_control.network import Network
+from energy_box_control.sensors import DerivedProperty, NetworkSensors, sensor_builds
+from energy_box_control.time import datetime_to_ms, ms_to_datetime
+
+
+class _FloatValue:
+    # a value of a sensor view, read from the snapshot array
+    __slots__ = ("index",)
+
+    def __init__(self, index: int):
+        self.index = index
+
+    def __get__(self, view: Any, owner: type | None = None) -> Any:
+        if view is None:
+            return self
+        return view._values.item(self.index)
+
+    def __set__(self, view: Any, value: Any):
+        raise AttributeError("sensor snapshots are read only")
+
+
+class _IntValue(_FloatValue):
+    __slots__ = ()
+
+    def __get__(self, view: Any, owner: type | None = None) -> Any:
+        if view is None:
+            return self
+        value = view._values.item(self.index)
+        # nan stays nan, like a missing int sensor value
+        return int(value) if value.is_integer() else value
+
+
+class _BoolValue(_FloatValue):
+    __slots__ = ()
+
+    def __get__(self, view: Any, owner: type | None = None) -> Any:
+        if view is None:
+            return self
+        return bool(view._values.item(self.index))
+
+
+_VALUES: dict[Any, type[_FloatValue]] = {
+    float: _FloatValue,
+    int: _IntValue,
+    bool: _BoolValue,
+}
+
+
+class _DerivedValue:
+    # a derived property of a sensor view, computed once as snapshots are read only
+    __slots__ = ("name", "fget")
+
+    def __init__(self, name: str, fget: Callable[[Any], Any]):
+        self.name = name
+        self.fget = fget
+
+    def __get__(self, view: Any, owner: type | None = None) -> Any:
+        if view is None:
+            return self
+        derived: dict[str, Any] = view._derived
+        if self.name not in derived:
+            derived[self.name] = self.fget(view)
+        return derived[self.name]
+
+
+def _read_only(view: Any, name: str, value: Any):
+    raise AttributeError("sensor snapshots are read only")
+
+
+def _shared_members(sensor_cls: type) -> dict[str, Any]:
+    # the properties, methods and constants of a sensor class and its bases, besides the protocols it implements
+    members: dict[str, Any] = {}
+    for klass in reversed(sensor_cls.__mro__):
+        if klass is object or klass.__module__ == "typing":
+            continue
+        if klass.__dict__.get("_is_protocol", False):
+            continue
+        members.update(
+            (name, member)
+            for name, member in vars(klass).items()
+            if not name.startswith("__") or name in ("__eq__", "__hash__")
+        )
+    return members
+
+
+def _view_class(
+    sensor_cls: type, positions: dict[str, int], slots: tuple[str, ...]
+) -> type:
+    hints = get_type_hints(sensor_cls)
+    namespace: dict[str, Any] = {
+        name: (
+            _DerivedValue(name, member.fget)
+            if isinstance(member, DerivedProperty) and member.fget
+            else member
+        )
+        for name, member in _shared_members(sensor_cls).items()
+        if name not in positions and name not in slots
+    }
+    namespace["__slots__"] = ("_values", "_derived", *slots)
+    namespace["__setattr__"] = _read_only
+    for name, position in positions.items():
+        if hints[name] not in _VALUES:
+            raise TypeError(
+                f"{sensor_cls.__name__}.{name} of type {hints[name]} can't be held in a sensor snapshot"
+            )
+        namespace[name] = _VALUES[hints[name]](position)
+    view_cls = type(f"{sensor_cls.__name__}View", (), namespace)
+    # sensor classes are protocol implementations, of which the abc machinery registers virtual subclasses
+    ABCMeta.register(cast(ABCMeta, sensor_cls), view_cls)
+    return view_cls
+
+
+class SensorLayout[T: NetworkSensors]:
+    """Positions of the raw values of network sensors in a single float64 array
+
+    A snapshot built from an array holds views of a copy of it in place of the sensor objects. A view shares the
+    properties and methods of its sensor class and is registered as a virtual subclass of it, without inheriting its
+    instance dict: its appliance and sub-sensors are in `__slots__` and its values are read from the array. The properties of the sensor classes
+    work on the views as they do on the sensors themselves, derived properties are computed once per view. Ints and
+    bools are stored as floats and read back as ints and bools.
+    """
+
+    def __init__(self, cls: type[T]):
+        self._cls = cls
+        paths: list[str] = []
+        self._fields = tuple((build.name, build.values) for build in sensor_builds(cls))
+        self._sensors: list[
+            tuple[str, type[object], tuple[str, ...], tuple[str, ...]]
+        ] = []
+        for build in sensor_builds(cls):
+            positions = {
+                name: len(paths) + offset for offset, name in enumerate(build.values)
+            }
+            paths.extend(f"{build.name}.{name}" for name in build.values)
+            view = _view_class(
+                build.cls, positions, build.appliances + tuple(build.sub_sensors)
+            )
+            self._sensors.append(
+                (build.name, view, build.appliances, tuple(build.sub_sensors))
+            )
+        self.paths = tuple(paths)
+        self._positions = {path: position for position, path in enumerate(paths)}
+        self._values = attrgetter(*paths)
+
+    @staticmethod
+    def of[S: NetworkSensors](sensors_cls: type[S]) -> "SensorLayout[S]":
+        return _layout(sensors_cls)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def position(self, path: str) -> int:
+        """Position of a value in the array, given as `<sensor>.<field>`"""
+        return self._positions[path]
+
+    def fill(
+        self, sensors: T, out: NDArray[np.float64] | None = None
+    ) -> NDArray[np.float64]:
+        values = self._values(sensors)
+        if out is None:
+            return np.array(values, dtype=np.float64)
+        out[:] = values
+        return out
+
+    def from_dict(self, values: dict[str, Any]) -> NDArray[np.float64]:
+        """The array of values in the form of SensorCodec.to_dict, of which missing values are nan"""
+        return np.fromiter(
+            (
+                sensor_values.get(field, np.nan)
+                for name, fields in self._fields
+                for sensor_values in [values.get(name, {})]
+                for field in fields
+            ),
+            dtype=np.float64,
+            count=len(self.paths),
+        )
+
+    def snapshot(
+        self, network: Network[T], time: datetime, values: NDArray[np.float64]
+    ) -> T:
+        """Network sensors of which the sensors are views of a read only copy of the values
+
+        Copied, so the derived properties computed on the views stay valid when the caller reuses its array.
+        """
+        if values.shape != (len(self.paths),):
+            raise ValueError(
+                f"expected {len(self.paths)} sensor values, got an array of shape {values.shape}"
+            )
+        values = values.copy()
+        values.flags.writeable = False
+        built: dict[str, Any] = {}
+        for name, view_cls, appliances, sub_sensors in self._sensors:
+            view = object.__new__(view_cls)
+            # past the setattr of the views, which are read only
+            object.__setattr__(view, "_values", values)
+            object.__setattr__(view, "_derived", {})
+            appliance = getattr(network, name, None)
+            for field in appliances:
+                object.__setattr__(view, field, appliance)
+            for field in sub_sensors:
+                object.__setattr__(view, field, built[field])
+            built[name] = view
+        # network sensors are dataclasses of their time and sensors
+        return cast(Callable[..., T], self._cls)(time=time, **built)
+
+
+@cache
+def _layout(cls: type[NetworkSensors]) -> SensorLayout[Any]:
+    return SensorLayout(cls)
+
+
+class SensorHistory[T: NetworkSensors]:
+    """The last snapshots of network sensors as the rows of a (capacity, values) float64 array, oldest first"""
+
+    def __init__(self, cls: type[T], capacity: int):
+        if capacity < 1:
+            raise ValueError("a sensor history needs a capacity of at least one")
+        self.layout = SensorLayout.of(cls)
+        self._rows = np.full((capacity, len(self.layout)), np.nan)
+        self._times = np.zeros(capacity, dtype=np.int64)
+        self._appended = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._rows)
+
+    def __len__(self) -> int:
+        return min(self._appended, self.capacity)
+
+    def append(self, sensors: T):
+        row = self._appended % self.capacity
+        self.layout.fill(sensors, self._rows[row])
+        self._times[row] = datetime_to_ms(getattr(sensors, "time"))
+        self._appended += 1
+
+    def _order(self) -> NDArray[np.intp]:
+        if self._appended <= self.capacity:
+            return np.arange(self._appended)
+        return np.roll(np.arange(self.capacity), -(self._appended % self.capacity))
+
+    def times(self) -> NDArray[np.int64]:
+        """Times of the snapshots in ms"""
+        return self._times[self._order()]
+
+    def values(self, path: str | None = None) -> NDArray[np.float64]:
+        """All values of the snapshots, or the values at a path given as `<sensor>.<field>`"""
+        if path is None:
+            return self._rows[self._order()]
+        return self._rows[self._order(), self.layout.position(path)]
+
+    def snapshot(self, network: Network[T], index: int = -1) -> T:
+        row = self._order()[index]
+        return self.layout.snapshot(
+            network, ms_to_datetime(int(self._times[row])), self._rows[row]
+        )
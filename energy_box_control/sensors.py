@@ -1,9 +1,11 @@
 from dataclasses import Field, dataclass, fields
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
+import hashlib
 import json
 from math import nan
 import math
+import struct
 from uuid import UUID
 
 from energy_box_control.appliances.base import (
@@ -16,10 +18,13 @@ from energy_box_control.appliances.base import (
 )
 from inspect import getmembers, isclass
 from typing import (
+    AbstractSet,
     Any,
     Callable,
     Deque,
+    NamedTuple,
     Protocol,
+    TYPE_CHECKING,
     Type,
     Union,
     cast,
@@ -28,9 +33,10 @@ from typing import (
 )
 import functools
 from collections import deque
+from operator import attrgetter, itemgetter
 from energy_box_control.linearize import linearize
 from energy_box_control.network import AnyAppliance, NetworkState, Network
-from energy_box_control.time import datetime_to_ms
+from energy_box_control.time import datetime_to_ms, ms_to_datetime
 
 
 class Timed(Protocol):
@@ -46,22 +52,50 @@ class NetworkSensors(Timed):
 
     @classmethod
     def sensor_initialization_order(cls) -> list[Field[Any]]:
-        listed_sensors = set(
-            (field.name, field.type) for field in fields(cls) if is_sensor(field.type)
-        )
+        return list(_initialization_order(cls))
 
-        def get_sensor_dependencies(sensor_cls: Any):
-            return (
-                (name, type)
-                for name, type in get_type_hints(sensor_cls).items()
-                if (name, type) in listed_sensors
+    def digest(self) -> "SensorsDigest":
+        """The digest of the time and values of the sensors, computed when decoded or else when first asked for"""
+        memo = self.__dict__.get(_DIGEST)
+        # compares the sensors by identity, unless one was replaced or edited
+        if memo is None or memo.inputs != _digest_inputs(self):
+            return _remember_digest(
+                self,
+                {
+                    build.name: _pack(build.packer, build.get_attributes(sensor))
+                    for build in sensor_builds(type(self))
+                    for sensor in [getattr(self, build.name)]
+                },
             )
+        return memo.value
 
-        return linearize(
-            set(field for field in fields(cls) if is_sensor(field.type)),
-            lambda sensor: get_sensor_dependencies(sensor.type),
-            lambda sensor: [(sensor.name, sensor.type)],
-        )
+    def same_as(self, other: "NetworkSensors | None") -> bool:
+        """Whether the sensors are of the same time and hold the same values, comparing their digests"""
+        return other is not None and self.digest().digest == other.digest().digest
+
+    def diff(self, previous: "Self | None") -> dict[str, frozenset[str]]:
+        """The sensors of which a value changed since the previous sensors, with the names of the changed values
+
+        Nan values are the same as each other. Without previous sensors, every value changed.
+        """
+        builds = sensor_builds(type(self))
+        if previous is None:
+            return {build.name: frozenset(build.values) for build in builds}
+        values, previous_values = self.digest().values, previous.digest().values
+        return {
+            build.name: frozenset(
+                field
+                for field, value, previous_value in zip(
+                    build.values,
+                    build.get_attributes(getattr(self, build.name)),
+                    build.get_attributes(getattr(previous, build.name)),
+                )
+                if value != previous_value
+                and (value == value or previous_value == previous_value)
+            )
+            for build in builds
+            if values[build.name] != previous_values[build.name]
+        }
 
     def to_dict(self) -> dict[str, dict[str, Any]]:
         return {
@@ -71,17 +105,19 @@ class NetworkSensors(Timed):
                         attr: val
                         for attr, val in vars(subsensor).items()  # type: ignore
                         if attr != "spec"
+                        and attr != _VERSION
+                        and not isinstance(val, _Memo)
                         and not is_sensor(val)
                         and not type(subsensor) == datetime
                     },
                     **{
                         attr: p.__get__(subsensor)
                         for attr, p in vars(type(subsensor)).items()  # type: ignore
-                        if isinstance(p, property) and not type(subsensor) == datetime
+                        if is_derived(p) and not type(subsensor) == datetime
                     },
                 }
                 for name, subsensor in vars(self).items()
-                if not type(subsensor) == datetime
+                if not type(subsensor) == datetime and not name.startswith("_")
             },
             **{
                 name: time.isoformat()
@@ -91,6 +127,43 @@ class NetworkSensors(Timed):
         }
 
 
+@functools.cache
+def _type_hints(cls: type) -> dict[str, Any]:
+    # resolved once per class, don't mutate the result
+    return get_type_hints(cls)
+
+
+@functools.cache
+def _initialization_order(cls: type[NetworkSensors]) -> tuple[Field[Any], ...]:
+    listed_sensors = set(
+        (field.name, field.type) for field in fields(cls) if is_sensor(field.type)
+    )
+
+    def get_sensor_dependencies(sensor_cls: Any):
+        return (
+            (name, type)
+            for name, type in _type_hints(sensor_cls).items()
+            if (name, type) in listed_sensors
+        )
+
+    return tuple(
+        linearize(
+            set(field for field in fields(cls) if is_sensor(field.type)),
+            lambda sensor: get_sensor_dependencies(sensor.type),
+            lambda sensor: [(sensor.name, sensor.type)],
+        )
+    )
+
+
+@functools.cache
+def _resolution_plan(cls: type[NetworkSensors]) -> tuple[tuple[str, Any], ...]:
+    # the sensor classes to build from a network state, in build order
+    return tuple(
+        (sensor.name, getattr(cls, sensor.name, sensor.type))
+        for sensor in _initialization_order(cls)
+    )
+
+
 class FromState(Protocol):
     @classmethod
     def from_state[
@@ -134,19 +207,40 @@ class SensorContext[T: Timed]:
         state: NetworkState[Network[Sensors]],
         network: Network[Sensors],
     ):
-        init_order = sensors.sensor_initialization_order()
+        for name, klass in _resolution_plan(sensors):
+            self._sensors[name] = klass.from_state(
+                self, network, getattr(network, name, None), state
+            )
+        return self.result(state.time.timestamp)
 
-        for sensor in init_order:
+    def resolve_for_values[
+        Sensors: NetworkSensors,
+    ](self, sensors: type[Sensors], values: dict[str, Any], network: Network[Sensors],):
+        # the reference for SensorCodec.from_dict, which builds the same sensors from a compiled schema
+        for sensor in sensors.sensor_initialization_order():
+            sensor_values = values.get(sensor.name, {})
 
             appliance = getattr(network, sensor.name, None)
-            self.from_state(
-                network,
-                state,
-                getattr(sensors, sensor.name, sensor.type),
-                getattr(self.subject, sensor.name),
-                appliance,
-            )
-        return self.result(state.time.timestamp)
+            try:
+                if appliance:
+                    self.with_appliance(
+                        sensor_values,
+                        cast(type[FromState], sensor.type),
+                        getattr(self.subject, sensor.name),
+                        appliance,
+                    )
+                else:
+                    self.without_appliance(
+                        cast(type[WithoutAppliance], sensor.type),
+                        getattr(self.subject, sensor.name),
+                        **sensor_values,
+                    )
+            except KeyError as e:
+                raise KeyError(
+                    f"Got error on key {str(e)} for {sensor.name} with {values}"
+                )
+
+        return self.result(ms_to_datetime(values["time"]))
 
     def from_state[
         State: ApplianceState, Control: ApplianceControl | None, TPort: Port
@@ -210,6 +304,19 @@ class SensorType(Enum):
     BOOL = "boolean"
 
 
+type Resolver = Callable[[Network[Any], NetworkState[Any], AnyAppliance | None], Any]
+
+
+@dataclass(eq=True, frozen=True)
+class ConstResolver:
+    """Resolver of a sensor with a fixed value, which is folded into the resolution plan of its sensor class"""
+
+    value: Any
+
+    def __call__(self, _network: Network[Any], _state: NetworkState[Any]) -> Any:
+        return self.value
+
+
 @dataclass(eq=True, frozen=True)
 class Sensor:
     technical_name: str | None = None
@@ -241,11 +348,171 @@ class Sensor:
         else:
             raise Exception("unable to resolve value")
 
+    def compile(self, name: str) -> Resolver:
+        """The value_from_state of this sensor with the choice of how to resolve it made up front"""
+        if resolver := self.resolver:
+            return lambda network, network_state, _appliance: resolver(
+                network, network_state
+            )
+
+        port = self.from_port
+        if port and self.type in (SensorType.FLOW, SensorType.TEMPERATURE):
+            attribute = "flow" if self.type == SensorType.FLOW else "temperature"
+
+            def _connection(
+                _network: Network[Any],
+                network_state: NetworkState[Any],
+                appliance: AnyAppliance | None,
+            ) -> Any:
+                if not appliance:
+                    raise Exception("unable to resolve value")
+                return getattr(
+                    network_state.connection(appliance, port, ThermalState(nan, nan)),
+                    attribute,
+                )
+
+            return _connection
+
+        def _state(
+            _network: Network[Any],
+            network_state: NetworkState[Any],
+            appliance: AnyAppliance | None,
+        ) -> Any:
+            if not appliance:
+                raise Exception("unable to resolve value")
+            value = getattr(network_state.appliance(appliance).get(), name, None)
+            return value.value if isinstance(value, Enum) else value
+
+        return _state
+
 
 def sensor(*args: Any, **kwargs: Any) -> Any:
     return Sensor(*args, **kwargs)
 
 
+@dataclass(frozen=True)
+class _SensorsPlan:
+    # how a @sensors class is built, compiled from its type hints on first use
+    fields: tuple[tuple[str, Any, bool], ...]  # name, annotation, is the appliance
+    constants: dict[str, Any]
+    resolvers: tuple[tuple[str, Resolver], ...]
+
+
+@functools.cache
+def _sensors_plan(cls: type) -> _SensorsPlan:
+    hints = _type_hints(cls)
+    descriptions = {
+        name: description
+        for name in hints
+        if isinstance(description := getattr(cls, name, None), Sensor)
+    }
+    return _SensorsPlan(
+        tuple(
+            (
+                name,
+                annotation if isclass(annotation) else None,
+                isclass(annotation) and issubclass(annotation, Appliance),
+            )
+            for name, annotation in hints.items()
+            if not name.startswith("_")
+        ),
+        {
+            name: description.resolver.value
+            for name, description in descriptions.items()
+            if isinstance(description.resolver, ConstResolver)
+        },
+        tuple(
+            (name, description.compile(name))
+            for name, description in descriptions.items()
+            if not isinstance(description.resolver, ConstResolver)
+        ),
+    )
+
+
+class _Memo(NamedTuple):
+    inputs: tuple[Any, ...]
+    value: Any
+
+
+class DerivedProperty(property):
+    """A property of sensors computed from the inputs it declares, once per sensors object and values of its inputs
+
+    The inputs are the attributes of the sensors the property reads, or dotted paths to attributes of their
+    sub-sensors. The computed value is kept on the sensors object with the values of its inputs, and computed again
+    when one of them changed. Only worth it for properties that are expensive or read by other properties, as
+    checking the inputs costs about as much as a plain property reading them.
+    """
+
+    def __init__(self, fget: Callable[[Any], Any], depends_on: tuple[str, ...]):
+        super().__init__(fget, doc=fget.__doc__)
+        self.name = fget.__name__
+        self.depends_on = depends_on
+        self._inputs = _attributes_getter(depends_on)
+
+    def __get__(self, instance: Any, owner: type | None = None) -> Any:
+        if instance is None:
+            return self
+        inputs = self._inputs(instance)
+        attributes = instance.__dict__
+        memo = attributes.get(self.name)
+        # tuples compare their items by identity first, so unchanged nan inputs match
+        if memo is not None and memo.inputs == inputs:
+            return memo.value
+        value = self.fget(instance)  # type: ignore
+        attributes[self.name] = _Memo(inputs, value)
+        return value
+
+
+if TYPE_CHECKING:
+    # type checkers know the types of properties
+    def derived[
+        T
+    ](depends_on: tuple[str, ...],) -> Callable[[Callable[[Any], T]], T]: ...
+
+else:
+
+    def derived(
+        depends_on: tuple[str, ...],
+    ) -> Callable[[Callable[[Any], Any]], DerivedProperty]:
+        return lambda fget: DerivedProperty(fget, depends_on)
+
+
+_VERSION = "_version"
+
+
+def _setattr(self: Any, name: str, value: Any):
+    # counts the edits of the sensor, for the digests of the sensors holding it
+    self.__dict__[_VERSION] = getattr(self, _VERSION) + 1
+    object.__setattr__(self, name, value)
+
+
+def is_derived(value: Any) -> bool:
+    return isinstance(value, property)
+
+
+@functools.cache
+def _properties(sensor_cls: type) -> frozenset[str]:
+    return frozenset(
+        name for name, member in getmembers(sensor_cls) if is_derived(member)
+    )
+
+
+def derived_dependencies(sensor_cls: type, names: AbstractSet[str]) -> frozenset[str]:
+    """The derived properties of a sensor class the given properties are declared to depend on, through each other"""
+    dependencies: set[str] = set()
+    pending = list(names)
+    while pending:
+        member = getattr(sensor_cls, pending.pop(), None)
+        if isinstance(member, DerivedProperty):
+            for name in member.depends_on:
+                if name not in dependencies and isinstance(
+                    getattr(sensor_cls, name, None), DerivedProperty
+                ):
+                    dependencies.add(name)
+                    pending.append(name)
+    return frozenset(dependencies)
+
+
 def sensors[T: type](from_appliance: bool = True, eq: bool = True) -> Callable[[T], T]:
     def _decorator(cls: T) -> T:
         @functools.wraps(cls.__init__)
@@ -255,31 +522,34 @@ def sensors[T: type](from_appliance: bool = True, eq: bool = True) -> Callable[[
             appliance: ThermalAppliance[Any, Any, Any],
             **kwargs: dict[str, Any],
         ):
-            for name, annotation in get_type_hints(cls).items():
-                if name.startswith("_"):
-                    continue
-                elif isclass(annotation) and issubclass(annotation, Appliance):
-                    setattr(self, name, appliance)
-                elif (sub_sensor := context.sensor(name)) and isinstance(
-                    sub_sensor, annotation
+            # set through the instance dict, as setting an attribute counts as an edit
+            attributes = self.__dict__
+            for name, annotation, is_appliance in _sensors_plan(cls).fields:
+                if is_appliance:
+                    attributes[name] = appliance
+                elif (
+                    annotation
+                    and (sub_sensor := context.sensor(name))
+                    and isinstance(sub_sensor, annotation)
                 ):
-                    setattr(self, name, sub_sensor)
+                    attributes[name] = sub_sensor
                 else:
-                    setattr(self, name, kwargs[name])
+                    attributes[name] = kwargs[name]
 
         @functools.wraps(cls.__init__)
         def _init_from_args(
             self: Any, context: SensorContext[Any], **kwargs: dict[str, Any]
         ):
-            for name, annotation in get_type_hints(cls).items():
-                if name.startswith("_"):
-                    continue
-                elif (sub_sensor := context.sensor(name)) and isinstance(
-                    sub_sensor, annotation
+            attributes = self.__dict__
+            for name, annotation, _ in _sensors_plan(cls).fields:
+                if (
+                    annotation
+                    and (sub_sensor := context.sensor(name))
+                    and isinstance(sub_sensor, annotation)
                 ):
-                    setattr(self, name, sub_sensor)
+                    attributes[name] = sub_sensor
                 else:
-                    setattr(self, name, kwargs[name])
+                    attributes[name] = kwargs[name]
 
         def _from_state(
             context: SensorContext[Any],
@@ -287,11 +557,10 @@ def sensors[T: type](from_appliance: bool = True, eq: bool = True) -> Callable[[
             appliance: ThermalAppliance[Any, Any, Any] | None,
             state: NetworkState[Any],
         ):
-            sensors = {
-                name: description.value_from_state(network, state, appliance, name)
-                for name in get_type_hints(cls).keys()
-                if (description := getattr(cls, name, None))
-            }
+            plan = _sensors_plan(cls)
+            sensors = dict(plan.constants)
+            for name, resolve in plan.resolvers:
+                sensors[name] = resolve(network, state, appliance)
 
             if appliance:
                 return cls(context, appliance, **sensors)  # type: ignore
@@ -299,7 +568,7 @@ def sensors[T: type](from_appliance: bool = True, eq: bool = True) -> Callable[[
                 return cls(context, **sensors)  # type: ignore
 
         def _values(sensor: Any) -> dict[str, Any]:
-            return {name: getattr(sensor, name) for name in get_type_hints(cls).keys()}
+            return {name: getattr(sensor, name) for name in _type_hints(cls).keys()}
 
         def _eq(self: Any, other: object):
             if not isinstance(other, cls):
@@ -316,6 +585,8 @@ def sensors[T: type](from_appliance: bool = True, eq: bool = True) -> Callable[[
             cls.__init__ = _init_from_args  # type: ignore
             cls.from_state = _from_state
         cls.is_sensor = True
+        setattr(cls, _VERSION, 0)
+        cls.__setattr__ = _setattr  # type: ignore
         if eq:
             cls.__eq__ = _eq  # type: ignore
         cls.__hash__ = _hash  # type: ignore
@@ -328,14 +599,14 @@ def sensor_fields(sensor_cls: Any, include_properties: bool = False) -> set[str]
     return set(
         [
             field_name
-            for field_name, field_value in get_type_hints(sensor_cls).items()
+            for field_name, field_value in _type_hints(sensor_cls).items()
             if field_value in [float, int, bool]
         ]
     ) | set(
         [
             field_name
             for field_name, field_value in getmembers(sensor_cls)
-            if (include_properties and type(field_value) == property)
+            if (include_properties and is_derived(field_value))
             or type(field_value) == Sensor
         ]
     )
@@ -372,10 +643,497 @@ def sensor_encoder(include_properties: bool = False):
     return SensorEncoder
 
 
-def sensors_to_json(sensors: Any, include_properties: bool = False):
+def sensors_to_json(
+    sensors: Any,
+    include_properties: bool = False,
+    properties: AbstractSet[str] | None = None,
+):
+    if isinstance(sensors, NetworkSensors):
+        return SensorCodec.of(type(sensors)).encode(
+            sensors, include_properties, properties
+        )
     return json.dumps(sensors, cls=sensor_encoder(include_properties))
 
 
+@functools.cache
+def encoded_fields(sensor_cls: type, include_properties: bool) -> tuple[str, ...]:
+    order = {name: position for position, name in enumerate(_type_hints(sensor_cls))}
+    return tuple(
+        sorted(
+            sensor_fields(sensor_cls, include_properties),
+            key=lambda name: (order.get(name, len(order)), name),
+        )
+    )
+
+
+def _encode_sensor(sensor: Any, names: tuple[str, ...]) -> dict[str, Any]:
+    values: dict[str, Any] = {}
+    for name in names:
+        value = getattr(sensor, name)
+        # bool is an int, value == value drops nan
+        if isinstance(value, (float, int, str)) and value == value:
+            values[name] = value
+    return values
+
+
+def _items_getter(keys: tuple[str, ...]) -> Callable[[Any], tuple[Any, ...]]:
+    # itemgetter returns a bare value instead of a tuple for a single key
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda values: (values[key],)
+    return (
+        cast(Callable[[Any], tuple[Any, ...]], itemgetter(*keys))
+        if keys
+        else lambda _: ()
+    )
+
+
+def _attributes_getter(names: tuple[str, ...]) -> Callable[[Any], tuple[Any, ...]]:
+    if len(names) == 1:
+        getter = attrgetter(names[0])
+        return lambda subject: (getter(subject),)
+    return attrgetter(*names) if names else lambda _: ()
+
+
+class SensorBuild(NamedTuple):
+    """How a sensor of network sensors is put together from its values, appliance and sub-sensors"""
+
+    name: str
+    cls: type[Any]
+    sub_sensors: frozenset[str]
+    appliances: tuple[str, ...]
+    values: tuple[str, ...]
+    get_values: Callable[[Any], tuple[Any, ...]]
+    get_values_and_appliances: Callable[[Any], tuple[Any, ...]]
+    get_attributes: Callable[[Any], tuple[Any, ...]]
+    packer: struct.Struct
+
+
+_DIGEST = "_digest"
+_TIME = struct.Struct("<d")
+_LENGTH = struct.Struct("<I")
+
+
+class SensorsDigest(NamedTuple):
+    """A hash of network sensors for comparing them at once, and the packed values of their sensors to compare them one by one"""
+
+    digest: bytes
+    values: dict[str, bytes]  # the values of each sensor, packed
+
+
+def _pack(packer: struct.Struct, values: tuple[Any, ...]) -> bytes:
+    try:
+        return packer.pack(*values)
+    except (struct.error, TypeError):
+        # not all values are numbers
+        return repr(values).encode()
+
+
+def _remember_digest(
+    sensors: NetworkSensors, values: dict[str, bytes]
+) -> SensorsDigest:
+    digest = hashlib.blake2b(
+        _TIME.pack(getattr(sensors, "time").timestamp()), digest_size=16
+    )
+    for packed in values.values():
+        digest.update(_LENGTH.pack(len(packed)))
+        digest.update(packed)
+    result = SensorsDigest(digest.digest(), values)
+    sensors.__dict__[_DIGEST] = _Memo(_digest_inputs(sensors), result)
+    return result
+
+
+def _digest_inputs(sensors: NetworkSensors) -> tuple[Any, ...]:
+    fields, versions = _digest_getters(type(sensors))
+    return fields(sensors), versions(sensors)
+
+
+@functools.cache
+def _digest_getters(
+    cls: type,
+) -> tuple[Callable[[Any], tuple[Any, ...]], Callable[[Any], tuple[Any, ...]]]:
+    # the fields of the sensors, and the number of edits of each of their sensors
+    names = tuple(build.name for build in sensor_builds(cls))
+    return _attributes_getter(
+        tuple(field.name for field in fields(cls))
+    ), _attributes_getter(tuple(f"{name}.{_VERSION}" for name in names))
+
+
+@functools.cache
+def sensor_builds(cls: type[NetworkSensors]) -> tuple[SensorBuild, ...]:
+    built: dict[str, type] = {}
+    build: list[SensorBuild] = []
+    for sensor in _initialization_order(cls):
+        sensor_cls = cast(type, sensor.type)
+        plan = _sensors_plan(sensor_cls).fields
+        sub_sensors = frozenset(
+            name
+            for name, annotation, _ in plan
+            if annotation is not None
+            and name in built
+            and issubclass(built[name], annotation)
+        )
+        appliances = tuple(name for name, _, is_appliance in plan if is_appliance)
+        values = tuple(
+            name
+            for name, _, is_appliance in plan
+            if not is_appliance and name not in sub_sensors
+        )
+        build.append(
+            SensorBuild(
+                sensor.name,
+                sensor_cls,
+                sub_sensors,
+                appliances,
+                values,
+                _items_getter(values),
+                _items_getter(values + appliances),
+                _attributes_getter(values),
+                struct.Struct(f"<{len(values)}d"),
+            )
+        )
+        built[sensor.name] = sensor_cls
+    return tuple(build)
+
+
+class SensorCodec[T: NetworkSensors]:
+    """JSON encoding of network sensors compiled once from the sensors class
+
+    Encodes like sensors_to_json and decodes like SensorContext.resolve_for_values, but reads and builds
+    the sensors from a fixed schema instead of inspecting their types for every message.
+    """
+
+    def __init__(self, cls: type[T]):
+        self._cls = cls
+        self._times = tuple(
+            field.name for field in fields(cls) if field.type is datetime
+        )
+        self._sensors = tuple(
+            field.name for field in fields(cls) if is_sensor(field.type)
+        )
+        self._build = sensor_builds(cls)
+
+    @staticmethod
+    def of[S: NetworkSensors](sensors_cls: type[S]) -> "SensorCodec[S]":
+        return _codec(sensors_cls)
+
+    @functools.cache
+    def _fields(
+        self, include_properties: bool, properties: frozenset[str] | None
+    ) -> tuple[tuple[str, tuple[str, ...]], ...]:
+        # the fields of network sensors are annotated with their sensor classes
+        sensor_types: dict[str, type] = {
+            field.name: cast(type, field.type) for field in fields(self._cls)
+        }
+        if not include_properties or properties is None:
+            return tuple(
+                (name, encoded_fields(sensor_types[name], include_properties))
+                for name in self._sensors
+            )
+        selected: dict[str, set[str]] = {name: set() for name in self._sensors}
+        for path in properties:
+            name, _, attribute = path.partition(".")
+            if attribute not in _properties(sensor_types.get(name, object)):
+                raise ValueError(
+                    f"{path} isn't a derived property of {self._cls.__name__}"
+                )
+            selected[name].add(attribute)
+            selected[name] |= derived_dependencies(sensor_types[name], {attribute})
+        return tuple(
+            (
+                name,
+                encoded_fields(sensor_types[name], False)
+                + tuple(sorted(selected[name])),
+            )
+            for name in self._sensors
+        )
+
+    def to_dict(
+        self,
+        sensors: T,
+        include_properties: bool = False,
+        properties: AbstractSet[str] | None = None,
+    ) -> dict[str, Any]:
+        """The values of the sensors, with their derived properties if included
+
+        Given the properties as `<sensor>.<property>`, only those are included and computed, with the derived
+        properties they are declared to depend on.
+        """
+        values: dict[str, Any] = {
+            name: datetime_to_ms(getattr(sensors, name)) for name in self._times
+        }
+        for name, names in self._fields(
+            include_properties, None if properties is None else frozenset(properties)
+        ):
+            values[name] = _encode_sensor(getattr(sensors, name), names)
+        return values
+
+    def encode(
+        self,
+        sensors: T,
+        include_properties: bool = False,
+        properties: AbstractSet[str] | None = None,
+    ) -> str:
+        return json.dumps(self.to_dict(sensors, include_properties, properties))
+
+    def from_dict(
+        self,
+        network: Network[T],
+        values: dict[str, Any],
+        previous: T | None = None,
+        changed: AbstractSet[str] = frozenset(),
+    ) -> T:
+        """Builds the sensors from their values
+
+        Given the sensors previously built and the names of the sensors of which the values changed since,
+        only the changed sensors and the sensors built on top of them are rebuilt.
+        """
+
+        def read(sensor_build: SensorBuild, with_appliances: bool) -> tuple[Any, ...]:
+            sensor_values = values.get(sensor_build.name, {})
+            try:
+                return (
+                    sensor_build.get_values_and_appliances(sensor_values)
+                    if with_appliances
+                    else sensor_build.get_values(sensor_values)
+                )
+            except KeyError as e:
+                raise KeyError(
+                    f"Got error on key {str(e)} for {sensor_build.name} with {values}"
+                )
+
+        return self.from_values(network, values["time"], read, previous, changed)
+
+    def from_values(
+        self,
+        network: Network[T],
+        time: float,
+        read: Callable[[SensorBuild, bool], tuple[Any, ...]],
+        previous: T | None = None,
+        changed: AbstractSet[str] = frozenset(),
+    ) -> T:
+        """Builds the sensors of the given time in ms from the values read for each sensor build
+
+        Reads the values of a sensor, followed by its appliances when it has none in the network, as from_dict does
+        from their json.
+        """
+        built: dict[str, Any] = {}
+        packed: dict[str, bytes] = {}
+        previous_packed = previous.digest().values if previous is not None else {}
+        rebuilt: set[str] = set()
+        for sensor_build in self._build:
+            name = sensor_build.name
+            if (
+                previous is not None
+                and name not in changed
+                and rebuilt.isdisjoint(sensor_build.sub_sensors)
+            ):
+                built[name] = getattr(previous, name)
+                packed[name] = previous_packed[name]
+                continue
+            rebuilt.add(name)
+            appliance = getattr(network, name, None)
+            sensor = object.__new__(sensor_build.cls)
+            attributes = sensor.__dict__
+            for field in sensor_build.sub_sensors:
+                attributes[field] = built[field]
+            if appliance:
+                attributes.update(dict.fromkeys(sensor_build.appliances, appliance))
+                values = read(sensor_build, False)
+                attributes.update(zip(sensor_build.values, values))
+            else:
+                values = read(sensor_build, True)
+                attributes.update(
+                    zip(sensor_build.values + sensor_build.appliances, values)
+                )
+                values = values[: len(sensor_build.values)]
+            built[name] = sensor
+            packed[name] = _pack(sensor_build.packer, values)
+        # network sensors are dataclasses of their time and sensors
+        sensors = cast(Callable[..., T], self._cls)(time=ms_to_datetime(time), **built)
+        _remember_digest(sensors, packed)
+        return sensors
+
+    def decode(self, network: Network[T], data: str | bytes) -> T:
+        return self.from_dict(network, json.loads(data))
+
+
+@functools.cache
+def _codec(cls: type[NetworkSensors]) -> SensorCodec[Any]:
+    # one codec per sensors class
+    return SensorCodec(cls)
+
+
+SEQUENCE = "seq"
+KEYFRAME = "keyframe"
+VALUES = "values"
+CHANGED = "changed"
+REMOVED = "removed"
+
+DEFAULT_DEAD_BANDS: dict[SensorType, float] = {
+    SensorType.TEMPERATURE: 0.05,
+    SensorType.DELTA_T: 0.05,
+    SensorType.FLOW: 0.001,
+    SensorType.PRESSURE: 0.01,
+    SensorType.HUMIDITY: 0.1,
+    SensorType.VOLTAGE: 0.1,
+    SensorType.CURRENT: 0.01,
+    SensorType.POWER: 1,
+}
+
+
+@functools.cache
+def _sensor_types(sensor_cls: type) -> dict[str, SensorType]:
+    return {
+        name: description.type
+        for name, description in getmembers(sensor_cls)
+        if isinstance(description, Sensor) and description.type is not None
+    }
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (float, int)) and not isinstance(value, bool)
+
+
+def _moved(value: Any, reference: Any, dead_band: float) -> bool:
+    if dead_band and _is_number(value) and _is_number(reference):
+        return abs(value - reference) > dead_band
+    return value != reference or type(value) != type(reference)
+
+
+class SensorDeltaEncoder[T: NetworkSensors]:
+    """Encodes a stream of sensors as keyframes holding all values with deltas of the changed values in between
+
+    A number only counts as changed once it moved more than the dead band of its sensor type away from the
+    value last sent. Messages are numbered, so SensorDeltaDecoder can tell when it missed one.
+    """
+
+    def __init__(
+        self,
+        cls: type[T],
+        keyframe_interval: timedelta = timedelta(seconds=60),
+        dead_bands: dict[SensorType, float] = DEFAULT_DEAD_BANDS,
+    ):
+        self._codec = SensorCodec.of(cls)
+        self._keyframe_interval_ms = keyframe_interval.total_seconds() * 1000
+        self._dead_bands = dead_bands
+        self._sequence = -1
+        self._sent: dict[str, Any] | None = None
+        self._keyframe_time: float = 0
+
+    def request_keyframe(self):
+        self._sent = None
+
+    def _bands(self, sensor_cls: type) -> dict[str, float]:
+        return {
+            name: self._dead_bands.get(sensor_type, 0)
+            for name, sensor_type in _sensor_types(sensor_cls).items()
+        }
+
+    def message(self, sensors: T) -> dict[str, Any]:
+        self._sequence += 1
+        values = self._codec.to_dict(sensors)
+        if (
+            self._sent is None
+            or values["time"] - self._keyframe_time >= self._keyframe_interval_ms
+        ):
+            self._sent = dict(values)
+            self._keyframe_time = values["time"]
+            return {SEQUENCE: self._sequence, KEYFRAME: True, VALUES: values}
+
+        sent = self._sent
+        changed: dict[str, Any] = {}
+        removed: dict[str, list[str]] = {}
+        for name, value in values.items():
+            if not isinstance(value, dict):
+                if _moved(value, sent.get(name), 0):
+                    changed[name] = sent[name] = value
+                continue
+            sent_values: dict[str, Any] = sent.get(name, {})
+            bands = self._bands(getattr(sensors, name).__class__)
+            changed_values = {
+                field: field_value
+                for field, field_value in cast(dict[str, Any], value).items()
+                if field not in sent_values
+                or _moved(field_value, sent_values[field], bands.get(field, 0))
+            }
+            removed_values = [field for field in sent_values if field not in value]
+            if changed_values or removed_values:
+                sent[name] = {
+                    field: field_value
+                    for field, field_value in {**sent_values, **changed_values}.items()
+                    if field not in removed_values
+                }
+            if changed_values:
+                changed[name] = changed_values
+            if removed_values:
+                removed[name] = removed_values
+
+        message: dict[str, Any] = {SEQUENCE: self._sequence, CHANGED: changed}
+        if removed:
+            message[REMOVED] = removed
+        return message
+
+    def encode(self, sensors: T) -> str:
+        return json.dumps(self.message(sensors))
+
+
+class SensorDeltaDecoder[T: NetworkSensors]:
+    """Reconstructs the sensors from the messages of a SensorDeltaEncoder
+
+    After a missed delta the decoder ignores deltas until the next keyframe, needs_keyframe tells when to ask the
+    encoder for one.
+    """
+
+    def __init__(self, cls: type[T], network: Network[T]):
+        self._codec = SensorCodec.of(cls)
+        self._network = network
+        self._sequence = -1
+        self._values: dict[str, Any] | None = None
+        self._sensors: T | None = None
+        self.needs_keyframe = False
+
+    def receive(self, message: dict[str, Any]) -> T | None:
+        """The sensors after a message, None when the decoder is out of sync"""
+        sequence: int = message[SEQUENCE]
+        if message.get(KEYFRAME):
+            self._values = message[VALUES]
+            self._sensors = self._codec.from_dict(self._network, message[VALUES])
+            self.needs_keyframe = False
+        elif self._values is not None and sequence <= self._sequence:
+            return None  # redelivered
+        elif self._values is None or sequence != self._sequence + 1:
+            self._values = None
+            self._sensors = None
+            self.needs_keyframe = True
+            return None
+        else:
+            changed: dict[str, Any] = message[CHANGED]
+            removed: dict[str, list[str]] = message.get(REMOVED, {})
+            values = dict(self._values)
+            for name in changed.keys() | removed.keys():
+                if not isinstance(changed.get(name, {}), dict):
+                    values[name] = changed[name]
+                    continue
+                values[name] = {
+                    field: value
+                    for field, value in {
+                        **values.get(name, {}),
+                        **changed.get(name, {}),
+                    }.items()
+                    if field not in removed.get(name, ())
+                }
+            self._values = values
+            self._sensors = self._codec.from_dict(
+                self._network, values, self._sensors, changed.keys() | removed.keys()
+            )
+        self._sequence = sequence
+        return self._sensors
+
+    def decode(self, data: str | bytes) -> T | None:
+        return self.receive(json.loads(data))
+
+
 def attributes_for_type(
     cls: Union[FromState, Type[WithoutAppliance]], type: SensorType
 ) -> list[str]:
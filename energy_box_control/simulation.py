@@ -1,14 +1,18 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
-from dataclasses import dataclass
-import schedule
+from dataclasses import dataclass, replace
+import signal
+import aiomqtt
+from energy_box_control.amqtt import get_mqtt_client
+from energy_box_control.monitoring.checks import Severity
 from energy_box_control.monitoring.monitoring import (
+    NotificationEvent,
     Notifier,
     PagerDutyNotificationChannel,
 )
+from energy_box_control.checkpoint import CheckpointStore
 from energy_box_control.custom_logging import get_logger
-import queue
-from energy_box_control.network import NetworkState
+from energy_box_control.network import NetworkControl, NetworkState
 from energy_box_control.power_hub.control.control import (
     control_from_json,
     no_control,
@@ -16,53 +20,95 @@ from energy_box_control.power_hub.control.control import (
 
 from energy_box_control.power_hub.network import PowerHubSchedules
 from energy_box_control.power_hub import PowerHub, PowerHubSensors
-from energy_box_control.mqtt import (
-    create_and_connect_client,
-    run_listener,
-    publish_to_mqtt,
-)
-from paho.mqtt import client as mqtt_client
-
-from functools import partial
 
 from energy_box_control.power_hub_control import (
     CONTROL_VALUES_TOPIC,
     SENSOR_VALUES_TOPIC,
+    SENSOR_VALUES_DELTA_TOPIC,
+    SENSOR_VALUES_KEYFRAME_REQUEST_TOPIC,
     ENRICHED_SENSOR_VALUES_TOPIC,
 )
 
 import asyncio
 from energy_box_control.config import CONFIG
-from energy_box_control.sensors import sensors_to_json
+from energy_box_control.sensors import SensorDeltaEncoder, sensors_to_json
+from energy_box_control.time import Ticker
+from energy_box_control.wire import (
+    ControlWireFormat,
+    SensorWireFormat,
+    is_wire_format,
+)
 
 logger = get_logger(__name__)
 
-
-control_values_queue: queue.Queue[str] = queue.Queue()
-sensor_values_queue: queue.Queue[str] = queue.Queue()
+STEP_PERIOD = timedelta(seconds=1)
+CONTROL_TIMEOUT = 10  # s
+# steps between reports of the achieved speed of an accelerated simulation
+SPEED_REPORT_STEPS = 3600
 
 
-def queue_on_message(
-    queue: queue.Queue[str],
-    client: mqtt_client.Client,
-    userdata: str,
-    message: mqtt_client.MQTTMessage,
+async def publish(
+    mqtt_client: aiomqtt.Client, topic: str, payload: str | bytes, notifier: Notifier
 ):
-    decoded_message = str(message.payload.decode("utf-8"))
-    logger.debug(f"Received message: {decoded_message}")
-    queue.put(decoded_message)
+    try:
+        await mqtt_client.publish(topic, payload, qos=1)
+        logger.debug(f"Sent {len(payload)} long message to topic `{topic}`")
+    except aiomqtt.MqttError as e:
+        logger.error(f"Failed to send message to topic {topic}: {e}")
+        # sending the event blocks on the pagerduty api, which would hold up the steps
+        await asyncio.to_thread(
+            notifier.send_events,
+            [
+                NotificationEvent(
+                    f"Failed to publish to MQTT: {e}, please check the logs.",
+                    "power_hub_simulation_mqtt",
+                    "mqtt_publish",
+                    Severity.ERROR,
+                )
+            ],
+        )
 
 
-def publish_sensor_values(
+async def receive_messages(
+    mqtt_client: aiomqtt.Client,
+    control_values: asyncio.Queue[bytes],
+    delta_encoder: SensorDeltaEncoder[PowerHubSensors] | None = None,
+):
+    async for message in mqtt_client.messages:
+        if message.topic.matches(CONTROL_VALUES_TOPIC):
+            logger.debug(f"Received control values of {len(message.payload)} bytes")
+            control_values.put_nowait(message.payload)
+        if delta_encoder and message.topic.matches(
+            SENSOR_VALUES_KEYFRAME_REQUEST_TOPIC
+        ):
+            logger.info("Received sensor values keyframe request")
+            delta_encoder.request_keyframe()
+
+
+async def publish_sensor_values(
     sensor_values: PowerHubSensors,
-    mqtt_client: mqtt_client.Client,
+    mqtt_client: aiomqtt.Client,
     notifier: Notifier,
     enriched: bool = False,
+    delta_encoder: SensorDeltaEncoder[PowerHubSensors] | None = None,
 ):
-    publish_to_mqtt(
+    if delta_encoder and not enriched:
+        await publish(
+            mqtt_client,
+            SENSOR_VALUES_DELTA_TOPIC,
+            delta_encoder.encode(sensor_values),
+            notifier,
+        )
+        return
+    topic = ENRICHED_SENSOR_VALUES_TOPIC if enriched else SENSOR_VALUES_TOPIC
+    await publish(
         mqtt_client,
-        ENRICHED_SENSOR_VALUES_TOPIC if enriched else SENSOR_VALUES_TOPIC,
-        sensors_to_json(sensor_values, include_properties=enriched),
+        topic,
+        (
+            SensorWireFormat.of(PowerHubSensors, enriched).encode(sensor_values)
+            if topic in CONFIG.wire_format_topics
+            else sensors_to_json(sensor_values, include_properties=enriched)
+        ),
         notifier,
     )
 
@@ -71,70 +117,182 @@ def publish_sensor_values(
 class SimulationResult:
     power_hub: PowerHub
     state: NetworkState[PowerHub]
+    delta_encoder: SensorDeltaEncoder[PowerHubSensors] | None = None
+    control_format: ControlWireFormat[PowerHub] | None = None
 
-    def step(
+    def controls_from_message(self, message: bytes) -> NetworkControl[PowerHub]:
+        if is_wire_format(message):
+            if self.control_format is None:
+                self.control_format = ControlWireFormat(self.power_hub)
+            return self.control_format.decode(message)
+        return control_from_json(self.power_hub, message)
+
+    async def step(
         self,
-        mqtt_client: mqtt_client.Client,
+        mqtt_client: aiomqtt.Client,
         notifier: Notifier,
         power_hub: PowerHub,
+        control_values: asyncio.Queue[bytes],
     ) -> "SimulationResult":
 
         try:
-            control_values = control_from_json(
-                self.power_hub, control_values_queue.get(block=True, timeout=10)
+            message = await asyncio.wait_for(control_values.get(), CONTROL_TIMEOUT)
+            state = self.power_hub.simulate(
+                self.state, self.controls_from_message(message)
             )
-            state = self.power_hub.simulate(self.state, control_values)
-        except queue.Empty:
+        except TimeoutError:
+            logger.warning(f"No control values received in {CONTROL_TIMEOUT}s")
             state = self.state
 
-        publish_sensor_values(
-            power_hub.sensors_from_state(state), mqtt_client, notifier
+        await publish_sensor_values(
+            power_hub.sensors_from_state(state),
+            mqtt_client,
+            notifier,
+            delta_encoder=self.delta_encoder,
         )
-        return SimulationResult(self.power_hub, state)
+        return replace(self, state=state)
 
 
 async def run(
-    steps: int = 0, schedules: PowerHubSchedules = PowerHubSchedules.const_schedules()
+    steps: int = 0,
+    schedules: PowerHubSchedules = PowerHubSchedules.const_schedules(),
+    speed: float = 1,
+    start: datetime | None = None,
 ):
-    mqtt_client = create_and_connect_client()
-    await run_listener(
-        CONTROL_VALUES_TOPIC, partial(queue_on_message, control_values_queue)
-    )
-
+    """Steps the simulation every STEP_PERIOD, publishing sensor values and waiting for the control values
+
+    Steps are scheduled on the monotonic clock, a step that is late because control values were late is reported
+    and skipped, or caught up on with simulation_catch_up. Cancelling the run stops it at the step it waits in, after
+    saving a checkpoint when they are enabled.
+
+    A speed above 1 runs the simulation faster than real time, simulating STEP_PERIOD every STEP_PERIOD / speed. The
+    sensor values carry the simulated time. As every step waits for the control values, the simulation never runs
+    ahead of the control, it runs at the given speed or as fast as the broker and control keep up with.
+    """
+    if speed <= 0:
+        raise ValueError("the simulation needs a positive speed")
     notifier = Notifier([PagerDutyNotificationChannel(CONFIG.pagerduty_simulation_key)])
 
-    power_hub = PowerHub.power_hub(schedules)
-    state = power_hub.simulate(
-        power_hub.simple_initial_state(start_time=datetime.now(tz=timezone.utc)),
-        no_control(power_hub),
+    delta_encoder = (
+        SensorDeltaEncoder(
+            PowerHubSensors,
+            timedelta(seconds=CONFIG.sensor_values_keyframe_interval),
+        )
+        if CONFIG.sensor_values_delta_encoding
+        else None
     )
 
-    publish_sensor_values(power_hub.sensors_from_state(state), mqtt_client, notifier)
-
-    result = SimulationResult(power_hub, state)
-
-    run_queue: queue.Queue[None] = queue.Queue()
-
-    def _add_step_to_queue():
-        run_queue.put(None)
-
-    step = schedule.every(1).seconds.do(_add_step_to_queue)  # type: ignore
-
-    while True:
-        schedule.run_pending()
+    start_time = start or datetime.now(tz=timezone.utc)
+    # a checkpoint rebased onto the start moves it back a whole number of steps, which keeps to the samples
+    power_hub = PowerHub.power_hub(schedules.sampled(start_time, STEP_PERIOD))
+    initial_state = power_hub.simple_initial_state(
+        start_time=start_time, step_size=STEP_PERIOD
+    )
+    checkpoints = (
+        CheckpointStore(CONFIG.simulation_checkpoint_directory, power_hub)
+        if CONFIG.simulation_checkpoint_directory
+        else None
+    )
+    # a live simulation resumes at the current time, a replay only resumes a checkpoint of the same start
+    restored_state = (
+        checkpoints.restore(initial_state, rebase=start is None)
+        if checkpoints
+        else None
+    )
+    # a restored state continues where it was saved, a new one takes a first step to have sensor values to publish
+    state = restored_state or power_hub.simulate(initial_state, no_control(power_hub))
+    result = SimulationResult(power_hub, state, delta_encoder)
+    checkpointed_step = state.time.step
+
+    async with get_mqtt_client(logger) as mqtt_client, asyncio.TaskGroup() as tg:
+        await mqtt_client.subscribe(CONTROL_VALUES_TOPIC, qos=1)
+        if delta_encoder:
+            await mqtt_client.subscribe(SENSOR_VALUES_KEYFRAME_REQUEST_TOPIC, qos=1)
+        control_values: asyncio.Queue[bytes] = asyncio.Queue()
+        receiver = tg.create_task(
+            receive_messages(mqtt_client, control_values, delta_encoder)
+        )
         try:
-            run_queue.get_nowait()
-            result = result.step(mqtt_client, notifier, power_hub)
-            if steps and steps < result.state.time.step:
-                schedule.cancel_job(step)
-                break
+            await publish_sensor_values(
+                power_hub.sensors_from_state(state),
+                mqtt_client,
+                notifier,
+                delta_encoder=delta_encoder,
+            )
 
-        except queue.Empty:
-            pass
+            ticker = Ticker(STEP_PERIOD / speed, catch_up=CONFIG.simulation_catch_up)
+            loop = asyncio.get_running_loop()
+            reported_step, reported_at = result.state.time.step, loop.time()
+            while not steps or result.state.time.step <= steps:
+                # an accelerated simulation is expected to fall behind when control can't keep up
+                if (skipped := await ticker.tick()) and speed == 1:
+                    logger.warning(f"Simulation fell behind, skipped {skipped} ticks")
+                result = await result.step(
+                    mqtt_client, notifier, power_hub, control_values
+                )
+                if (
+                    speed != 1
+                    and result.state.time.step >= reported_step + SPEED_REPORT_STEPS
+                ):
+                    simulated = (
+                        result.state.time.step - reported_step
+                    ) * STEP_PERIOD.total_seconds()
+                    logger.info(
+                        f"Simulated up to {result.state.time.timestamp} at {simulated / (loop.time() - reported_at):.0f}x real time, aiming for {speed:g}x"
+                    )
+                    reported_step, reported_at = result.state.time.step, loop.time()
+                if (
+                    checkpoints
+                    and result.state.time.step
+                    >= checkpointed_step + CONFIG.simulation_checkpoint_interval
+                ):
+                    checkpoints.save(result.state)
+                    checkpointed_step = result.state.time.step
+        finally:
+            receiver.cancel()
+            if checkpoints and result.state.time.step > checkpointed_step:
+                checkpoints.save(result.state)
+
+
+async def run_until_stopped(
+    schedules: PowerHubSchedules,
+    steps: int = 0,
+    speed: float = 1,
+    start: datetime | None = None,
+):
+    # a stop signal cancels the simulation like an interrupt does
+    simulation = asyncio.current_task()
+    assert simulation
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, simulation.cancel)
+    try:
+        await run(steps, schedules, speed, start)
+    except asyncio.CancelledError:
+        logger.info("Simulation stopped")
 
 
 def main():
-    asyncio.run(run(schedules=PowerHubSchedules.schedules_from_data()))
+    # replaying a season against the control app, like the Jun-Oct schedules at CONFIG.simulation_speed = 3600, takes
+    # a simulation_start and simulation_end in the period of the schedules
+    start = CONFIG.simulation_start
+    steps = (
+        int(
+            (CONFIG.simulation_end - (start or datetime.now(tz=timezone.utc)))
+            / STEP_PERIOD
+        )
+        if CONFIG.simulation_end
+        else 0
+    )
+    try:
+        asyncio.run(
+            run_until_stopped(
+                PowerHubSchedules.schedules_from_data(),
+                steps,
+                CONFIG.simulation_speed,
+                start,
+            )
+        )
+    except KeyboardInterrupt:
+        logger.info("Simulation stopped")
 
 
 if __name__ == "__main__":
@@ -1,3 +1,4 @@
+import asyncio
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from functools import cached_property
@@ -34,3 +35,34 @@ def ms_to_datetime(ms: int):
 
 def datetime_to_ms(dt: datetime) -> float:
     return dt.timestamp() * 1000
+
+
+class Ticker:
+    """Ticks every period on the monotonic clock of the event loop, at fixed deadlines so it doesn't drift
+
+    The first tick is immediate. When a tick comes too late to make the next deadlines, those ticks are skipped and
+    reported, unless the ticker catches up on them by ticking right away until it is back on schedule.
+    """
+
+    def __init__(self, period: timedelta, catch_up: bool = False):
+        if period <= timedelta(0):
+            raise ValueError("a ticker needs a positive period")
+        self.period = period.total_seconds()
+        self.catch_up = catch_up
+        self.skipped = 0
+        self._deadline: float | None = None
+
+    async def tick(self) -> int:
+        """Waits for the next tick, returning the number of ticks skipped before it"""
+        loop = asyncio.get_running_loop()
+        if self._deadline is None:
+            self._deadline = loop.time()
+        skipped = 0
+        if (delay := self._deadline - loop.time()) > 0:
+            await asyncio.sleep(delay)
+        elif not self.catch_up:
+            skipped = int(-delay // self.period)
+            self._deadline += skipped * self.period
+            self.skipped += skipped
+        self._deadline += self.period
+        return skipped
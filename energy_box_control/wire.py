@@ -0,0 +1,311 @@
+import hashlib
+import math
+import struct
+from dataclasses import dataclass, fields
+from datetime import datetime
+from functools import cache, cached_property
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Sequence, cast, get_type_hints
+
+from energy_box_control.appliances.base import (
+    Appliance,
+    ApplianceControl,
+    control_class,
+)
+from energy_box_control.network import AnyAppliance, Network, NetworkControl
+from energy_box_control.sensors import (
+    NetworkSensors,
+    SensorBuild,
+    SensorCodec,
+    encoded_fields,
+    is_sensor,
+    sensor_builds,
+)
+from energy_box_control.time import datetime_to_ms, time_ms
+
+MAGIC = b"PHWF"
+VERSION = 1
+
+# magic, version, schema hash, time in ms
+_HEADER = struct.Struct("<4sH8sd")
+
+# an int that isn't a number, like a nan in an int sensor, is sent as this
+INT_MISSING = -(2**31)
+
+_FORMATS = {float: "d", int: "i", bool: "?"}
+
+
+class WireFormatError(Exception):
+    pass
+
+
+def is_wire_format(payload: bytes | str) -> bool:
+    return isinstance(payload, bytes) and payload.startswith(MAGIC)
+
+
+def _value_getter(paths: Sequence[str]) -> Callable[[Any], tuple[Any, ...]]:
+    # attrgetter returns a bare value instead of a tuple for a single path
+    if len(paths) == 1:
+        getter = attrgetter(paths[0])
+        return lambda subject: (getter(subject),)
+    return attrgetter(*paths) if paths else lambda _: ()
+
+
+def _items_getter(indices: Sequence[int]) -> Callable[[Sequence[Any]], tuple[Any, ...]]:
+    if len(indices) == 1:
+        index = indices[0]
+        return lambda values: (values[index],)
+    return itemgetter(*indices) if indices else lambda _: ()
+
+
+def _coerce(value: Any, format: str) -> Any:
+    if format == "i":
+        return int(value) if math.isfinite(value) else INT_MISSING
+    if format == "?":
+        return bool(value)
+    return float(value)
+
+
+@dataclass(frozen=True)
+class _PackedLayout:
+    """Named values packed as a float64 array, followed by an int32 array and a bool array"""
+
+    names: tuple[str, ...]  # in packed order
+    formats: tuple[str, ...]
+
+    @staticmethod
+    def of(slots: Sequence[tuple[str, str]]) -> "_PackedLayout":
+        packed = sorted(slots, key=lambda slot: "di?".index(slot[1]))
+        return _PackedLayout(
+            tuple(name for name, _ in packed), tuple(format for _, format in packed)
+        )
+
+    @cached_property
+    def struct(self) -> struct.Struct:
+        return struct.Struct("<" + "".join(self.formats))
+
+    @cached_property
+    def hash(self) -> bytes:
+        return hashlib.sha256(
+            repr(list(zip(self.names, self.formats))).encode()
+        ).digest()[:8]
+
+    def pack(self, values: Sequence[Any], time: float) -> bytes:
+        packer = self.struct
+        try:
+            body = packer.pack(*values)
+        except struct.error:
+            body = packer.pack(
+                *(_coerce(value, format) for value, format in zip(values, self.formats))
+            )
+        return _HEADER.pack(MAGIC, VERSION, self.hash, time) + body
+
+    def unpack(self, payload: bytes) -> tuple[float, tuple[Any, ...]]:
+        if len(payload) < _HEADER.size:
+            raise WireFormatError("message is truncated")
+        magic, version, schema_hash, time = _HEADER.unpack_from(payload)
+        if magic != MAGIC or version != VERSION:
+            raise WireFormatError(f"unsupported wire format {magic!r} v{version}")
+        if schema_hash != self.hash:
+            raise WireFormatError("message was encoded with a different schema")
+        if len(payload) - _HEADER.size != self.struct.size:
+            raise WireFormatError("message is truncated")
+        return time, self.struct.unpack_from(payload, _HEADER.size)
+
+
+def _format(hint: Any, description: str) -> str:
+    if hint in _FORMATS:
+        return _FORMATS[hint]
+    raise WireFormatError(f"can't send {description} of type {hint}")
+
+
+def _sensor_format(sensor_cls: type, name: str) -> str:
+    hint = get_type_hints(sensor_cls).get(name)
+    if hint is None:
+        # a property, of which the return type may not be annotated
+        getter = getattr(getattr(sensor_cls, name), "fget", None)
+        hint = get_type_hints(getter).get("return", float) if getter else float
+    return _FORMATS.get(hint, "d")
+
+
+class SensorWireFormat[T: NetworkSensors]:
+    """Binary encoding of network sensors with a fixed field order generated from the sensors class
+
+    All values are packed in a single struct call, nan values are sent as they are. The schema hash in the header
+    makes decoding a message of a different schema fail instead of misreading it. Decoding builds the sensors
+    straight from the unpacked values.
+    """
+
+    def __init__(self, cls: type[T], include_properties: bool = False):
+        self._codec = SensorCodec.of(cls)
+        # the fields of network sensors are annotated with their sensor classes
+        sensors = [
+            (field.name, cast(type, field.type))
+            for field in fields(cls)
+            if is_sensor(field.type)
+        ]
+        self._layout = _PackedLayout.of(
+            [
+                (f"{name}.{field}", _sensor_format(sensor_cls, field))
+                for name, sensor_cls in sensors
+                for field in encoded_fields(sensor_cls, include_properties)
+            ]
+        )
+        self._values = _value_getter(self._layout.names)
+        position = {path: index for index, path in enumerate(self._layout.names)}
+        self._sensors: tuple[
+            tuple[str, tuple[str, ...], Callable[[Sequence[Any]], tuple[Any, ...]]],
+            ...,
+        ] = tuple(
+            (
+                name,
+                names := encoded_fields(sensor_cls, include_properties),
+                _items_getter([position[f"{name}.{field}"] for field in names]),
+            )
+            for name, sensor_cls in sensors
+        )
+        self._builds: dict[str, Callable[[Sequence[Any]], tuple[Any, ...]]] = {
+            build.name: _items_getter(
+                [position[f"{build.name}.{field}"] for field in build.values]
+            )
+            for build in sensor_builds(cls)
+        }
+        self._int_positions = {
+            index for index, format in enumerate(self._layout.formats) if format == "i"
+        }
+
+    @staticmethod
+    def of[
+        S: NetworkSensors
+    ](sensors_cls: type[S], include_properties: bool = False) -> "SensorWireFormat[S]":
+        return _sensor_wire_format(sensors_cls, include_properties)
+
+    @property
+    def schema(self) -> list[tuple[str, str]]:
+        """The packed fields and their struct formats, for implementing the format elsewhere"""
+        return list(zip(self._layout.names, self._layout.formats))
+
+    def encode(self, sensors: T) -> bytes:
+        time: datetime = getattr(sensors, "time")
+        return self._layout.pack(self._values(sensors), datetime_to_ms(time))
+
+    def _unpack(self, payload: bytes) -> tuple[float, tuple[Any, ...]]:
+        time, values = self._layout.unpack(payload)
+        if INT_MISSING in values:
+            values = tuple(
+                (
+                    float("nan")
+                    if index in self._int_positions and value == INT_MISSING
+                    else value
+                )
+                for index, value in enumerate(values)
+            )
+        return time, values
+
+    def to_dict(self, payload: bytes) -> dict[str, Any]:
+        time, values = self._unpack(payload)
+        return {
+            "time": time,
+            **{
+                name: dict(zip(names, getter(values)))
+                for name, names, getter in self._sensors
+            },
+        }
+
+    def decode(self, network: Network[T], payload: bytes) -> T:
+        time, values = self._unpack(payload)
+
+        def read(sensor_build: SensorBuild, with_appliances: bool) -> tuple[Any, ...]:
+            if with_appliances and sensor_build.appliances:
+                raise WireFormatError(
+                    f"can't decode {sensor_build.name} without its appliance in the network"
+                )
+            return self._builds[sensor_build.name](values)
+
+        return self._codec.from_values(network, time, read)
+
+
+@cache
+def _sensor_wire_format(
+    cls: type[NetworkSensors], include_properties: bool
+) -> SensorWireFormat[Any]:
+    return SensorWireFormat(cls, include_properties)
+
+
+class ControlWireFormat[Net: Network[Any]]:
+    """Binary encoding of the controls of a network with a fixed field order generated from its appliances
+
+    Every controllable appliance has a slot with a flag telling whether the controls hold a value for it.
+    """
+
+    def __init__(self, network: Net):
+        appliances: list[tuple[str, AnyAppliance, type[ApplianceControl]]] = []
+        for name, value in vars(network).items():
+            if not isinstance(value, Appliance):
+                continue
+            appliance = cast(AnyAppliance, value)
+            if (control_cls := control_class(appliance)) is not None:
+                appliances.append((name, appliance, control_cls))
+        self._appliances = tuple(appliances)
+        slots: list[tuple[str, str]] = []
+        self._fields: list[tuple[str, ...]] = []
+        for name, _, control_cls in self._appliances:
+            hints = get_type_hints(control_cls)
+            control_fields = tuple(field.name for field in fields(control_cls))
+            slots.append((name, "?"))
+            slots.extend(
+                (
+                    f"{name}.{field}",
+                    _format(hints[field], f"control {field} of {name}"),
+                )
+                for field in control_fields
+            )
+            self._fields.append(control_fields)
+        self._layout = _PackedLayout.of(slots)
+        position = {path: index for index, path in enumerate(self._layout.names)}
+        self._slots = tuple(
+            (
+                position[name],
+                [position[f"{name}.{field}"] for field in control_fields],
+                _items_getter(
+                    [position[f"{name}.{field}"] for field in control_fields]
+                ),
+            )
+            for (name, _, _), control_fields in zip(self._appliances, self._fields)
+        )
+        self._empty = tuple(
+            {"d": 0.0, "i": 0, "?": False}[format] for format in self._layout.formats
+        )
+
+    @property
+    def schema(self) -> list[tuple[str, str]]:
+        return list(zip(self._layout.names, self._layout.formats))
+
+    def encode(self, controls: NetworkControl[Net]) -> bytes:
+        values = list(self._empty)
+        for (_, appliance, _), control_fields, (present, positions, _) in zip(
+            self._appliances, self._fields, self._slots
+        ):
+            control = controls.appliance(appliance).get()
+            if control is None:
+                continue
+            values[present] = True
+            for position, value in zip(
+                positions, _value_getter(control_fields)(control)
+            ):
+                values[position] = value
+        return self._layout.pack(values, time_ms())
+
+    def decode(self, payload: bytes) -> NetworkControl[Net]:
+        _, values = self._layout.unpack(payload)
+        return NetworkControl(
+            {
+                appliance.id: control_cls(**dict(zip(control_fields, getter(values))))
+                for (_, appliance, control_cls), control_fields, (
+                    present,
+                    _,
+                    getter,
+                ) in zip(self._appliances, self._fields, self._slots)
+                if values[present]
+            }
+        )
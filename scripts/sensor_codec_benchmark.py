@@ -0,0 +1,102 @@
+"""Times encoding and decoding PowerHubSensors json in the working tree against a baseline revision
+
+    python scripts/sensor_codec_benchmark.py <baseline revision> [--number N]
+
+The baseline is checked out in a temporary git worktree. Both trees are timed in a process of their own through the
+functions the control app uses, sensors_to_json and PowerHub.sensors_from_json, on the same simulated sensor values.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from argparse import SUPPRESS, ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from timeit import timeit
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+CASES = ("encode", "encode enriched", "decode", "decode enriched")
+
+
+def _microseconds(fn: Callable[[], Any], number: int) -> float:
+    return timeit(fn, number=number) / number * 1e6
+
+
+def time_cases(number: int) -> dict[str, float]:
+    # imported from the tree on the python path, so only uses what the baseline has as well
+    from energy_box_control.power_hub.control.control import no_control
+    from energy_box_control.power_hub.network import PowerHub, PowerHubSchedules
+    from energy_box_control.sensors import sensors_to_json
+
+    power_hub = PowerHub.power_hub(PowerHubSchedules.const_schedules())
+    sensors = power_hub.sensors_from_state(
+        power_hub.simulate(power_hub.simple_initial_state(), no_control(power_hub))
+    )
+    sensor_json = sensors_to_json(sensors)
+    enriched_json = sensors_to_json(sensors, include_properties=True)
+    cases: dict[str, Callable[[], Any]] = {
+        "encode": lambda: sensors_to_json(sensors),
+        "encode enriched": lambda: sensors_to_json(sensors, include_properties=True),
+        "decode": lambda: power_hub.sensors_from_json(sensor_json),
+        "decode enriched": lambda: power_hub.sensors_from_json(enriched_json),
+    }
+    return {name: _microseconds(cases[name], number) for name in CASES}
+
+
+def _time_tree(tree: Path, number: int) -> dict[str, float]:
+    with TemporaryDirectory() as directory:
+        output = Path(directory) / "times.json"
+        subprocess.run(
+            [sys.executable, __file__, "--number", str(number), "--time", output],
+            cwd=tree,
+            env={**os.environ, "PYTHONPATH": str(tree)},
+            check=True,
+        )
+        return json.loads(output.read_text())
+
+
+def main(arguments: list[str] | None = None):
+    parser = ArgumentParser(
+        description="Times PowerHubSensors json encoding and decoding against a baseline revision"
+    )
+    parser.add_argument("baseline", nargs="?")
+    parser.add_argument("--number", type=int, default=200)
+    # times the tree the script runs in and writes the times to the given file
+    parser.add_argument("--time", type=Path, help=SUPPRESS)
+    args = parser.parse_args(arguments)
+
+    if args.time:
+        args.time.write_text(json.dumps(time_cases(args.number)))
+        return
+    if not args.baseline:
+        parser.error("the baseline revision is required")
+
+    with TemporaryDirectory() as directory:
+        baseline_tree = Path(directory) / "baseline"
+        subprocess.run(
+            ["git", "worktree", "add", "--detach", baseline_tree, args.baseline],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+        )
+        try:
+            baseline = _time_tree(baseline_tree, args.number)
+        finally:
+            subprocess.run(
+                ["git", "worktree", "remove", "--force", baseline_tree],
+                cwd=ROOT,
+                check=True,
+            )
+    current = _time_tree(ROOT, args.number)
+
+    print(f"{'':16}{'baseline µs':>12}{'current µs':>12}{'speedup':>10}")
+    for name in CASES:
+        print(
+            f"{name:16}{baseline[name]:12.1f}{current[name]:12.1f}{baseline[name] / current[name]:9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import numpy as np
+from hypothesis import given
+from hypothesis.strategies import floats, lists
+from pytest import approx, raises
+from scipy.interpolate import RegularGridInterpolator  # type: ignore
+
+from energy_box_control.appliances.performance_curve import PerformanceCurve
+from energy_box_control.appliances.yazaki import COOLING_CAPACITY, HEAT_INPUT
+
+temperature_strat = floats(-20, 150, allow_nan=False)
+
+
+def scipy_interpolator(curve: PerformanceCurve) -> RegularGridInterpolator:
+    return RegularGridInterpolator(
+        (curve.x, curve.y), curve.values, bounds_error=False, fill_value=None
+    )
+
+
+@given(temperature_strat, temperature_strat)
+def test_matches_scipy(cooling_temperature, hot_temperature):
+    for curve in (COOLING_CAPACITY, HEAT_INPUT):
+        expected = float(
+            scipy_interpolator(curve)((cooling_temperature, hot_temperature))
+        )
+        assert curve(cooling_temperature, hot_temperature) == approx(expected)
+
+
+@given(lists(temperature_strat, min_size=1, max_size=20), temperature_strat)
+def test_batch_matches_scalar(cooling_temperatures, hot_temperature):
+    result = COOLING_CAPACITY.batch(np.array(cooling_temperatures), hot_temperature)
+
+    assert result.shape == (len(cooling_temperatures),)
+    assert list(result) == approx(
+        [COOLING_CAPACITY(cooling, hot_temperature) for cooling in cooling_temperatures]
+    )
+
+
+def test_grid_points():
+    assert COOLING_CAPACITY(27, 70) == 10
+    assert COOLING_CAPACITY(32, 95) == 16
+    assert HEAT_INPUT(29.5, 87) == 26
+
+
+def test_invalid_curves():
+    with raises(ValueError, match="ascending"):
+        PerformanceCurve((1, 0), (0, 1), ((0, 0), (0, 0)))
+    with raises(ValueError, match="shape"):
+        PerformanceCurve((0, 1), (0, 1), ((0, 0),))
@@ -1,6 +1,7 @@
 from dataclasses import replace
 from datetime import time, timedelta, datetime
-from pytest import fixture
+import random
+from pytest import fixture, mark
 import pytz
 from energy_box_control.control.state_machines import (
     Context,
@@ -9,6 +10,7 @@ from energy_box_control.control.state_machines import (
     Predicate,
     State,
     StateMachine,
+    compile_predicate,
 )
 
 
@@ -197,3 +199,98 @@ def test_state_machine_holds(epoch):
         state, context, 0, 0, epoch + timedelta(seconds=60)
     )
     assert state == States.B
+
+
+class _SensorsAreEven(Predicate[int, int]):
+    def resolve(self, context: Context, control_state: int, sensors: int, time: datetime) -> bool:  # type: ignore
+        return sensors % 2 == 0
+
+
+def _random_predicate(
+    generator: random.Random, depth: int, markers: list[Marker]
+) -> Predicate[int, int]:
+    if depth == 0 or generator.random() < 0.2:
+        match generator.randrange(6):
+            case 0:
+                return Fn.const_pred(generator.random() < 0.5)
+            case 1:
+                return Fn.pred(lambda state, sensors: state < sensors)
+            case 2:
+                return _SensorsAreEven()
+            case 3:
+                return Fn.state(lambda state: datetime(2024, 1, 1, hour=12) + timedelta(seconds=state)).within(timedelta(seconds=2))  # type: ignore
+            case _:
+                value = generator.choice(
+                    [Fn.state(lambda state: state), Fn.sensors(lambda sensors: sensors)]
+                )
+                const = Fn.const(generator.randrange(4))
+                return generator.choice(
+                    [
+                        value < const,
+                        value <= const,
+                        value > const,
+                        value >= const,
+                        value == const,  # type: ignore
+                        value != const,  # type: ignore
+                    ]
+                )
+    match generator.randrange(4):
+        case 0:
+            return ~_random_predicate(generator, depth - 1, markers)
+        case 1:
+            marker = Marker(f"marker {len(markers)}")
+            markers.append(marker)
+            return _random_predicate(generator, depth - 1, markers).holds_true(
+                marker, timedelta(seconds=generator.randrange(4))
+            )
+        case 2:
+            return _random_predicate(generator, depth - 1, markers) & _random_predicate(
+                generator, depth - 1, markers
+            )
+        case _:
+            return _random_predicate(generator, depth - 1, markers) | _random_predicate(
+                generator, depth - 1, markers
+            )
+
+
+@mark.parametrize("seed", range(200))
+def test_compiled_predicate_matches_resolve(epoch, seed):
+    generator = random.Random(seed)
+    pred = _random_predicate(generator, 5, [])
+    compiled = compile_predicate(pred)
+    resolved_context, compiled_context = Context(), Context()
+    for step in range(12):
+        control_state, sensors = generator.randrange(4), generator.randrange(4)
+        time = epoch + timedelta(seconds=step)
+        assert compiled(compiled_context, control_state, sensors, time) == pred.resolve(
+            resolved_context, control_state, sensors, time
+        )
+        # timed predicates mark the context the same, also where an operand decided the outcome
+        assert vars(compiled_context) == vars(resolved_context)
+        resolved_context, compiled_context = (
+            resolved_context.flip(),
+            compiled_context.flip(),
+        )
+
+
+def test_compiled_predicate_short_circuits(epoch):
+    def fail(_state: int, _sensors: int) -> bool:
+        raise AssertionError("evaluated the right operand")
+
+    assert not compile_predicate(Fn.const_pred(False) & Fn.pred(fail))(
+        Context(), 0, 0, epoch
+    )
+    assert compile_predicate(Fn.const_pred(True) | Fn.pred(fail))(
+        Context(), 0, 0, epoch
+    )
+
+
+def test_compiled_predicate_keeps_marking_timed_operand(epoch):
+    marker = Marker("test")
+    pred = compile_predicate(
+        Fn.const_pred(False)
+        & Fn.const_pred(True).holds_true(marker, timedelta(seconds=5))
+    )
+    context = Context()
+    assert not pred(context, 0, 0, epoch)
+    assert context.flip().previous(marker) == epoch
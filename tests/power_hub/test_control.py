@@ -1,10 +1,31 @@
 from datetime import datetime, timezone, tzinfo
+from energy_box_control.control.state_machines import Context, StateMachine
+from energy_box_control.power_hub.control.chill.control import (
+    chill_control_state_machine,
+)
 from energy_box_control.power_hub.control.control import (
     control_from_json,
     control_power_hub,
     control_to_json,
+    initial_control_all_off,
     no_control,
 )
+from energy_box_control.power_hub.control.cooling_supply.control import (
+    cooling_supply_control_machine,
+)
+from energy_box_control.power_hub.control.fresh_water.control import (
+    fresh_water_control_machine,
+)
+from energy_box_control.power_hub.control.hot.control import (
+    hot_control_state_machine,
+)
+from energy_box_control.power_hub.control.technical_water.control import (
+    technical_water_control_machine,
+)
+from energy_box_control.power_hub.control.waste.control import waste_control_machine
+from energy_box_control.power_hub.control.water_treatment.control import (
+    water_treatment_control_machine,
+)
 from energy_box_control.power_hub.control.state import initial_control_state
 from energy_box_control.power_hub.network import PowerHub, PowerHubSchedules
 from energy_box_control.schedules import ConstSchedule
@@ -46,3 +67,42 @@ def test_replace_control():
         new_outboard_pump_control.appliance(power_hub.outboard_pump).get().on
     )
     assert current_outboard_pump_control != new_outboard_pump_control
+
+
+def test_compiled_transitions_match_resolve():
+    power_hub = PowerHub.power_hub(PowerHubSchedules.const_schedules())
+    machines: list[StateMachine] = [
+        chill_control_state_machine,
+        cooling_supply_control_machine,
+        fresh_water_control_machine,
+        hot_control_state_machine,
+        technical_water_control_machine,
+        waste_control_machine,
+        water_treatment_control_machine,
+    ]
+    transitions = [
+        (pred, pred.compile())
+        for machine in machines
+        for pred in machine.transitions.values()
+    ]
+    contexts = [(Context(), Context()) for _ in transitions]
+
+    control_state = initial_control_state()
+    controls = initial_control_all_off(power_hub)
+    state = power_hub.simple_initial_state()
+    for _ in range(300):
+        state = power_hub.simulate(state, controls)
+        sensors = power_hub.sensors_from_state(state)
+        for (pred, compiled), (resolved_context, compiled_context) in zip(
+            transitions, contexts
+        ):
+            assert compiled(
+                compiled_context, control_state, sensors, sensors.time
+            ) == pred.resolve(resolved_context, control_state, sensors, sensors.time)
+            assert vars(compiled_context) == vars(resolved_context)
+        contexts = [
+            (resolved.flip(), compiled.flip()) for resolved, compiled in contexts
+        ]
+        control_state, controls = control_power_hub(
+            power_hub, control_state, sensors, sensors.time, False
+        )
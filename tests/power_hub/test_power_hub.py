@@ -1,6 +1,6 @@
 from datetime import datetime, time, timedelta, timezone
 from functools import partial
-from pandas import read_csv
+from pandas import DatetimeIndex, Series, read_csv
 from pytest import approx, fixture, mark
 from energy_box_control.appliances import (
     HeatPipesPort,
@@ -36,6 +36,8 @@ from tests.simulation.test_simulation import (
 from energy_box_control.power_hub.network import PowerHubSchedules
 from energy_box_control.schedules import ConstSchedule, PeriodicSchedule
 from energy_box_control.appliances.pcm import PcmPort
+from tests.test_network import assert_same_state, reference_simulate
+from energy_box_control.checkpoint import encode_checkpoint
 
 
 @fixture
@@ -141,6 +143,52 @@ def test_power_hub_simulation_no_control(power_hub_const, min_max_temperature):
     assert isinstance(result, SimulationSuccess)
 
 
+def test_power_hub_execution_plan_matches_reference(power_hub_const):
+    control_values = no_control(power_hub_const)
+    state = power_hub_const.simple_initial_state(datetime.now())
+
+    for _ in range(100):
+        next_state = power_hub_const.simulate(state, control_values)
+        assert_same_state(
+            next_state, reference_simulate(power_hub_const, state, control_values)
+        )
+        state = next_state
+
+
+def test_power_hub_run_matches_simulate(power_hub_const):
+    initial_state = power_hub_const.simple_initial_state(datetime.now(timezone.utc))
+    control_function = partial(control_power_hub, power_hub_const, survival_mode=False)
+
+    control_state = initial_control_state()
+    control_values = initial_control_all_off(power_hub_const)
+    expected = initial_state
+    for _ in range(50):
+        expected = power_hub_const.simulate(expected, control_values)
+        control_state, control_values = control_function(
+            control_state,
+            power_hub_const.sensors_from_state(expected),
+            expected.time.timestamp,
+        )
+
+    run_control_state = initial_control_state()
+
+    def control_fn(sensors):
+        nonlocal run_control_state
+        run_control_state, control_values = control_function(
+            run_control_state, sensors, sensors.time
+        )
+        return control_values
+
+    state = power_hub_const.run(
+        initial_state,
+        initial_control_all_off(power_hub_const),
+        50,
+        control_fn=control_fn,
+    )
+
+    assert_same_state(state, expected)
+
+
 @mark.skip(reason="test broke due to turning off water treatment")
 @mark.parametrize("seconds", [1, 60])
 def test_power_hub_simulation_control(power_hub_const, min_max_temperature, seconds):
@@ -183,6 +231,46 @@ def test_power_hub_simulation_data_schedule(
     assert isinstance(result, SimulationSuccess)
 
 
+def test_power_hub_sampled_schedules(schedules):
+    start = schedules.ambient_temperature.schedule_start  # type: ignore
+    step_size = timedelta(minutes=5)
+    power_hub = PowerHub.power_hub(schedules)
+    sampled_power_hub = PowerHub.power_hub(schedules.sampled(start, step_size))
+    control = initial_control_all_off(power_hub)
+    sampled_control = initial_control_all_off(sampled_power_hub)
+
+    state = power_hub.simple_initial_state(start, step_size)
+    sampled_state = sampled_power_hub.simple_initial_state(start, step_size)
+    for _ in range(200):
+        state = power_hub.simulate(state, control)
+        sampled_state = sampled_power_hub.simulate(sampled_state, sampled_control)
+
+    assert encode_checkpoint(sampled_power_hub, sampled_state) == encode_checkpoint(
+        power_hub, state
+    )
+
+
+def test_power_hub_schedules_from_recorded():
+    start = datetime(2024, 7, 1, tzinfo=timezone.utc)
+    # jittered timestamps with a gap, as recorded
+    index = DatetimeIndex(
+        [start + timedelta(seconds=offset) for offset in (0, 61, 119, 600)]
+    )
+    schedules = PowerHubSchedules.schedules_from_recorded(
+        Series([0.0, 100, 200, 300], index=index),
+        Series([25.0, 26, 27, 28], index=index),
+        Series([1000.0, 1000, 2000, 2000], index=index),
+    )
+    power_hub = PowerHub.power_hub(schedules)
+    state = power_hub.simple_initial_state(start, timedelta(seconds=30))
+    for _ in range(10):
+        state = power_hub.simulate(state, no_control(power_hub))
+
+    time = ProcessTime(timedelta(seconds=30), 2, start)
+    assert schedules.ambient_temperature.at(time) == approx(25 + 60 / 61)
+    assert state.time.timestamp == start + timedelta(minutes=5)
+
+
 @fixture
 def data():
     return read_csv(
@@ -1,19 +1,43 @@
 import asyncio
 from dataclasses import fields
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from functools import partial
 import json
+import math
 import queue
+from typing import get_type_hints
 
 from paho.mqtt.client import Client, MQTTMessage
 from pytest import fixture
 import pytest
 from energy_box_control.config import CONFIG
 from energy_box_control.mqtt import run_listener
-from energy_box_control.power_hub.control.control import no_control
+from energy_box_control.power_hub.control.control import (
+    control_power_hub,
+    initial_control_all_off,
+    no_control,
+)
+from energy_box_control.power_hub.control.state import initial_control_state
 from energy_box_control.power_hub.network import PowerHub, PowerHubSchedules
-from energy_box_control.power_hub.sensors import sensor_values
-from energy_box_control.sensors import sensors_to_json
+from energy_box_control.power_hub.components import HOT_SWITCH_VALVE_PCM_POSITION
+from energy_box_control.power_hub.sensors import (
+    ElectricalSensors,
+    PcmSensors,
+    PowerHubSensors,
+    sensor_values,
+)
+from energy_box_control.sensors import (
+    CHANGED,
+    KEYFRAME,
+    REMOVED,
+    Sensor,
+    SensorCodec,
+    SensorDeltaDecoder,
+    SensorDeltaEncoder,
+    derived_dependencies,
+    sensor_encoder,
+    sensors_to_json,
+)
 
 
 @fixture
@@ -65,6 +89,194 @@ def test_enriched_sensors_to_json_roundtrips(power_hub, sensors):
     assert sensors == roundtripped
 
 
+@pytest.mark.parametrize("include_properties", [False, True])
+def test_sensor_codec_encodes_like_sensor_encoder(sensors, include_properties):
+    encoded = SensorCodec.of(PowerHubSensors).encode(sensors, include_properties)
+    assert json.loads(encoded) == json.loads(
+        json.dumps(sensors, cls=sensor_encoder(include_properties))
+    )
+
+
+@pytest.mark.parametrize("include_properties", [False, True])
+def test_sensor_codec_decodes_like_sensor_context(
+    power_hub, sensors, include_properties
+):
+    values = json.loads(sensors_to_json(sensors, include_properties))
+    decoded = SensorCodec.of(PowerHubSensors).from_dict(power_hub, values)
+    reference = PowerHubSensors.context().resolve_for_values(
+        PowerHubSensors, values, power_hub
+    )
+    assert decoded.time == reference.time
+    for field in fields(PowerHubSensors):
+        if field.name != "time":
+            decoded_sensor = getattr(decoded, field.name)
+            reference_sensor = getattr(reference, field.name)
+            assert type(decoded_sensor) == type(reference_sensor)
+            assert vars(decoded_sensor) == vars(reference_sensor), field.name
+
+
+def test_sensor_codec_missing_value(power_hub, sensors):
+    values = json.loads(sensors_to_json(sensors))
+    del values["pcm"]["temperature"]
+    with pytest.raises(KeyError, match="for pcm"):
+        SensorCodec.of(PowerHubSensors).from_dict(power_hub, values)
+
+
+def test_derived_property_recomputed_after_a_value_is_set(sensors):
+    sensors.hot_switch_valve.position = HOT_SWITCH_VALVE_PCM_POSITION
+    sensors.hot_storage_flow_sensor.flow = 1
+    charge_power = sensors.pcm.charge_power
+    assert sensors.pcm.charge_power == charge_power
+    sensors.hot_storage_flow_sensor.flow = 2
+    assert sensors.pcm.charge_power == pytest.approx(2 * charge_power)
+
+
+def test_derived_property_kept_when_other_values_are_set(sensors):
+    charge_power = sensors.pcm.charge_power
+    memo = sensors.pcm.__dict__["charge_power"]
+    sensors.yazaki_hot_flow_sensor.flow = 3
+    sensors.pcm.temperature += 1
+    assert sensors.pcm.charge_power == charge_power
+    assert sensors.pcm.__dict__["charge_power"] is memo
+
+
+def test_derived_dependencies():
+    assert derived_dependencies(ElectricalSensors, {"power_hub_power"}) == {
+        "compound_power_consumption"
+    }
+    assert derived_dependencies(PcmSensors, {"charge_power"}) == set()
+
+
+def test_sensor_codec_selected_properties(sensors):
+    codec = SensorCodec.of(PowerHubSensors)
+    values = codec.to_dict(
+        sensors, include_properties=True, properties={"pcm.net_charge"}
+    )
+    assert values["pcm"].keys() - codec.to_dict(sensors)["pcm"].keys() == {"net_charge"}
+    assert values["yazaki"] == codec.to_dict(sensors)["yazaki"]
+    assert codec.to_dict(
+        sensors, include_properties=True, properties={"electrical.power_hub_power"}
+    )["electrical"].keys() - codec.to_dict(sensors)["electrical"].keys() == {
+        "power_hub_power",
+        "compound_power_consumption",
+    }
+    with pytest.raises(ValueError, match="pcm.temperature"):
+        codec.to_dict(sensors, include_properties=True, properties={"pcm.temperature"})
+
+
+def simulated_sensors(power_hub, steps):
+    state = power_hub.simple_initial_state()
+    control_state = initial_control_state()
+    controls = initial_control_all_off(power_hub)
+    for _ in range(steps):
+        state = power_hub.simulate(state, controls)
+        sensors = power_hub.sensors_from_state(state)
+        control_state, controls = control_power_hub(
+            power_hub, control_state, sensors, sensors.time, survival_mode=False
+        )
+        yield sensors
+
+
+def test_sensor_delta_roundtrips(power_hub):
+    encoder = SensorDeltaEncoder(
+        PowerHubSensors, keyframe_interval=timedelta(seconds=10), dead_bands={}
+    )
+    decoder = SensorDeltaDecoder(PowerHubSensors, power_hub)
+    codec = SensorCodec.of(PowerHubSensors)
+    messages = []
+    for sensors in simulated_sensors(power_hub, 25):
+        message = encoder.encode(sensors)
+        messages.append(json.loads(message))
+        decoded = decoder.decode(message)
+        assert decoded is not None
+        assert codec.to_dict(decoded, True) == codec.to_dict(sensors, True)
+
+    assert [KEYFRAME in message for message in messages].count(True) == 3
+    assert sum(len(json.dumps(message)) for message in messages[1:10]) < len(
+        json.dumps(messages[0])
+    )
+
+
+def test_decoded_digest_matches_sensors_digest(power_hub, sensors):
+    decoded = SensorCodec.of(PowerHubSensors).decode(
+        power_hub, sensors_to_json(sensors)
+    )
+    assert decoded.digest() == sensors.digest()
+    assert decoded.same_as(sensors)
+    assert decoded.diff(sensors) == {}
+
+
+def test_sensors_diff(power_hub, sensors):
+    previous = SensorCodec.of(PowerHubSensors).decode(
+        power_hub, sensors_to_json(sensors)
+    )
+    sensors.pcm.temperature += 1
+    assert not sensors.same_as(previous)
+    assert sensors.diff(previous) == {"pcm": {"temperature"}}
+    sensors.pcm.temperature -= 1
+    assert sensors.same_as(previous)
+    sensors.time += timedelta(seconds=1)
+    assert not sensors.same_as(previous)
+    assert sensors.diff(previous) == {}
+    assert sensors.diff(None).keys() == previous.digest().values.keys()
+
+
+def test_sensor_delta_digest_matches_full_decode(power_hub):
+    encoder = SensorDeltaEncoder(PowerHubSensors, dead_bands={})
+    decoder = SensorDeltaDecoder(PowerHubSensors, power_hub)
+    codec = SensorCodec.of(PowerHubSensors)
+    for sensors in simulated_sensors(power_hub, 5):
+        decoded = decoder.decode(encoder.encode(sensors))
+        assert decoded is not None
+        assert (
+            decoded.digest() == codec.decode(power_hub, codec.encode(sensors)).digest()
+        )
+
+
+def test_sensor_delta_dead_band(power_hub, sensors):
+    encoder = SensorDeltaEncoder(PowerHubSensors)
+    encoder.message(sensors)
+    rh33 = sensors.rh33_heat_pipes
+    temperature = rh33.hot_temperature
+    sensors.time += timedelta(seconds=1)
+    rh33.hot_temperature = temperature + 0.01
+    assert "rh33_heat_pipes" not in encoder.message(sensors)[CHANGED]
+    sensors.time += timedelta(seconds=1)
+    rh33.hot_temperature = temperature + 0.1
+    assert encoder.message(sensors)[CHANGED]["rh33_heat_pipes"] == {
+        "hot_temperature": temperature + 0.1
+    }
+
+
+def test_sensor_delta_removed_value(power_hub, sensors):
+    encoder = SensorDeltaEncoder(PowerHubSensors)
+    decoder = SensorDeltaDecoder(PowerHubSensors, power_hub)
+    decoder.receive(encoder.message(sensors))
+    sensors.time += timedelta(seconds=1)
+    sensors.pcm.temperature = math.nan
+    message = encoder.message(sensors)
+    assert message[REMOVED] == {"pcm": ["temperature"]}
+    with pytest.raises(KeyError, match="for pcm"):
+        decoder.receive(message)
+
+
+def test_sensor_delta_resyncs_after_missed_delta(power_hub):
+    encoder = SensorDeltaEncoder(PowerHubSensors, dead_bands={})
+    decoder = SensorDeltaDecoder(PowerHubSensors, power_hub)
+    sensors = list(simulated_sensors(power_hub, 5))
+    assert decoder.receive(encoder.message(sensors[0])) is not None
+    encoder.message(sensors[1])
+    assert decoder.receive(encoder.message(sensors[2])) is None
+    assert decoder.needs_keyframe
+    encoder.request_keyframe()
+    keyframe = encoder.message(sensors[3])
+    assert keyframe[KEYFRAME]
+    assert decoder.receive(keyframe) is not None
+    assert not decoder.needs_keyframe
+    assert decoder.receive(keyframe) is not None
+    assert decoder.receive(encoder.message(sensors[4])).time == sensors[4].time
+
+
 def test_sensors_to_json_doesnt_include_is_sensor(sensors):
     returned = json.loads(sensors_to_json(sensors))
     assert all(
@@ -83,6 +295,21 @@ def test_chiller_sensor_statuses(sensors):
     assert sensors.chiller.statuses() == ["Fan 1", "Inverter/compr."]
 
 
+def test_compiled_sensor_resolvers_match_value_from_state(power_hub):
+    state = power_hub.simulate(power_hub.simple_initial_state(), no_control(power_hub))
+    for field in PowerHubSensors.sensor_initialization_order():
+        sensor_cls = getattr(PowerHubSensors, field.name, field.type)
+        appliance = getattr(power_hub, field.name, None)
+        for name in get_type_hints(sensor_cls):
+            if not isinstance(description := getattr(sensor_cls, name, None), Sensor):
+                continue
+            expected = description.value_from_state(power_hub, state, appliance, name)
+            resolved = description.compile(name)(power_hub, state, appliance)
+            assert resolved == expected or (
+                math.isnan(resolved) and math.isnan(expected)
+            ), f"{field.name}.{name}"
+
+
 @pytest.fixture
 def plc_json():
     return """{"time": 1723636665081, "heat_pipes": {},"heat_pipes_valve": {"status": 0, "position": 0.0},"heat_pipes_power_hub_pump": {},"heat_pipes_supply_box_pump": {},"hot_switch_valve": {"status": 0, "position": 0.0},"hot_reservoir": {},"pcm": {"temperature": 62.0},"yazaki_hot_bypass_valve": {"status": 0, "position": 0.0},"yazaki": {"operation_output": false, "error_output": false},"chiller": {"status": 0, "fault_code": 0},"chiller_switch_valve": {"status": 0, "position": 0.0},"cold_reservoir": {"temperature": 16.7999992370605},"waste_bypass_valve": {"status": 0, "position": 0.0},"preheat_switch_valve": {"status": 0, "position": 0.0},"preheat_reservoir": {},"waste_switch_valve": {"status": 0, "position": 0.0},"outboard_exchange": {},"weather": {"status": 0, "ambient_temperature": 0.0, "global_irradiance": 0.0},"pcm_to_yazaki_pump": {"status": 0, "pump_alarm": 0, "pump_warning": 0, "pressure": 0.0},"chilled_loop_pump": {"status": 0, "pump_alarm": 0, "pump_warning": 0, "pressure": 0.0},"waste_pump": {"status": 0, "pump_alarm": 0, "pump_warning": 0},"hot_water_pump": {},"outboard_pump": {},"cooling_demand_pump": {"status": 0, "pump_alarm": 0, "pump_warning": 280, "pressure": 3.0},"supply_box_temperature_sensor": {"humidity": 0.0, "temperature": 0.0},"electrical": {"e1_voltage_L1": 238.099136352539, "e1_voltage_L2": 0.0, "e1_voltage_L3": 0.0, "e1_current_L1": 236.526809692383, "e1_current_L2": 0.0, "e1_current_L3": 0.0, "e1_power_L1": 224.177261352539, "e1_power_L2": 5.56743502616882e-1, "e1_power_L3": 71.1542510986328, "e2_voltage_L1": 238.158493041992, "e2_voltage_L2": 0.0, "e2_voltage_L3": 0.0, "e2_current_L1": 236.512908935547, "e2_current_L2": 0.0, "e2_current_L3": 0.0, "e2_power_L1": 224.216079711914, "e2_power_L2": 8.66633224487305, "e2_power_L3": 1926.59265136719, "e3_voltage_L1": 238.168853759766, "e3_voltage_L2": 2.94647842645645e-1, "e3_voltage_L3": 41.608024597168, "e3_current_L1": 236.554336547852, "e3_current_L2": 6.36813580989838e-1, "e3_current_L3": 69.8235244750977, "e3_power_L1": 224.295379638672, "e3_power_L2": 0.0, "e3_power_L3": 0.0, "e4_voltage_L1": 238.321075439453, "e4_voltage_L2": 0.0, "e4_voltage_L3": 0.0, "e4_current_L1": 236.863174438477, "e4_current_L2": 7.73783177137375e-2, "e4_current_L3": 0.0, "e4_power_L1": 224.583770751953, "e4_power_L2": 0.0, "e4_power_L3": 0.0, "e5_voltage_L1": 238.165374755859, "e5_voltage_L2": 0.0, "e5_voltage_L3": 0.0, "e5_current_L1": 236.569610595703, "e5_current_L2": 2.82273888587952e-1, "e5_current_L3": 37.2300300598145, "e5_power_L1": 224.554992675781, "e5_power_L2": 2.54032874107361, "e5_power_L3": 344.038848876953, "e6_voltage_L1": 237.936798095703, "e6_voltage_L2": 1.13560326397419e-1, "e6_voltage_L3": 14.9581537246704, "e6_current_L1": 236.235763549805, "e6_current_L2": 2.20953345298767e-1, "e6_current_L3": 18.3741989135742, "e6_power_L1": 224.406509399414, "e6_power_L2": 1.35730549693108e-1, "e6_power_L3": 0.0, "e7_voltage_L1": 237.797668457031, "e7_voltage_L2": 0.0, "e7_voltage_L3": 0.0, "e7_current_L1": 236.494812011719, "e7_current_L2": 0.0, "e7_current_L3": 0.0, "e7_power_L1": 224.044830322266, "e7_power_L2": 0.0, "e7_power_L3": 0.0, "e8_voltage_L1": 237.712432861328, "e8_voltage_L2": 0.0, "e8_voltage_L3": 0.0, "e8_current_L1": 236.198455810547, "e8_current_L2": 0.0, "e8_current_L3": 0.0, "e8_power_L1": 224.106109619141, "e8_power_L2": 0.0, "e8_power_L3": 0.0, "thermo_cabinet_voltage_L1": 238.183731079102, "thermo_cabinet_voltage_L2": 1.02710020542145, "thermo_cabinet_voltage_L3": 34.4334144592285, "thermo_cabinet_current_L1": 236.367324829102, "thermo_cabinet_current_L2": 1.69954752922058, "thermo_cabinet_current_L3": 89.4733276367188, "thermo_cabinet_power_L1": 224.158142089844, "thermo_cabinet_power_L2": 6.04724943637848e-1, "thermo_cabinet_power_L3": 17.3453159332275, "solar_1_battery_voltage": 7.35961953463394e-42, "solar_1_battery_current": 5.3809861030073e-43, "solar_1_battery_temp": 0.0, "solar_1_on_off": true, "solar_1_state": 252, "solar_1_pv_voltage": 0.0, "solar_1_pv_current": 9.18340948595269e-41, "solar_1_equalization_pending": false, "solar_1_equalization_time_remaining": 0.0, "solar_1_relay_on_the_charger": 1, "solar_1_yield_today": 3.13890856008759e-43, "solar_1_max_charge_power_today": 1.47360546508398e-41, "solar_1_yield_yesterday": 3.60133705331478e-43, "solar_1_max_charge_power_yesterday": 1.10352254065579e-41, "solar_1_error_code": 0, "solar_1_PV_power": 2.86579548939068e-41, "solar_1_User_yield": 1.60028284625894e-42, "solar_1_MPP_operation_mode": 2, "solar_1_low_battery_voltage_alarm": 0, "solar_1_high_battery_voltage_alarm": 0, "solar_1_PV_voltage_for_tracker_0": 3.25745841016947e-41, "solar_1_PV_voltage_for_tracker_1": 3.29052905392754e-41, "solar_1_PV_voltage_for_tracker_2": 1.76395450689208e-41, "solar_1_PV_voltage_for_tracker_3": 3.85889571105768e-41, "solar_1_PV_power_for_tracker_0": 8.08549213915419e-43, "solar_1_PV_power_for_tracker_1": 7.97338826200821e-43, "solar_1_PV_power_for_tracker_2": 3.41916825295255e-43, "solar_1_PV_power_for_tracker_3": 9.31863478776003e-43, "solar_2_battery_voltage": 7.37082992234854e-42, "solar_2_battery_current": 5.78736265766149e-43, "solar_2_battery_temp": 0.0, "solar_2_on_off": true, "solar_2_state": 252, "solar_2_pv_voltage": 0.0, "solar_2_pv_current": 9.18340948595269e-41, "solar_2_equalization_pending": false, "solar_2_equalization_time_remaining": 0.0, "solar_2_relay_on_the_charger": 1, "solar_2_yield_today": 9.66895940384124e-44, "solar_2_max_charge_power_today": 8.35454144430456e-42, "solar_2_yield_yesterday": 1.07899981753011e-43, "solar_2_max_charge_power_yesterday": 6.43476254817956e-42, "solar_2_error_code": 0, "solar_2_PV_power": 3.06590091009627e-41, "solar_2_User_yield": 3.48923317616879e-43, "solar_2_MPP_operation_mode": 2, "solar_2_low_battery_voltage_alarm": 0, "solar_2_high_battery_voltage_alarm": 0, "solar_2_PV_voltage_for_tracker_0": 3.32233852906771e-41, "solar_2_PV_voltage_for_tracker_1": 3.31252943981744e-41, "solar_2_PV_voltage_for_tracker_2": 3.35835189960086e-41, "solar_2_PV_voltage_for_tracker_3": 3.92139362256657e-41, "solar_2_PV_power_for_tracker_0": 7.44089484556478e-43, "solar_2_PV_power_for_tracker_1": 7.18866112198631e-43, "solar_2_PV_power_for_tracker_2": 7.34280395306204e-43, "solar_2_PV_power_for_tracker_3": 8.68805047881386e-43, "solar_3_battery_voltage": 7.36662602695556e-42, "solar_3_battery_current": 3.97968763868248e-43, "solar_3_battery_temp": 0.0, "solar_3_on_off": true, "solar_3_state": 252, "solar_3_pv_voltage": 0.0, "solar_3_pv_current": 9.18340948595269e-41, "solar_3_equalization_pending": false, "solar_3_equalization_time_remaining": 0.0, "solar_3_relay_on_the_charger": 1, "solar_3_yield_today": 2.48029828185493e-43, "solar_3_max_charge_power_today": 8.28027262569534e-42, "solar_3_yield_yesterday": 1.62550621861679e-43, "solar_3_max_charge_power_yesterday": 7.29095590988202e-42, "solar_3_error_code": 0, "solar_3_PV_power": 2.49711386342682e-41, "solar_3_User_yield": 7.21668709127281e-43, "solar_3_MPP_operation_mode": 2, "solar_3_low_battery_voltage_alarm": 0, "solar_3_high_battery_voltage_alarm": 0, "solar_3_PV_voltage_for_tracker_0": 3.86450090491498e-41, "solar_3_PV_voltage_for_tracker_1": 2.1505727531993e-41, "solar_3_PV_voltage_for_tracker_2": 3.39646721783049e-41, "solar_3_PV_voltage_for_tracker_3": 3.89224661450861e-41, "solar_3_PV_power_for_tracker_0": 9.23455687990054e-43, "solar_3_PV_power_for_tracker_1": 3.78350585367701e-44, "solar_3_PV_power_for_tracker_2": 7.34280395306204e-43, "solar_3_PV_power_for_tracker_3": 8.01542721593795e-43, "solar_4_battery_voltage": 7.36382343002691e-42, "solar_4_battery_current": 6.38992099732116e-43, "solar_4_battery_temp": 0.0, "solar_4_on_off": true, "solar_4_state": 252, "solar_4_pv_voltage": 0.0, "solar_4_pv_current": 9.18340948595269e-41, "solar_4_equalization_pending": false, "solar_4_equalization_time_remaining": 0.0, "solar_4_relay_on_the_charger": 1, "solar_4_yield_today": 2.91470080579562e-43, "solar_4_max_charge_power_today": 1.46772001153381e-41, "solar_4_yield_yesterday": 3.0268046829416e-43, "solar_4_max_charge_power_yesterday": 1.02799255342869e-41, "solar_4_error_code": 0, "solar_4_PV_power": 3.64225496847306e-41, "solar_4_User_yield": 1.62130232322381e-42, "solar_4_MPP_operation_mode": 2, "solar_4_low_battery_voltage_alarm": 0, "solar_4_high_battery_voltage_alarm": 0, "solar_4_PV_voltage_for_tracker_0": 3.32121749029625e-41, "solar_4_PV_voltage_for_tracker_1": 3.31168866073884e-41, "solar_4_PV_voltage_for_tracker_2": 5.2278241808566e-41, "solar_4_PV_voltage_for_tracker_3": 3.83549402670346e-41, "solar_4_PV_power_for_tracker_0": 7.93134930807846e-43, "solar_4_PV_power_for_tracker_1": 8.04345318522445e-43, "solar_4_PV_power_for_tracker_2": 1.12103877145985e-42, "solar_4_PV_power_for_tracker_3": 9.43073866490602e-43, "battery_system_voltage": 7.25872604520255e-44, "battery_system_current": 2.34016843542244e-43, "battery_system_power": 1.21212317164097e-41, "battery_system_soc": 5.46506401086679e-43, "general_estop_active": false, "general_ups_24v_not_ready": false, "general_ups_24v_replace_battery": false, "vebus_e1_input_voltage": 3.34770203127199e-43, "vebus_e1_input_current": 7.14662216805657e-45, "vebus_e1_input_frequency": 7.02050530626733e-44, "vebus_e1_input_power": 5.88545355016423e-45, "vebus_e1_output_voltage": 3.34770203127199e-43, "vebus_e1_output_current": 2.00385680398449e-44, "vebus_e1_output_power": 2.66246708221715e-45, "vebus_e1_temperature_alarm": 0, "vebus_e1_lowBattery_alarm": 0, "vebus_e1_overload_alarmv": 0, "vebus_e1_ripple_alarm": 0, "vebus_e2_input_voltage": 3.33368904662874e-43, "vebus_e2_input_current": 1.1630777253896e-44, "vebus_e2_input_frequency": 7.02050530626733e-44, "vebus_e2_input_power": 1.10702578681661e-44, "vebus_e2_output_voltage": 3.33368904662874e-43, "vebus_e2_output_current": 2.00385680398449e-44, "vebus_e2_output_power": 6.72623262875912e-45, "vebus_e2_temperature_alarm": 0, "vebus_e2_lowBattery_alarm": 0, "vebus_e2_overload_alarmv": 0, "vebus_e2_ripple_alarm": 0, "vebus_e3_input_voltage": 3.14451375394489e-43, "vebus_e3_input_current": 2.71851902079014e-44, "vebus_e3_input_frequency": 7.02050530626733e-44, "vebus_e3_input_power": 4.52619403976916e-44, "vebus_e3_output_voltage": 3.14451375394489e-43, "vebus_e3_output_current": 2.00385680398449e-44, "vebus_e3_output_power": 3.67140197653102e-44, "vebus_e3_temperature_alarm": 0, "vebus_e3_lowBattery_alarm": 0, "vebus_e3_overload_alarmv": 0, "vebus_e3_ripple_alarm": 0, "vebus_output_frequency": 7.01770270933868e-43, "vebus_battery_voltage": 7.38764550392044e-44, "vebus_battery_current": 2.77457095936314e-44, "vebus_phase_count": 4.20389539297445e-45, "vebus_active_input": 0.0, "vebus_state": 3, "vebus_error": 0, "vebus_temperature_alarm": 0, "vebus_low_battery_alarm": 0, "vebus_overload_alarm": 0, "vebus_temperatur_sensor_alarm": 0, "vebus_voltage_sensor_alarm": 0, "vebus_battery_charge_allowed": false, "vebus_battery_discharge_allowed": false, "vebus_bms_expected": false, "vebus_ms_error": 0.0, "vebus_battery_temperature": 0.0, "vebus_phase_rotation_warning": 0, "vebus_gridLost_alarm": 0, "vebus_sustain_active": 0.0, "vebus_energy_acIn1_to_acOut": 1.7502217819417e-44, "vebus_energy_acIn1_to_battery": 1.85391786830173e-44, "vebus_energy_acOut_toAcIn1": 0.0, "vebus_energy_battery_to_acIn1": 0.0, "vebus_energy_acIn2_to_acOut": 0.0, "vebus_energy_acIn2_to_battery": 0.0, "vebus_energy_acOut_to_acIn2": 0.0, "vebus_energy_battery_to_acIn2": 0.0, "vebus_energy_battery_to_acOut": 1.21660732672681e-43, "vebus_energy_acOut_to_battery": 8.12753109308394e-46, "vebus_low_cell_voltage_imminent": 0, "vebus_charge_state": 1},"fresh_water_tank": {"fill_ratio": 30.6405830383301},"grey_water_tank": {"fill_ratio": 40.8215599060059},"black_water_tank": {"fill_ratio": 0.0},"technical_water_tank": {"fill_ratio": 19.4830169677734},"water_treatment": {"ph": 0.0, "electrical_conductivity": 0.0},"water_maker": {"status": 0, "feed_pressure": 0.0, "membrane_pressure": 0.0, "production_flow": 0.0, "cumulative_operation_time": 0.0, "salinity": 0.0, "time_to_service": 0.0, "total_production": 0.0, "current_production": 0.0, "tank_empty": false, "last_error_id": 0.0, "last_warning_id": 0.0, "current_error_id": 0.0, "current_warning_id": 0.0},"workshop_temperature_sensor": {"humidity": 0.0, "temperature": 0.0},"waste_pressure_sensor": {"pressure": 1.34765625},"pipes_pressure_sensor": {"pressure": 1.265625},"pcm_yazaki_pressure_sensor": {"pressure": 3.88671875e-1},"technical_water_regulator": {"status": 0, "position": 0.0},"water_filter_bypass_valve": {"status": 0, "position": 0.0},"heat_pipes_flow_sensor": {"status": 4096, "flow": 0.0, "temperature": 56.38, "glycol_concentration": 40.6, "total_volume": 1.9},"pcm_discharge_flow_sensor": {"status": 0, "flow": 0.0, "temperature": 34.09, "glycol_concentration": 0.0, "total_volume": 11.85},"hot_storage_flow_sensor": {"status": 0, "flow": 0.0, "temperature": 0.0, "glycol_concentration": 0.0, "total_volume": 0.0},"yazaki_hot_flow_sensor": {"status": 0, "flow": 0.0, "temperature": 35.18, "glycol_concentration": 0.0, "total_volume": 0.0},"waste_flow_sensor": {"status": 0, "flow": 0.0, "temperature": 29.68, "glycol_concentration": 0.0, "total_volume": 1024.55},"chilled_flow_sensor": {"status": 0, "flow": 0.0, "temperature": 0.0, "glycol_concentration": 0.0, "total_volume": 0.0},"cooling_demand_flow_sensor": {"status": 0, "flow": 0.0, "temperature": 22.15, "glycol_concentration": 0.0, "total_volume": 8.15},"heat_dump_flow_sensor": {"status": 0, "flow": 0.0, "temperature": 0.0, "glycol_concentration": 0.0, "total_volume": 0.0},"domestic_hot_water_flow_sensor": {"status": 0, "flow": 0.0, "temperature": 0.0, "glycol_concentration": 0.0, "total_volume": 0.0},"fresh_to_kitchen_flow_sensor": {"status": 0, "flow": 0.0, "temperature": 33.29, "glycol_concentration": 0.0, "total_volume": 1.4e-1},"technical_to_sanitary_flow_sensor": {"status": 0, "flow": 0.0, "temperature": 28.43, "glycol_concentration": 3.0e-2, "total_volume": 1.8e-1},"technical_to_wash_off_flow_sensor": {"status": 128, "flow": 0.0, "temperature": 32.09, "glycol_concentration": 2.0e-1, "total_volume": 2.0e-1},"fresh_to_technical_flow_sensor": {"status": 0, "flow": 0.0, "temperature": 29.99, "glycol_concentration": 0.0, "total_volume": 3.7e-1},"treated_water_flow_sensor": {"status": 0, "flow": 0.0, "temperature": 33.27, "glycol_concentration": 0.0, "total_volume": 2.0e-2},"rh33_pcm_discharge": {"hot_temperature": 57.592414855957, "hot_temperature_status": 0, "cold_temperature": 34.0540161132812, "cold_temperature_status": 0, "delta_temperature": 23.5383987426758, "delta_temperature_status": 0},"rh33_preheat": {"hot_temperature": 32.7987632751465, "hot_temperature_status": 0, "cold_temperature": 32.4595985412598, "cold_temperature_status": 0, "delta_temperature": 3.39164733886719e-1, "delta_temperature_status": 0},"rh33_domestic_hot_water": {"hot_temperature": 32.5786514282227, "hot_temperature_status": 0, "cold_temperature": 32.2877464294434, "cold_temperature_status": 0, "delta_temperature": 2.90904998779297e-1, "delta_temperature_status": 0},"rh33_heat_pipes": {"hot_temperature": 57.9789848327637, "hot_temperature_status": 0, "cold_temperature": 54.5576782226562, "cold_temperature_status": 0, "delta_temperature": 3.42130661010742, "delta_temperature_status": 0},"rh33_hot_storage": {"hot_temperature": 56.6562423706055, "hot_temperature_status": 0, "cold_temperature": 57.002368927002, "cold_temperature_status": 0, "delta_temperature": -3.46126556396484e-1, "delta_temperature_status": 0},"rh33_yazaki_hot": {"hot_temperature": 34.9690895080566, "hot_temperature_status": 0, "cold_temperature": 34.5225143432617, "cold_temperature_status": 0, "delta_temperature": 4.46575164794922e-1, "delta_temperature_status": 0},"rh33_waste": {"hot_temperature": 30.127555847168, "hot_temperature_status": 0, "cold_temperature": 30.0872974395752, "cold_temperature_status": 0, "delta_temperature": 4.02584075927734e-2, "delta_temperature_status": 0},"rh33_chill": {"hot_temperature": 0.0, "hot_temperature_status": 0, "cold_temperature": 0.0, "cold_temperature_status": 0, "delta_temperature": 0.0, "delta_temperature_status": 0},"rh33_heat_dump": {"hot_temperature": 33.2955513000488, "hot_temperature_status": 0, "cold_temperature": 30.0144672393799, "cold_temperature_status": 0, "delta_temperature": 3.28108406066895, "delta_temperature_status": 0},"rh33_cooling_demand": {"hot_temperature": 22.6321620941162, "hot_temperature_status": 0, "cold_temperature": 20.6212692260742, "cold_temperature_status": 0, "delta_temperature": 2.01089286804199, "delta_temperature_status": 0},"outboard_temperature_sensor": {"temperature": 30.0},"outboard_pressure_sensor": {"pressure": 0.0},"power_hub_fancoil": {"ambient_temperature": 0.0, "mode": 0, "fan_speed_mode": 0, "operating_mode_water_temperature": 0.0, "battery_water_temperature": 0.0, "setpoint": 0.0},"kitchen_fancoil": {"ambient_temperature": 26.0, "mode": 0, "fan_speed_mode": 0, "operating_mode_water_temperature": 27.0, "battery_water_temperature": 0.0, "setpoint": 24.0},"sanitary_fancoil": {"ambient_temperature": 30.0, "mode": 0, "fan_speed_mode": 0, "operating_mode_water_temperature": 31.0, "battery_water_temperature": 0.0, "setpoint": 24.0},"simulator_fancoil": {"ambient_temperature": 27.0, "mode": 0, "fan_speed_mode": 0, "operating_mode_water_temperature": 30.0, "battery_water_temperature": 0.0, "setpoint": 24.0},"office_1_fancoil": {"ambient_temperature": 27.0, "mode": 0, "fan_speed_mode": 0, "operating_mode_water_temperature": 29.0, "battery_water_temperature": 0.0, "setpoint": 24.0},"office_2_fancoil": {"ambient_temperature": 27.0, "mode": 0, "fan_speed_mode": 0, "operating_mode_water_temperature": 34.0, "battery_water_temperature": 0.0, "setpoint": 24.0},"pv_1_temperature_sensor": {"humidity": 0.0, "temperature": 0.0},"pv_2_temperature_sensor": {"humidity": 0.0, "temperature": 0.0}}"""
@@ -0,0 +1,79 @@
+import csv
+
+from pytest import approx, raises
+
+from energy_box_control.power_hub.sweep import (
+    Scenario,
+    SweepConfig,
+    combine,
+    grid,
+    random_sample,
+    run_scenario,
+    run_sweep,
+    scenario_control_state,
+    scenario_power_hub,
+)
+
+
+def test_scenarios():
+    scenarios = combine(
+        grid({"setpoints.pcm_min_temperature": [85, 90], "pcm.latent_heat": [1e7]}),
+        random_sample({"schedules.global_irradiance": (0, 1000)}, 3, seed=1),
+    )
+
+    assert len(scenarios) == 6
+    assert len({scenario.id for scenario in scenarios}) == 6
+    assert all(
+        0 <= scenario.parameters["schedules.global_irradiance"] <= 1000
+        for scenario in scenarios
+    )
+    assert random_sample({"a.b": (0, 1)}, 3, seed=1) == random_sample(
+        {"a.b": (0, 1)}, 3, seed=1
+    )
+    assert combine() == [Scenario({})]
+
+
+def test_scenario_parameters():
+    scenario = Scenario(
+        {
+            "setpoints.pcm_min_temperature": 85,
+            "schedules.global_irradiance": 500,
+            "pcm.latent_heat": 1e7,
+        }
+    )
+    power_hub = scenario_power_hub(scenario, SweepConfig(1))
+
+    assert power_hub.pcm.latent_heat == 1e7
+    assert power_hub.schedules.global_irradiance.at(None) == 500  # type: ignore
+    assert scenario_control_state(scenario).setpoints.pcm_min_temperature == 85
+    with raises(ValueError, match="unknown schedules"):
+        scenario_power_hub(Scenario({"schedules.sunshine": 1}), SweepConfig(1))
+
+
+def test_run_scenario():
+    row = run_scenario(Scenario({"pcm.latent_heat": 1e7}), SweepConfig(20))
+
+    assert row["steps"] == 20
+    assert row["error"] == ""
+    assert row["battery_soc_min"] == approx(1)
+
+
+def test_run_sweep_resumes(tmp_path):
+    results = tmp_path / "results.csv"
+    scenarios = grid({"setpoints.pcm_min_temperature": [85, 88, 90]})
+    config = SweepConfig(5)
+
+    assert len(run_sweep(scenarios, config, results, workers=2)) == 3
+    assert run_sweep(scenarios, config, results, workers=2) == []
+
+    # an interrupted run leaves a partially written row
+    lines = results.read_text().splitlines(keepends=True)
+    results.write_text("".join(lines[:-1]) + lines[-1][:20])
+    rerun = run_sweep(scenarios, config, results, workers=2)
+
+    assert len(rerun) == 1
+    with open(results, newline="") as file:
+        rows = list(csv.DictReader(file))
+    assert sorted(row["scenario"] for row in rows) == sorted(
+        scenario.id for scenario in scenarios
+    )
@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import json
+from time import perf_counter
+from typing import Any, AsyncIterator
+from unittest.mock import AsyncMock
+
+from pytest import fixture
+
+from energy_box_control import simulation
+from energy_box_control.config import CONFIG
+from energy_box_control.monitoring.monitoring import Notifier
+from energy_box_control.power_hub.control.control import control_to_json, no_control
+from energy_box_control.power_hub.network import PowerHub, PowerHubSchedules
+from energy_box_control.power_hub_control import (
+    CONTROL_VALUES_TOPIC,
+    SENSOR_VALUES_TOPIC,
+)
+from energy_box_control.simulation import SimulationResult
+from energy_box_control.time import datetime_to_ms
+
+
+@fixture
+def power_hub() -> PowerHub:
+    return PowerHub.power_hub(PowerHubSchedules.const_schedules())
+
+
+def test_step_simulates_received_control(power_hub):
+    mqtt_client = AsyncMock()
+    result = SimulationResult(power_hub, power_hub.simple_initial_state())
+    control_values: asyncio.Queue[bytes] = asyncio.Queue()
+    control_values.put_nowait(
+        control_to_json(power_hub, no_control(power_hub)).encode()
+    )
+
+    stepped = asyncio.run(
+        result.step(mqtt_client, Notifier(), power_hub, control_values)
+    )
+
+    assert stepped.state.time.step == result.state.time.step + 1
+    assert mqtt_client.publish.call_args.args[0] == SENSOR_VALUES_TOPIC
+
+
+def test_step_keeps_state_without_control(power_hub, monkeypatch):
+    monkeypatch.setattr(simulation, "CONTROL_TIMEOUT", 0.01)
+    mqtt_client = AsyncMock()
+    result = SimulationResult(power_hub, power_hub.simple_initial_state())
+
+    stepped = asyncio.run(
+        result.step(mqtt_client, Notifier(), power_hub, asyncio.Queue())
+    )
+
+    assert stepped.state.time.step == result.state.time.step
+    mqtt_client.publish.assert_called_once()
+
+
+class _Topic:
+    def __init__(self, topic: str):
+        self.topic = topic
+
+    def matches(self, topic: str) -> bool:
+        return self.topic == topic
+
+
+class _Message:
+    def __init__(self, topic: str, payload: str | bytes):
+        self.topic = _Topic(topic)
+        self.payload = payload.encode() if isinstance(payload, str) else payload
+
+
+class LoopbackClient:
+    """Answers every sensor values message with control values, like the control app would"""
+
+    def __init__(self, power_hub: PowerHub):
+        self.control = control_to_json(power_hub, no_control(power_hub))
+        self.sensor_values: list[dict[str, Any]] = []
+        self._messages: asyncio.Queue[_Message] = asyncio.Queue()
+
+    async def __aenter__(self) -> "LoopbackClient":
+        return self
+
+    async def __aexit__(self, *_: Any):
+        pass
+
+    async def subscribe(self, *_: Any, **__: Any):
+        pass
+
+    async def publish(self, topic: str, payload: str | bytes, qos: int = 0):
+        if topic == SENSOR_VALUES_TOPIC:
+            self.sensor_values.append(json.loads(payload))
+            self._messages.put_nowait(_Message(CONTROL_VALUES_TOPIC, self.control))
+
+    @property
+    async def messages(self) -> AsyncIterator[_Message]:
+        while True:
+            yield await self._messages.get()
+
+
+def test_accelerated_run_stamps_simulated_time(power_hub, monkeypatch):
+    client = LoopbackClient(power_hub)
+    monkeypatch.setattr(simulation, "get_mqtt_client", lambda _: client)
+    start = datetime(2017, 6, 1, tzinfo=timezone.utc)
+
+    began = perf_counter()
+    asyncio.run(simulation.run(10, speed=100, start=start))
+    duration = perf_counter() - began
+
+    times = [values["time"] for values in client.sensor_values]
+    assert len(times) == 11
+    assert times[0] == datetime_to_ms(start + timedelta(seconds=1))
+    assert [later - earlier for earlier, later in zip(times, times[1:])] == [1000] * 10
+    assert duration < 2
+
+
+def test_restored_run_continues_at_checkpoint(power_hub, monkeypatch, tmp_path):
+    monkeypatch.setattr(CONFIG, "simulation_checkpoint_directory", str(tmp_path))
+    start = datetime(2017, 6, 1, tzinfo=timezone.utc)
+    first = LoopbackClient(power_hub)
+    monkeypatch.setattr(simulation, "get_mqtt_client", lambda _: first)
+    asyncio.run(simulation.run(10, speed=100, start=start))
+
+    resumed = LoopbackClient(power_hub)
+    monkeypatch.setattr(simulation, "get_mqtt_client", lambda _: resumed)
+    asyncio.run(simulation.run(15, speed=100, start=start))
+
+    assert resumed.sensor_values[0]["time"] == first.sensor_values[-1]["time"]
+    assert resumed.sensor_values[1]["time"] == first.sensor_values[-1]["time"] + 1000
@@ -0,0 +1,128 @@
+from datetime import datetime, timezone
+
+from pytest import raises
+
+from energy_box_control.checkpoint import (
+    CheckpointError,
+    CheckpointStore,
+    decode_checkpoint,
+    encode_checkpoint,
+)
+from energy_box_control.power_hub.control.control import (
+    control_from_json,
+    control_power_hub,
+    control_to_json,
+    initial_control_all_off,
+)
+from energy_box_control.power_hub.control.state import initial_control_state
+from tests.test_ensemble import power_hub
+
+
+def simulated_power_hub_state(steps: int):
+    hub = power_hub(800, 30)
+    state = hub.simple_initial_state(datetime(2024, 6, 1, tzinfo=timezone.utc))
+    control_state, controls = initial_control_state(), initial_control_all_off(hub)
+    for _ in range(steps):
+        state = hub.simulate(state, controls)
+        control_state, controls = control_power_hub(
+            hub,
+            control_state,
+            hub.sensors_from_state(state),
+            state.time.timestamp,
+            survival_mode=False,
+        )
+    return hub, state, controls
+
+
+def test_checkpoint_round_trip():
+    hub, state, controls = simulated_power_hub_state(20)
+    controls = control_to_json(hub, controls)
+    data = encode_checkpoint(hub, state)
+
+    restored_hub = power_hub(800, 30)
+    restored = decode_checkpoint(
+        restored_hub, restored_hub.simple_initial_state(datetime.now()), data
+    )
+
+    assert restored.time == state.time
+    assert encode_checkpoint(restored_hub, restored) == data
+    assert encode_checkpoint(
+        restored_hub,
+        restored_hub.simulate(restored, control_from_json(restored_hub, controls)),
+    ) == encode_checkpoint(hub, hub.simulate(state, control_from_json(hub, controls)))
+
+
+def test_checkpoint_rejects_corruption():
+    hub, state, _ = simulated_power_hub_state(1)
+    data = encode_checkpoint(hub, state)
+    template = hub.simple_initial_state()
+
+    with raises(CheckpointError, match="checksum"):
+        decode_checkpoint(hub, template, data[:40] + b"\x00" + data[41:])
+    with raises(CheckpointError, match="truncated"):
+        decode_checkpoint(hub, template, data[:10])
+
+
+def test_checkpoint_rejects_other_feedback_signals():
+    hub, state, _ = simulated_power_hub_state(1)
+    (id, port), *_ = hub.execution_plan.feedback[0]
+    appliance = next(
+        planned.appliance
+        for planned in hub.execution_plan.appliances
+        if planned.appliance.id == id
+    )
+
+    with raises(CheckpointError, match="feedback signal"):
+        encode_checkpoint(hub, state.replace_signal(appliance, port, 20.0))
+
+
+def test_store_restores_newest_valid(tmp_path):
+    hub, state, _ = simulated_power_hub_state(5)
+    store = CheckpointStore(tmp_path, hub, keep=2)
+    template = hub.simple_initial_state(state.time.start)
+    assert store.restore(template) is None
+
+    store.save(state)
+    store.save(hub.simple_initial_state(state.time.start))
+    assert store.restore(template).time.step == state.time.step
+
+    (tmp_path / "999999999999999-0000.checkpoint").write_bytes(b"garbage")
+    assert store.restore(template).time.step == state.time.step
+
+    store.save(state)
+    assert len(store.checkpoints()) == 2
+
+
+def test_store_keeps_saves_of_the_same_step(tmp_path):
+    hub, state, _ = simulated_power_hub_state(5)
+    store = CheckpointStore(tmp_path, hub)
+
+    first, second = store.save(state), store.save(state)
+    assert first != second
+    assert store.checkpoints() == [second, first]
+
+
+def test_store_rebases_restored_time(tmp_path):
+    hub, state, _ = simulated_power_hub_state(5)
+    store = CheckpointStore(tmp_path, hub)
+    store.save(state)
+    now = datetime(2024, 7, 1, tzinfo=timezone.utc)
+
+    restored = store.restore(hub.simple_initial_state(now), rebase=True)
+
+    assert restored.time.step == state.time.step
+    assert restored.time.timestamp == now
+    assert restored.appliance(hub.pcm).get() == state.appliance(hub.pcm).get()
+
+
+def test_store_skips_checkpoint_of_other_start(tmp_path):
+    hub, state, _ = simulated_power_hub_state(5)
+    store = CheckpointStore(tmp_path, hub)
+    store.save(state)
+
+    assert (
+        store.restore(
+            hub.simple_initial_state(datetime(2024, 7, 1, tzinfo=timezone.utc))
+        )
+        is None
+    )
@@ -0,0 +1,130 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from pytest import fixture
+
+from energy_box_control.control.state_machines import (
+    Context,
+    Functions,
+    State,
+    StateMachine,
+)
+from energy_box_control.instrumentation import (
+    INSTRUMENTATION,
+    Histogram,
+    Instrumentation,
+    TransitionCount,
+    serve_metrics,
+)
+
+
+@fixture
+def instrumentation():
+    INSTRUMENTATION.enabled = True
+    yield INSTRUMENTATION
+    INSTRUMENTATION.enabled = False
+    INSTRUMENTATION.reset()
+
+
+def test_histogram_buckets():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.cumulative() == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(2.65)
+
+
+def test_disabled_instrumentation_records_nothing():
+    instrumentation = Instrumentation()
+    with instrumentation.stage("stage"):
+        pass
+    instrumentation.observe("stage", 1)
+    assert instrumentation.stages == {}
+
+
+def test_stage_times_block():
+    instrumentation = Instrumentation(enabled=True)
+    for _ in range(3):
+        with instrumentation.stage("stage"):
+            pass
+    assert instrumentation.stages["stage"].count == 3
+    assert instrumentation.to_dict()["stages"]["stage"]["count"] == 3
+
+
+def test_state_machine_counts_transitions(instrumentation):
+    class Modes(State):
+        A = "a"
+        B = "b"
+
+    Fn = Functions(int, int)
+    machine = StateMachine(
+        Modes,
+        {
+            (Modes.A, Modes.B): Fn.sensors(lambda sensors: sensors) > Fn.const(0),
+            (Modes.B, Modes.A): Fn.const_pred(True),
+        },
+    )
+    now = datetime(2024, 1, 1)
+    machine.run(Modes.A, Context(), 0, 0, now)
+    machine.run(Modes.A, Context(), 0, 1, now)
+    assert instrumentation.transitions == {
+        ("Modes", "A", "B"): TransitionCount(evaluated=2, fired=1)
+    }
+    assert (
+        'power_hub_transitions_fired_total{machine="Modes",from="A",to="B"} 1'
+        in instrumentation.to_prometheus()
+    )
+
+
+def test_prometheus_histogram():
+    instrumentation = Instrumentation(enabled=True, buckets=(0.5,))
+    instrumentation.observe("decode", 0.25)
+    assert instrumentation.to_prometheus().splitlines()[2:] == [
+        'power_hub_stage_seconds_bucket{stage="decode",le="0.5"} 1',
+        'power_hub_stage_seconds_bucket{stage="decode",le="+Inf"} 1',
+        'power_hub_stage_seconds_sum{stage="decode"} 0.25',
+        'power_hub_stage_seconds_count{stage="decode"} 1',
+        "# HELP power_hub_transitions_evaluated_total Evaluations of the predicate of a state machine transition",
+        "# TYPE power_hub_transitions_evaluated_total counter",
+        "# HELP power_hub_transitions_fired_total Transitions taken by a state machine",
+        "# TYPE power_hub_transitions_fired_total counter",
+        "# HELP power_hub_events_total Occurrences of an event in the control app",
+        "# TYPE power_hub_events_total counter",
+    ]
+
+
+def test_count_events():
+    instrumentation = Instrumentation(enabled=True)
+    instrumentation.count("dropped")
+    instrumentation.count("dropped", 2)
+    assert instrumentation.to_dict()["events"] == {"dropped": 3}
+    assert (
+        'power_hub_events_total{event="dropped"} 3' in instrumentation.to_prometheus()
+    )
+
+
+async def _get(port: int, path: str) -> bytes:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    response = await reader.read()
+    writer.close()
+    return response
+
+
+def test_serve_metrics():
+    instrumentation = Instrumentation(enabled=True)
+    instrumentation.observe("decode", 0.001)
+
+    async def scrape() -> tuple[bytes, bytes]:
+        server = await serve_metrics(instrumentation, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await _get(port, "/metrics"), await _get(port, "/other")
+
+    metrics, other = asyncio.run(scrape())
+    assert metrics.startswith(b"HTTP/1.1 200 OK")
+    assert b'power_hub_stage_seconds_count{stage="decode"} 1' in metrics
+    assert other.startswith(b"HTTP/1.1 404")
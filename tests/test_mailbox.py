@@ -0,0 +1,26 @@
+import asyncio
+
+from energy_box_control.mailbox import Mailbox
+
+
+def test_mailbox_keeps_latest_value_per_key():
+    mailbox: Mailbox[int] = Mailbox()
+    mailbox.put("a", 1)
+    mailbox.put("b", 2)
+    mailbox.put("a", 3)
+    assert len(mailbox) == 2
+    assert mailbox.replaced == 1
+    assert mailbox.take_nowait() == {"a": 3, "b": 2}
+    assert mailbox.take_nowait() == {}
+
+
+def test_mailbox_take_waits_for_value():
+    async def take_after_put() -> dict[str, int]:
+        mailbox: Mailbox[int] = Mailbox()
+        take = asyncio.create_task(mailbox.take())
+        await asyncio.sleep(0)
+        assert not take.done()
+        mailbox.put("a", 1)
+        return await take
+
+    assert asyncio.run(take_after_put()) == {"a": 1}
@@ -1,10 +1,12 @@
+from dataclasses import replace
 from datetime import datetime, timedelta
-from typing import Self
-from pytest import approx
+from typing import Any, Self
+from pytest import approx, raises
 from energy_box_control.appliances.base import ThermalState
 from energy_box_control.network import (
     Network,
     NetworkConnections,
+    NetworkControl,
     NetworkFeedbacks,
     NetworkState,
 )
@@ -21,6 +23,7 @@ from energy_box_control.appliances import (
     ValveState,
 )
 from energy_box_control.time import ProcessTime
+from energy_box_control.networks import BoilerNetwork, BoilerSensors, ControlState
 from energy_box_control.schedules import ConstSchedule
 
 
@@ -117,3 +120,190 @@ def test_circular_network():
         == 1100
     )
     assert state.appliance(circle.boiler).get().temperature == 1100
+
+
+def reference_simulate(
+    network: Network[Any], state: NetworkState[Any], controls: NetworkControl[Any]
+) -> NetworkState[Any]:
+    """Direct interpretation of the execution order and port mappings, to check the compiled execution plan against"""
+    port_inputs: dict[Any, dict[Any, Any]] = {}
+    signals: dict[Any, Any] = {}
+    for (from_app, from_port), (
+        to_app,
+        to_port,
+    ) in network._feedback_port_mapping.items():
+        signal = state.connection(from_app, from_port)
+        port_inputs.setdefault(to_app, {})[to_port] = signal
+        signals[(to_app.id, to_port)] = signal
+
+    appliance_states = {}
+    for appliance in network._execution_order:
+        new_state, outputs = appliance.simulate(
+            port_inputs.get(appliance, {}),
+            state.appliance(appliance).get(),
+            controls.appliance(appliance).get(),
+            state.time,
+        )
+        appliance_states[appliance.id] = new_state
+        for port, signal in outputs.items():
+            signals[(appliance.id, port)] = signal
+            if (to := network._port_mapping.get((appliance, port))) is not None:
+                to_app, to_port = to
+                port_inputs.setdefault(to_app, {})[to_port] = signal
+                signals[(to_app.id, to_port)] = signal
+
+    return NetworkState(
+        replace(state.time, step=state.time.step + 1), appliance_states, signals
+    )
+
+
+def assert_same_state(state: NetworkState[Any], expected: NetworkState[Any]):
+    assert state.time.step == expected.time.step
+    assert state.get_appliances_states() == expected.get_appliances_states()
+    assert state.get_signal() == expected.get_signal()
+
+
+def test_execution_plan_matches_reference():
+    network = BoilerNetwork(
+        Source(1, ConstSchedule(30)),
+        Boiler(10, 1, 0, 1, 1, ConstSchedule(20)),
+        BoilerState(50),
+    )
+    state = network.initial_state()
+    for control in [network.heater_on(), network.heater_off()] * 5:
+        next_state = network.simulate(state, control)
+        assert_same_state(next_state, reference_simulate(network, state, control))
+        state = next_state
+
+
+def test_execution_plan_rejects_double_input():
+    class DoubleNetwork(Network[None]):
+        def __init__(self):
+            self.first = Source(1, ConstSchedule(1))
+            self.second = Source(1, ConstSchedule(1))
+            self.boiler = Boiler(1, 0, 0, 1, 1, ConstSchedule(20))
+            super().__init__()
+
+        def connections(self) -> NetworkConnections[Self]:
+            return (
+                self.connect(self.first)
+                .at(SourcePort.OUTPUT)
+                .to(self.boiler)
+                .at(BoilerPort.FILL_IN)
+                .connect(self.second)
+                .at(SourcePort.OUTPUT)
+                .to(self.boiler)
+                .at(BoilerPort.FILL_IN)
+                .build()
+            )
+
+        def sensors_from_state(self, state: NetworkState[Self]) -> None:
+            return None
+
+    network = DoubleNetwork()
+    state = (
+        network.define_state(network.first)
+        .value(SourceState())
+        .define_state(network.second)
+        .value(SourceState())
+        .define_state(network.boiler)
+        .value(BoilerState(20))
+        .build(ProcessTime(timedelta(seconds=1), 0, datetime.now()))
+    )
+    with raises(Exception, match="already has an input"):
+        network.simulate(
+            state, network.control(network.boiler).value(BoilerControl(False)).build()
+        )
+
+
+def test_run_matches_simulate():
+    network = BoilerNetwork(
+        Source(1, ConstSchedule(30)),
+        Boiler(10, 1, 0, 1, 1, ConstSchedule(20)),
+        BoilerState(50),
+    )
+    control = network.heater_on()
+    expected = network.initial_state()
+    for _ in range(10):
+        expected = network.simulate(expected, control)
+
+    assert_same_state(network.run(network.initial_state(), control, 10), expected)
+
+
+def test_run_control_fn_and_recorder():
+    network = BoilerNetwork(
+        Source(1, ConstSchedule(30)),
+        Boiler(10, 1, 0, 1, 1, ConstSchedule(20)),
+        BoilerState(50),
+    )
+
+    def control_fn(sensors: BoilerSensors) -> NetworkControl[BoilerNetwork]:
+        return network.regulate(ControlState(45), sensors)[1]
+
+    expected_states = []
+    expected = network.initial_state()
+    control = network.heater_off()
+    for _ in range(20):
+        expected = network.simulate(expected, control)
+        expected_states.append(expected)
+        control = control_fn(network.sensors_from_state(expected))
+
+    class ListRecorder:
+        def __init__(self):
+            self.states: list[NetworkState[BoilerNetwork]] = []
+
+        def record(self, state: NetworkState[BoilerNetwork]):
+            self.states.append(state)
+
+    recorder = ListRecorder()
+    state = network.run(
+        network.initial_state(),
+        network.heater_off(),
+        20,
+        control_fn=control_fn,
+        recorder=recorder,
+        record_every=5,
+    )
+
+    assert_same_state(state, expected)
+    assert [recorded.time.step for recorded in recorder.states] == [5, 10, 15, 20]
+    for recorded in recorder.states:
+        assert_same_state(recorded, expected_states[recorded.time.step - 1])
+
+
+def test_state_branches_and_diff():
+    network = BoilerNetwork(
+        Source(1, ConstSchedule(30)),
+        Boiler(10, 1, 0, 1, 1, ConstSchedule(20)),
+        BoilerState(50),
+    )
+    state = network.simulate(network.initial_state(), network.heater_on())
+    branches = [
+        state.replace_state(network.boiler, BoilerState(temperature))
+        for temperature in range(20, 80, 10)
+    ]
+
+    for temperature, branch in zip(range(20, 80, 10), branches):
+        diff = state.diff(branch)
+        assert diff.appliance_states == {
+            network.boiler.id: (
+                state.appliance(network.boiler).get(),
+                BoilerState(temperature),
+            )
+        }
+        assert not diff.signals
+        assert_same_state(
+            network.simulate(branch, network.heater_off()),
+            reference_simulate(network, branch, network.heater_off()),
+        )
+
+    signal = ThermalState(3, 40)
+    branch = branches[0].replace_signal(network.source, SourcePort.OUTPUT, signal)
+    assert branch.connection(network.source, SourcePort.OUTPUT) == signal
+    assert branches[0].diff(branch).signals == {
+        (network.source.id, SourcePort.OUTPUT): (
+            state.connection(network.source, SourcePort.OUTPUT),
+            signal,
+        )
+    }
+    assert not branch.diff(branch)
@@ -0,0 +1,58 @@
+from hypothesis import given
+from hypothesis.strategies import dictionaries, integers, lists, tuples
+
+from energy_box_control.persistent_map import MAX_DEPTH, PersistentMap
+
+entries = dictionaries(integers(0, 20), integers(0, 5))
+updates = lists(tuples(integers(0, 20), integers(0, 5)), max_size=3 * MAX_DEPTH)
+
+
+@given(entries, updates)
+def test_persistent_map_behaves_like_dict(base: dict[int, int], changes):
+    model = dict(base)
+    persistent = PersistentMap(base)
+    for key, value in changes:
+        model[key] = value
+        persistent = persistent.set(key, value)
+        assert persistent == model
+        assert len(persistent) == len(model)
+        assert all(key in persistent for key in model)
+
+
+@given(entries, updates, updates)
+def test_changed_keys_matches_dict_diff(base: dict[int, int], left, right):
+    left_map = right_map = PersistentMap(base)
+    for key, value in left:
+        left_map = left_map.set(key, value)
+    for key, value in right:
+        right_map = right_map.set(key, value)
+
+    left_dict, right_dict = dict(left_map), dict(right_map)
+    expected = {
+        key
+        for key in left_dict.keys() | right_dict.keys()
+        if left_dict.get(key, None) != right_dict.get(key, None)
+        or (key in left_dict) != (key in right_dict)
+    }
+    assert left_map.changed_keys(right_map) == expected
+    assert left_map.changed_keys(right_dict) == expected
+
+
+def test_branches_share_base():
+    base = PersistentMap({"a": 1, "b": 2})
+    first = base.set("a", 3)
+    second = base.set("b", 4)
+
+    assert base == {"a": 1, "b": 2}
+    assert first == {"a": 3, "b": 2}
+    assert second == {"a": 1, "b": 4}
+    assert first.changed_keys(second) == {"a", "b"}
+    assert first.changed_keys(base.set("a", 3)) == set()
+
+
+def test_deep_chains_flatten():
+    persistent = PersistentMap[int, int]()
+    for value in range(10 * MAX_DEPTH):
+        persistent = persistent.set(value % 5, value)
+        assert persistent._depth <= MAX_DEPTH
+    assert persistent == {key: 10 * MAX_DEPTH - 5 + key for key in range(5)}
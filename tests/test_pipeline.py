@@ -0,0 +1,50 @@
+import asyncio
+import logging
+
+from energy_box_control.pipeline import PipelineStage
+
+logger = logging.getLogger(__name__)
+
+
+def test_offer_drops_oldest_item_when_full():
+    stage: PipelineStage[int] = PipelineStage("stage", logger, maxsize=2)
+    for item in range(4):
+        stage.offer(item)
+    assert len(stage) == 2
+    assert stage.dropped == 2
+
+    handled: list[int] = []
+
+    async def handle(item: int):
+        handled.append(item)
+
+    async def run_until_empty():
+        task = asyncio.create_task(stage.run(handle))
+        while len(stage):
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(run_until_empty())
+    assert handled == [2, 3]
+
+
+def test_stage_continues_after_failing_item():
+    stage: PipelineStage[int] = PipelineStage("stage", logger, maxsize=2)
+    handled: list[int] = []
+
+    async def handle(item: int):
+        if item == 0:
+            raise ValueError("failing item")
+        handled.append(item)
+
+    async def run():
+        task = asyncio.create_task(stage.run(handle))
+        stage.offer(0)
+        stage.offer(1)
+        while not handled:
+            await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(run())
+    assert handled == [1]
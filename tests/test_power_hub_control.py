@@ -0,0 +1,190 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import json
+from time import perf_counter, sleep
+from typing import Any, AsyncIterator
+from unittest.mock import AsyncMock, Mock
+
+from pytest import fixture
+
+from energy_box_control.config import CONFIG
+from energy_box_control.power_hub.control.control import no_control
+from energy_box_control.power_hub.control.state import initial_setpoints
+import energy_box_control.power_hub_control as power_hub_control
+from energy_box_control.power_hub_control import (
+    CONTROL_VALUES_TOPIC,
+    ENRICHED_SENSOR_VALUES_TOPIC,
+    SENSOR_VALUES_TOPIC,
+    SETPOINTS_TOPIC,
+    SURVIVAL_MODE_TOPIC,
+    PowerHubControl,
+)
+from energy_box_control.sensors import sensors_to_json
+
+
+@fixture
+def control() -> PowerHubControl:
+    return PowerHubControl()
+
+
+def sensor_values(control: PowerHubControl, time: datetime) -> bytes:
+    power_hub = control.power_hub
+    sensors = power_hub.sensors_from_state(
+        power_hub.simulate(power_hub.simple_initial_state(time), no_control(power_hub))
+    )
+    return sensors_to_json(sensors).encode()
+
+
+def published_topics(mqtt_client: AsyncMock) -> list[str]:
+    return [call.args[0] for call in mqtt_client.publish.call_args_list]
+
+
+def test_applies_setpoints_and_survival_before_control(control):
+    mqtt_client = AsyncMock()
+    setpoints = initial_setpoints().model_copy(update={"low_battery": 0.42})
+    asyncio.run(
+        control.handle_messages(
+            mqtt_client,
+            {
+                SENSOR_VALUES_TOPIC: sensor_values(control, datetime.now(timezone.utc)),
+                SETPOINTS_TOPIC: setpoints.model_dump_json().encode(),
+                SURVIVAL_MODE_TOPIC: json.dumps({"survival": True}).encode(),
+            },
+        )
+    )
+    assert control.control_state.setpoints.low_battery == 0.42
+    assert control.survival_mode
+    assert CONTROL_VALUES_TOPIC in published_topics(mqtt_client)
+
+
+def test_drops_stale_sensor_values(control, monkeypatch):
+    monkeypatch.setattr(CONFIG, "sensor_values_max_age", 5)
+    mqtt_client = AsyncMock()
+    asyncio.run(
+        control.handle_messages(
+            mqtt_client,
+            {
+                SENSOR_VALUES_TOPIC: sensor_values(
+                    control, datetime.now(timezone.utc) - timedelta(seconds=10)
+                )
+            },
+        )
+    )
+    assert control.stale_sensor_values == 1
+    assert control.power_hub_sensors is None
+    assert published_topics(mqtt_client) == []
+
+
+def test_keeps_simulated_sensor_values(control, monkeypatch):
+    monkeypatch.setattr(CONFIG, "sensor_values_max_age", 5)
+    monkeypatch.setattr(
+        CONFIG, "simulation_start", datetime(2017, 6, 1, tzinfo=timezone.utc)
+    )
+    mqtt_client = AsyncMock()
+    asyncio.run(
+        control.handle_messages(
+            mqtt_client,
+            {
+                SENSOR_VALUES_TOPIC: sensor_values(
+                    control, datetime(2017, 6, 1, 12, tzinfo=timezone.utc)
+                )
+            },
+        )
+    )
+    assert control.stale_sensor_values == 0
+    assert CONTROL_VALUES_TOPIC in published_topics(mqtt_client)
+
+
+def test_slow_notifications_dont_delay_control(control):
+    mqtt_client = AsyncMock()
+    control.last_events = None  # sends the events of the first check
+    control.notifier.send_events = lambda events: sleep(1)
+    now = datetime.now(timezone.utc)
+
+    async def control_twice() -> list[float]:
+        monitoring = asyncio.create_task(
+            control.monitoring.run(control.check_sensor_values)
+        )
+        durations = []
+        for step in range(2):
+            start = perf_counter()
+            await control.handle_messages(
+                mqtt_client,
+                {
+                    SENSOR_VALUES_TOPIC: sensor_values(
+                        control, now + timedelta(seconds=step)
+                    )
+                },
+            )
+            durations.append(perf_counter() - start)
+            await asyncio.sleep(0.1)
+        monitoring.cancel()
+        return durations
+
+    assert max(asyncio.run(control_twice())) < 0.5
+    assert published_topics(mqtt_client).count(CONTROL_VALUES_TOPIC) == 2
+
+
+def test_events_kept_alive_every_minute(control, monkeypatch):
+    sent = []
+    control.notifier.send_events = sent.append
+    start = now = control.events_sent_at
+    monkeypatch.setattr(power_hub_control, "monotonic", lambda: now)
+    power_hub = control.power_hub
+    sensors = power_hub.sensors_from_state(
+        power_hub.simulate(power_hub.simple_initial_state(), no_control(power_hub))
+    )
+    control.run_checks(sensors, no_control(power_hub))
+    events = control.last_events
+    sent.clear()
+
+    for seconds in (30, 59, 61, 90, 122):
+        now = start + seconds
+        control.run_checks(sensors, no_control(power_hub))
+    assert sent == [events, events]
+
+
+class _Client:
+    """Delivers the given messages, taking publish_delay to publish"""
+
+    def __init__(self, messages: list[Any], publish_delay: float = 0):
+        self._messages = messages
+        self.publish_delay = publish_delay
+        self.published: list[str] = []
+        self.subscribe = AsyncMock()
+
+    async def __aenter__(self) -> "_Client":
+        return self
+
+    async def __aexit__(self, *_: Any):
+        pass
+
+    async def publish(self, topic: str, *_: Any, **__: Any):
+        await asyncio.sleep(self.publish_delay)
+        self.published.append(topic)
+
+    @property
+    async def messages(self) -> AsyncIterator[Any]:
+        for message in self._messages:
+            yield message
+        await asyncio.Event().wait()
+
+
+def test_slow_enriched_publishes_dont_delay_control(control, monkeypatch):
+    message = Mock(payload=sensor_values(control, datetime.now(timezone.utc)))
+    message.topic.matches = lambda topic: topic == SENSOR_VALUES_TOPIC
+    clients = [_Client([message]), _Client([], publish_delay=10)]
+    monkeypatch.setattr(power_hub_control, "get_mqtt_client", lambda _: clients.pop(0))
+    monkeypatch.setattr(power_hub_control, "publish_initial_value", AsyncMock())
+    mqtt_client, background_client = clients
+
+    async def run_briefly():
+        try:
+            await asyncio.wait_for(control.run(), 0.5)
+        except TimeoutError:
+            pass
+
+    asyncio.run(run_briefly())
+    assert CONTROL_VALUES_TOPIC in mqtt_client.published
+    assert ENRICHED_SENSOR_VALUES_TOPIC not in mqtt_client.published
+    assert background_client.published == []
@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+from math import isnan
+
+from numpy import memmap
+from pytest import approx
+
+from energy_box_control.appliances import Boiler, BoilerPort, BoilerState, Source
+from energy_box_control.networks import BoilerNetwork
+from energy_box_control.power_hub.control.control import no_control
+from energy_box_control.recorder import Trace, TraceRecorder
+from energy_box_control.schedules import ConstSchedule
+from tests.test_ensemble import power_hub
+
+
+def test_recorder_chunks(tmp_path):
+    network = BoilerNetwork(
+        Source(1, ConstSchedule(30)),
+        Boiler(10, 1, 0, 1, 1, ConstSchedule(20)),
+        BoilerState(50),
+    )
+    state = network.initial_state()
+    temperatures = []
+    with TraceRecorder(network, tmp_path, chunk_size=10) as recorder:
+        for _ in range(25):
+            state = network.simulate(state, network.heater_on(), recorder=recorder)
+            temperatures.append(state.appliance(network.boiler).get().temperature)
+
+    trace = Trace(tmp_path)
+    assert len(trace) == 25
+    assert len(trace.chunks) == 3
+    assert list(trace.column("step")) == list(range(1, 26))
+    assert list(trace.column("boiler.temperature")) == approx(temperatures)
+    assert trace.column("boiler.heat_exchange_out.flow")[-1] == approx(
+        state.connection(network.boiler, BoilerPort.HEAT_EXCHANGE_OUT).flow
+    )
+    assert all(isnan(value) for value in trace.column("boiler.fill_out.flow"))
+    assert {
+        (column.appliance, column.port, column.field)
+        for column in trace.columns
+        if column.name == "boiler.heat_exchange_in.temperature"
+    } == {("boiler", "heat_exchange_in", "temperature")}
+
+
+def test_recorder_power_hub_dataframe(tmp_path):
+    hub = power_hub(800, 30)
+    state = hub.simple_initial_state(datetime.now(timezone.utc))
+    control = no_control(hub)
+    with TraceRecorder(hub, tmp_path) as recorder:
+        for _ in range(20):
+            state = hub.simulate(state, control, recorder=recorder)
+
+    trace = Trace(tmp_path)
+    frame = trace.to_dataframe(["step", "hot_reservoir.temperature"])
+    assert len(frame) == 20
+    assert frame["hot_reservoir.temperature"].iloc[-1] == approx(
+        state.appliance(hub.hot_reservoir).get().temperature
+    )
+    assert isinstance(trace.chunks[0], memmap)
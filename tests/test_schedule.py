@@ -1,9 +1,19 @@
+import random
 import re
 import pytest
-from datetime import datetime, timedelta
+from pytest import approx
+from datetime import datetime, timedelta, timezone
+from pandas import Series, DatetimeIndex  # type: ignore
 
 from energy_box_control.time import ProcessTime
-from energy_box_control.schedules import ConstSchedule, PeriodicSchedule, GivenSchedule
+from energy_box_control.schedules import (
+    ConstSchedule,
+    PeriodicSchedule,
+    GivenSchedule,
+    SampledSchedule,
+    TimestampedSchedule,
+    sampled_schedules,
+)
 
 
 def test_const_schedule():
@@ -97,3 +107,188 @@ def test_outside_give_schedule(given_schedule):
         ),
     ):
         given_schedule.at(sim_time)
+
+
+def test_sampled_schedule_matches_at(periodic_schedule, given_schedule):
+    start = datetime(2024, 4, 15)
+    step_size = timedelta(hours=1, minutes=7)
+    for schedule in [periodic_schedule, given_schedule, ConstSchedule(3)]:
+        sampled = SampledSchedule(schedule, start, step_size, chunk_size=10)
+        for step in range(5 * 24 * 60 // 67):
+            time = ProcessTime(step_size, step, start)
+            assert sampled.at(time) == schedule.at(time)
+
+
+def test_sampled_schedule_fills_chunk_of_step(periodic_schedule):
+    start = datetime(2024, 4, 15)
+    step_size = timedelta(hours=1)
+    sampled = SampledSchedule(
+        periodic_schedule, start, step_size, chunk_size=10, max_chunks=2
+    )
+
+    for step in (95, 5, 42):
+        time = ProcessTime(step_size, step, start)
+        assert sampled.at(time) == periodic_schedule.at(time)
+    assert list(sampled._chunks) == [0, 4]
+
+
+def test_sampled_schedule_linear(periodic_schedule, period_start):
+    sampled = SampledSchedule(
+        periodic_schedule, period_start, timedelta(hours=12), interpolation="linear"
+    )
+
+    assert [
+        sampled.at(ProcessTime(timedelta(hours=12), step, period_start))
+        for step in range(10)
+    ] == [1, 1.5, 2, 2.5, 3, 3.5, 4, 4.5, 5, 3]
+
+
+def test_sampled_schedule_rebased_start(periodic_schedule):
+    start = datetime(2024, 4, 15)
+    step_size = timedelta(hours=1)
+    sampled = SampledSchedule(periodic_schedule, start, step_size, chunk_size=10)
+
+    for time in (
+        ProcessTime(step_size, 30, start - 20 * step_size),
+        ProcessTime(step_size, 3, start + 5 * step_size),
+        ProcessTime(step_size, 3, start + timedelta(minutes=30)),
+    ):
+        assert sampled.at(time) == periodic_schedule.at(time)
+    assert list(sampled._chunks) == [1, 0]
+
+
+def test_sampled_schedule_other_times(given_schedule):
+    sampled = SampledSchedule(given_schedule, datetime(2024, 4, 15), timedelta(days=1))
+
+    assert sampled.at(ProcessTime(timedelta(hours=1), 50, datetime(2024, 4, 15))) == 3
+    with pytest.raises(ValueError, match="outside of given schedule"):
+        sampled.at(ProcessTime(timedelta(days=1), 6, datetime(2024, 4, 15)))
+
+
+def test_sampled_schedules_share_samples(periodic_schedule):
+    sampled = sampled_schedules(
+        {
+            "a": periodic_schedule,
+            "b": periodic_schedule,
+            "c": ConstSchedule(1),
+        },
+        datetime(2000, 1, 1),
+        timedelta(minutes=1),
+    )
+
+    assert sampled["a"] is sampled["b"]
+    assert isinstance(sampled["a"], SampledSchedule)
+    assert sampled["c"] == ConstSchedule(1)
+
+
+@pytest.fixture
+def timestamped_start():
+    return datetime(2024, 7, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def timestamped_schedule(timestamped_start):
+    # irregular timestamps with a gap between the second and third value
+    return TimestampedSchedule.from_datetimes(
+        [
+            timestamped_start + timedelta(seconds=seconds)
+            for seconds in [0, 10, 70, 75, 100]
+        ],
+        [1, 2, 4, 3, 5],
+    )
+
+
+def test_timestamped_schedule(timestamped_schedule, timestamped_start):
+    def at(seconds, schedule=timestamped_schedule):
+        return schedule.at(
+            ProcessTime(timedelta(seconds=1), seconds, timestamped_start)
+        )
+
+    assert [at(seconds) for seconds in [0, 9, 10, 69, 70, 99, 100]] == [
+        1,
+        1,
+        2,
+        2,
+        4,
+        3,
+        5,
+    ]
+    linear = TimestampedSchedule(
+        timestamped_schedule.origin,
+        timestamped_schedule.times,
+        timestamped_schedule.values,
+        "linear",
+    )
+    assert [at(seconds, linear) for seconds in [0, 5, 40, 72, 100]] == [
+        1,
+        1.5,
+        3,
+        approx(3.6),
+        5,
+    ]
+    for seconds in [-1, 101]:
+        with pytest.raises(ValueError, match="outside of timestamped schedule"):
+            at(seconds)
+
+
+def test_timestamped_schedule_cursor(timestamped_schedule, timestamped_start):
+    steps = list(range(0, 101)) + random.Random(1).choices(range(0, 101), k=100)
+    expected = [
+        timestamped_schedule.sample(timestamped_start, timedelta(seconds=1), step, 1)[0]
+        for step in steps
+    ]
+    assert [
+        timestamped_schedule.at(
+            ProcessTime(timedelta(seconds=1), step, timestamped_start)
+        )
+        for step in steps
+    ] == expected
+
+
+def test_timestamped_schedule_sample(timestamped_schedule, timestamped_start):
+    for interpolation in ["hold", "linear"]:
+        sampled = SampledSchedule(
+            timestamped_schedule,
+            timestamped_start - timedelta(seconds=3),
+            timedelta(seconds=3),
+            interpolation,
+        )
+        schedule = TimestampedSchedule(
+            timestamped_schedule.origin,
+            timestamped_schedule.times,
+            timestamped_schedule.values,
+            interpolation,
+        )
+        for step in range(1, 35):
+            time = ProcessTime(
+                timedelta(seconds=3), step, timestamped_start - timedelta(seconds=3)
+            )
+            assert sampled.at(time) == approx(schedule.at(time))
+
+
+def test_timestamped_schedule_loaders(timestamped_schedule, timestamped_start):
+    time = ProcessTime(timedelta(seconds=1), 80, timestamped_start)
+    epoch_ms = int(timestamped_start.timestamp() * 1000)
+    from_epoch = TimestampedSchedule.from_epoch_ms(
+        [epoch_ms + 70_000, epoch_ms, epoch_ms + 100_000], [4, 1, 5]
+    )
+    from_series = TimestampedSchedule.from_series(
+        Series(
+            [1, None, 4, 5],
+            index=DatetimeIndex(
+                [
+                    timestamped_start,
+                    timestamped_start + timedelta(seconds=20),
+                    timestamped_start + timedelta(seconds=70),
+                    timestamped_start + timedelta(seconds=100),
+                ]
+            ),
+        )
+    )
+
+    assert from_epoch.at(time) == 4
+    assert from_series.at(time) == 4
+    assert from_series.schedule_start == timestamped_start
+    assert from_series.schedule_end == timestamped_start + timedelta(seconds=100)
+    with pytest.raises(ValueError, match="as many values"):
+        TimestampedSchedule.from_epoch_ms([1, 2], [1])
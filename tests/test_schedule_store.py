@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from pytest import raises
+
+from energy_box_control.schedule_store import (
+    ScheduleStore,
+    convert_csv,
+    store_for_csv,
+    write_schedule_store,
+)
+from energy_box_control.schedules import PeriodicSchedule
+from energy_box_control.time import ProcessTime
+
+
+def write_csv(path, rows):
+    path.write_text(
+        "\n".join(
+            [",temperature,irradiance"]
+            + [
+                f"{timestamp},{temperature},{irradiance}"
+                for timestamp, temperature, irradiance in rows
+            ]
+        )
+    )
+
+
+def test_convert_csv(tmp_path):
+    csv = tmp_path / "schedules.csv"
+    start = datetime(2017, 6, 1)
+    write_csv(
+        csv,
+        [(start + timedelta(hours=hour), 20 + hour, hour * 100) for hour in range(24)],
+    )
+
+    store = convert_csv(csv, tmp_path / "store", {"temperature": "C"})
+    reopened = ScheduleStore(tmp_path / "store")
+
+    assert reopened.start == datetime(2017, 6, 1, tzinfo=timezone.utc)
+    assert reopened.period == timedelta(days=1)
+    assert reopened.columns["temperature"].unit == "C"
+    assert isinstance(reopened.values("irradiance"), np.memmap)
+    assert list(reopened.values("temperature")) == list(store.values("temperature"))
+
+    schedule = reopened.schedule("temperature")
+    expected = PeriodicSchedule(
+        reopened.start, reopened.period, tuple(float(20 + hour) for hour in range(24))
+    )
+    for step in range(0, 3 * 24 * 60, 17):
+        time = ProcessTime(
+            timedelta(minutes=1), step, datetime(2024, 1, 1, tzinfo=timezone.utc)
+        )
+        assert schedule.at(time) == expected.at(time)
+
+
+def test_convert_csv_uneven(tmp_path):
+    csv = tmp_path / "schedules.csv"
+    write_csv(
+        csv,
+        [
+            (datetime(2017, 6, 1, 0), 1, 1),
+            (datetime(2017, 6, 1, 1), 1, 1),
+            (datetime(2017, 6, 1, 3), 1, 1),
+        ],
+    )
+    with raises(ValueError, match="equally spaced"):
+        convert_csv(csv, tmp_path / "store")
+
+
+def test_store_for_csv_converts_once(tmp_path):
+    csv = tmp_path / "schedules.csv"
+    write_csv(csv, [(datetime(2017, 6, 1, hour), hour, 0) for hour in range(3)])
+    cache = tmp_path / "cache"
+
+    store = store_for_csv(csv, cache_directory=cache)
+    index = store.directory / "index.json"
+    written = index.stat().st_mtime_ns
+    assert store.directory.parent == cache
+    assert store_for_csv(csv, cache_directory=cache).directory == store.directory
+    assert index.stat().st_mtime_ns == written
+
+    write_csv(csv, [(datetime(2017, 6, 1, hour), 2 * hour, 0) for hour in range(4)])
+    store = store_for_csv(csv, cache_directory=cache)
+    assert list(store.values("temperature")) == [0, 2, 4, 6]
+
+
+def test_store_for_csv_uses_built_store(tmp_path):
+    csv = tmp_path / "schedules.csv"
+    write_csv(csv, [(datetime(2017, 6, 1, hour), hour, 0) for hour in range(3)])
+    convert_csv(csv, tmp_path / "schedules.schedules")
+
+    store = store_for_csv(csv, cache_directory=tmp_path / "cache")
+
+    assert store.directory == tmp_path / "schedules.schedules"
+    assert not (tmp_path / "cache").exists()
+
+
+def test_replacing_store_keeps_open_store_readable(tmp_path):
+    start = datetime(2017, 6, 1, tzinfo=timezone.utc)
+    directory = tmp_path / "store"
+    first = write_schedule_store(directory, start, timedelta(hours=1), {"a": [1, 2]})
+
+    for values in ([3, 4], [5, 6], [7, 8]):
+        write_schedule_store(directory, start, timedelta(hours=1), {"a": values})
+
+    assert list(first.values("a")) == [1, 2]
+    assert list(ScheduleStore(directory).values("a")) == [7, 8]
+    assert len([path for path in tmp_path.glob(".store.*") if path.is_dir()]) == 2
+
+
+def test_write_schedule_store_lengths(tmp_path):
+    with raises(ValueError, match="same length"):
+        write_schedule_store(
+            tmp_path / "store",
+            datetime(2017, 6, 1, tzinfo=timezone.utc),
+            timedelta(hours=1),
+            {"a": [1, 2], "b": [1]},
+        )
@@ -0,0 +1,108 @@
+import math
+
+import numpy as np
+import pytest
+from pytest import fixture
+
+from energy_box_control.power_hub.control.control import (
+    control_power_hub,
+    initial_control_all_off,
+    no_control,
+)
+from energy_box_control.power_hub.control.state import initial_control_state
+from energy_box_control.power_hub.network import PowerHub, PowerHubSchedules
+from energy_box_control.power_hub.sensors import PcmSensors, PowerHubSensors
+from energy_box_control.sensor_snapshot import SensorHistory, SensorLayout
+from energy_box_control.sensors import SensorCodec
+
+
+@fixture
+def power_hub():
+    return PowerHub.power_hub(PowerHubSchedules.const_schedules())
+
+
+@fixture
+def sensors(power_hub):
+    state = power_hub.simulate(power_hub.simple_initial_state(), no_control(power_hub))
+    return power_hub.sensors_from_state(state)
+
+
+def simulated_sensors(power_hub, steps):
+    state = power_hub.simple_initial_state()
+    control_state = initial_control_state()
+    controls = initial_control_all_off(power_hub)
+    for _ in range(steps):
+        state = power_hub.simulate(state, controls)
+        sensors = power_hub.sensors_from_state(state)
+        control_state, controls = control_power_hub(
+            power_hub, control_state, sensors, sensors.time, survival_mode=False
+        )
+        yield sensors
+
+
+def test_snapshot_equals_sensors(power_hub, sensors):
+    layout = SensorLayout.of(PowerHubSensors)
+    snapshot = layout.snapshot(power_hub, sensors.time, layout.fill(sensors))
+    assert snapshot == sensors
+    assert sensors == snapshot
+    assert snapshot.same_as(sensors)
+    codec = SensorCodec.of(PowerHubSensors)
+    assert codec.to_dict(snapshot, include_properties=True) == codec.to_dict(
+        sensors, include_properties=True
+    )
+
+
+def test_snapshot_copies_the_array(power_hub, sensors):
+    layout = SensorLayout.of(PowerHubSensors)
+    values = layout.fill(sensors)
+    snapshot = layout.snapshot(power_hub, sensors.time, values)
+    charge_power = snapshot.pcm.charge_power
+    values[layout.position("pcm.temperature")] = 12.5
+    values[layout.position("hot_storage_flow_sensor.flow")] += 1
+    assert snapshot.pcm.temperature == sensors.pcm.temperature
+    assert snapshot.pcm.charge_power == charge_power
+    with pytest.raises(AttributeError, match="read only"):
+        snapshot.pcm.temperature = 10
+
+
+def test_snapshot_views_are_slotted(power_hub, sensors):
+    layout = SensorLayout.of(PowerHubSensors)
+    snapshot = layout.snapshot(power_hub, sensors.time, layout.fill(sensors))
+    assert isinstance(snapshot.pcm, PcmSensors)
+    assert PcmSensors not in type(snapshot.pcm).__mro__
+    assert not hasattr(snapshot.pcm, "__dict__")
+    assert snapshot.pcm.charge_power == sensors.pcm.charge_power
+    assert snapshot.pcm.spec is sensors.pcm.spec
+    with pytest.raises(AttributeError, match="read only"):
+        snapshot.pcm.spec = None
+
+
+def test_snapshot_from_dict(power_hub, sensors):
+    layout = SensorLayout.of(PowerHubSensors)
+    values = SensorCodec.of(PowerHubSensors).to_dict(sensors)
+    del values["pcm"]["temperature"]
+    array = layout.from_dict(values)
+    assert math.isnan(array[layout.position("pcm.temperature")])
+    snapshot = layout.snapshot(power_hub, sensors.time, array)
+    assert math.isnan(snapshot.pcm.temperature)
+    assert snapshot.yazaki == sensors.yazaki
+
+
+def test_snapshot_rejects_other_shape(power_hub, sensors):
+    with pytest.raises(ValueError, match="sensor values"):
+        SensorLayout.of(PowerHubSensors).snapshot(power_hub, sensors.time, np.zeros(3))
+
+
+def test_history_keeps_last_snapshots(power_hub):
+    history = SensorHistory(PowerHubSensors, capacity=3)
+    simulated = list(simulated_sensors(power_hub, 5))
+    for sensors in simulated:
+        history.append(sensors)
+    assert len(history) == 3
+    assert history.values().shape == (3, len(history.layout))
+    assert list(history.values("pcm.temperature")) == [
+        sensors.pcm.temperature for sensors in simulated[-3:]
+    ]
+    assert list(history.times()) == sorted(history.times())
+    assert history.snapshot(power_hub, 0).pcm == simulated[-3].pcm
+    assert history.snapshot(power_hub).electrical == simulated[-1].electrical
@@ -0,0 +1,44 @@
+import asyncio
+from datetime import timedelta
+from time import perf_counter, sleep
+
+import pytest
+
+from energy_box_control.time import Ticker
+
+
+def test_ticker_keeps_cadence_despite_work():
+    async def tick(ticks: int) -> float:
+        ticker = Ticker(timedelta(seconds=0.02))
+        await ticker.tick()
+        start = perf_counter()
+        for _ in range(ticks):
+            sleep(0.01)
+            await ticker.tick()
+        return perf_counter() - start
+
+    assert asyncio.run(tick(10)) == pytest.approx(0.2, abs=0.03)
+
+
+def test_ticker_skips_missed_ticks():
+    async def tick_late() -> list[int]:
+        ticker = Ticker(timedelta(seconds=0.05))
+        await ticker.tick()
+        sleep(0.175)
+        return [await ticker.tick(), await ticker.tick()]
+
+    assert asyncio.run(tick_late()) == [2, 0]
+
+
+def test_ticker_catches_up_on_missed_ticks():
+    async def tick_late() -> tuple[list[int], float]:
+        ticker = Ticker(timedelta(seconds=0.05), catch_up=True)
+        await ticker.tick()
+        sleep(0.175)
+        start = perf_counter()
+        skipped = [await ticker.tick() for _ in range(3)]
+        return skipped, perf_counter() - start
+
+    skipped, duration = asyncio.run(tick_late())
+    assert skipped == [0, 0, 0]
+    assert duration < 0.05
@@ -0,0 +1,120 @@
+from copy import copy
+from dataclasses import fields, replace
+import json
+import math
+from typing import Any
+
+import pytest
+from pytest import fixture
+
+from energy_box_control.appliances.base import BaseAppliance
+from energy_box_control.power_hub.control.control import (
+    control_power_hub,
+    control_to_json,
+    initial_control_all_off,
+    no_control,
+)
+from energy_box_control.power_hub.control.state import initial_control_state
+from energy_box_control.power_hub.network import PowerHub, PowerHubSchedules
+from energy_box_control.power_hub.sensors import PowerHubSensors
+from energy_box_control.sensors import SensorCodec, sensors_to_json
+from energy_box_control.wire import (
+    INT_MISSING,
+    ControlWireFormat,
+    SensorWireFormat,
+    WireFormatError,
+    is_wire_format,
+)
+
+
+@fixture
+def power_hub():
+    return PowerHub.power_hub(PowerHubSchedules.const_schedules())
+
+
+@fixture
+def sensors(power_hub):
+    state = power_hub.simulate(power_hub.simple_initial_state(), no_control(power_hub))
+    return power_hub.sensors_from_state(state)
+
+
+def test_sensor_wire_format_roundtrips(power_hub, sensors):
+    wire_format = SensorWireFormat.of(PowerHubSensors)
+    payload = wire_format.encode(sensors)
+    assert is_wire_format(payload)
+    assert wire_format.decode(power_hub, payload) == sensors
+
+
+def test_sensor_wire_format_decodes_like_json(power_hub, sensors):
+    for include_properties in (False, True):
+        decoded = SensorWireFormat.of(PowerHubSensors, include_properties).decode(
+            power_hub,
+            SensorWireFormat.of(PowerHubSensors, include_properties).encode(sensors),
+        )
+        from_json = SensorCodec.of(PowerHubSensors).decode(
+            power_hub, sensors_to_json(sensors)
+        )
+        assert decoded == from_json
+        assert decoded.digest() == from_json.digest()
+
+
+def test_enriched_sensor_wire_format_holds_properties(sensors):
+    values = SensorWireFormat.of(PowerHubSensors, True).to_dict(
+        SensorWireFormat.of(PowerHubSensors, True).encode(sensors)
+    )
+    assert values["pcm"]["charge_power"] == pytest.approx(sensors.pcm.charge_power)
+
+
+def test_sensor_wire_format_missing_int(power_hub, sensors):
+    wire_format = SensorWireFormat.of(PowerHubSensors)
+    int_fields = [name for name, format in wire_format.schema if format == "i"]
+    sensor, field = int_fields[0].split(".")
+    missing_sensor = copy(getattr(sensors, sensor))
+    setattr(missing_sensor, field, math.nan)
+    payload = wire_format.encode(replace(sensors, **{sensor: missing_sensor}))
+    assert INT_MISSING.to_bytes(4, "little", signed=True) in payload
+    assert math.isnan(wire_format.to_dict(payload)[sensor][field])
+
+
+def test_sensor_wire_format_rejects_other_schema(sensors):
+    payload = SensorWireFormat.of(PowerHubSensors, True).encode(sensors)
+    with pytest.raises(WireFormatError, match="different schema"):
+        SensorWireFormat.of(PowerHubSensors).to_dict(payload)
+
+
+def test_sensor_wire_format_rejects_truncated(sensors):
+    payload = SensorWireFormat.of(PowerHubSensors).encode(sensors)
+    with pytest.raises(WireFormatError, match="truncated"):
+        SensorWireFormat.of(PowerHubSensors).to_dict(payload[:-1])
+
+
+def _without_time(control_json: str) -> dict[str, Any]:
+    return {
+        name: value
+        for name, value in json.loads(control_json).items()
+        if name != "time"
+    }
+
+
+def test_control_wire_format_roundtrips(power_hub, sensors):
+    _, controls = control_power_hub(
+        power_hub, initial_control_state(), sensors, sensors.time, False
+    )
+    wire_format = ControlWireFormat(power_hub)
+    decoded = wire_format.decode(wire_format.encode(controls))
+    assert _without_time(control_to_json(power_hub, decoded)) == _without_time(
+        control_to_json(power_hub, controls)
+    )
+
+
+def test_control_wire_format_leaves_out_missing_controls(power_hub):
+    controls = initial_control_all_off(power_hub)
+    wire_format = ControlWireFormat(power_hub)
+    decoded = wire_format.decode(wire_format.encode(controls))
+    for field in fields(PowerHub):
+        appliance = getattr(power_hub, field.name)
+        if not isinstance(appliance, BaseAppliance):
+            continue
+        assert (decoded.appliance(appliance).get() is None) == (
+            controls.appliance(appliance).get() is None
+        ), field.name